@@ -1,4 +1,8 @@
 from .commands import MockRedis, create_redis
+from .keyspace import Keyspace, ManualClock, flush_keyspaces, get_keyspace, reset_keyspaces
+from .memory import MemoryStats
 from .pool import MockRedisPool, create_pool, create_redis_pool
+from .pubsub import Channel
+from .scripting import register_script, script_sha
 
 __version__ = '0.0.16'
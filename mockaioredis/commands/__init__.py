@@ -1,29 +1,125 @@
-from mockredis import MockRedis as _MockRedis
+import warnings
 
+from aioredis.errors import ReplyError
+from aioredis.util import coerced_keys_dict
+
+from mockaioredis.keyspace import Keyspace, get_keyspace
+from mockaioredis.registry import Blocked, lookup
+from mockaioredis.util import _NOTSET, _decode_reply
 from .generic import GenericCommandsMixin
 from .hash import HashCommandsMixin
+from .hyperloglog import HyperLogLogCommandsMixin
 from .list import ListCommandsMixin
+from .pubsub import PubSubCommandsMixin
+from .scripting import ScriptingCommandsMixin
+from .server import ServerCommandsMixin
 from .set import SetCommandsMixin
+from .sorted_set import SortedSetCommandsMixin
+from .stream import StreamCommandsMixin
+from .string import StringCommandsMixin
+from .transaction import CLIENT_HANDLERS, TransactionsCommandsMixin
 
 __all__ = ['MockRedis']
 
 
-class MockRedis(GenericCommandsMixin, HashCommandsMixin, ListCommandsMixin, SetCommandsMixin):
+class MockRedis(GenericCommandsMixin, HashCommandsMixin, HyperLogLogCommandsMixin,
+                ListCommandsMixin, PubSubCommandsMixin, ScriptingCommandsMixin,
+                ServerCommandsMixin, SetCommandsMixin, SortedSetCommandsMixin,
+                StreamCommandsMixin, StringCommandsMixin, TransactionsCommandsMixin):
     """Fake high-level aioredis.Redis interface"""
 
-    def __init__(self, connection=None, encoding=None, **kwargs):
+    def __init__(self, connection=None, encoding=None, *, keyspace=None, **kwargs):
 
         # Just for API compatibility
         self._conn = connection
-        self._redis = _MockRedis(**kwargs)
+
+        # Options of the mockredis client this used to wrap, like strict
+        if kwargs:
+            warnings.warn("MockRedis ignores the mockredis arguments {}".format(
+                ', '.join(sorted(kwargs))), DeprecationWarning, stacklevel=2)
+
+        # Clients on top of a pool share the pool's keyspace, clients
+        # without an address get a private one
+        if keyspace is None and connection is not None:
+            keyspace = get_keyspace(connection.address, connection.db)
+        if keyspace is None:
+            keyspace = Keyspace()
+        self._keyspace = keyspace
 
         self._encoding = encoding
 
+        # name -> Channel of the subscriptions of this client
+        self._pubsub_channels = coerced_keys_dict()
+        self._pubsub_patterns = coerced_keys_dict()
+
+        # commands queued since MULTI, None outside of transactions
+        self._multi = None
+        self._multi_aborted = False
+        # key -> version of the keys this client watches
+        self._watched = {}
+
+    async def execute(self, command, *args, encoding=_NOTSET):
+        """Execute a Redis command and return the raw reply
+
+        Like aioredis, bulk strings in the reply are decoded with encoding,
+        but nothing else is converted.
+
+        :raises ReplyError: for unknown commands, wrong numbers of arguments
+                            and everything else Redis replies to with an error
+        """
+        if self._multi is not None:
+            reply = self._queue(command, args)
+        else:
+            handler = lookup(command, len(args))
+            keyspace = self._keyspace
+            if handler in CLIENT_HANDLERS:
+                reply = handler(self, *args)
+            else:
+                reply = handler(keyspace, *args)
+                keyspace.serve_blocked()
+            if type(reply) is Blocked:
+                # blocking commands don't block in transactions
+                if keyspace.in_atomic:
+                    reply = None
+                else:
+                    reply = await keyspace.block(reply.keys, reply.serve, reply.timeout)
+        if encoding is _NOTSET:
+            encoding = self._encoding
+        return _decode_reply(reply, encoding)
+
+    def _execute(self, command, *args, encoding=_NOTSET):
+        '''Run a command from the command table and return the decoded reply
+
+        This is the path all non-blocking command methods take. The number
+        of arguments is checked like execute() does, so methods called with
+        empty argument lists fail like they would with Redis. Blocking
+        commands go through execute(), which can wait.
+
+        Inside a MULTI sent with execute(), commands have to be sent with
+        execute() too, since the replies of methods can't be queued.
+
+        :raises ReplyError: like execute(), and inside MULTI, which also
+                            makes EXEC fail
+        '''
+        if self._multi is not None:
+            self._multi_aborted = True
+            raise ReplyError("ERR only commands sent with execute() can be queued after "
+                             "MULTI, use multi_exec() to run methods in a transaction")
+        keyspace = self._keyspace
+        reply = lookup(command, len(args))(keyspace, *args)
+        keyspace.serve_blocked()
+        if encoding is _NOTSET:
+            encoding = self._encoding
+        if encoding is None:
+            return reply
+        return _decode_reply(reply, encoding)
+
     async def wait_closed(self):
         if self._conn:
             await self._conn.wait_closed()
 
     def close(self):
+        self._unsubscribe_all()
         if self._conn:
             self._conn.close()
 
@@ -34,4 +130,5 @@ async def create_redis(address, *, db=None, password=None, ssl=None,
 
     This function is a coroutine
     '''
-    return commands_factory(None, encoding=encoding)
+    return commands_factory(None, encoding=encoding,
+                            keyspace=get_keyspace(address, db))
@@ -1,41 +1,210 @@
 """Generic Redis commands"""
-import asyncio
-from mockredis.pipeline import MockRedisPipeline
-from mockredis.exceptions import WatchError
+from aioredis.errors import RedisError, ReplyError, WatchVariableError
 
-from mockaioredis.util import _NOTSET
+from mockaioredis.registry import command
+from mockaioredis.util import (
+    _NOTSET,
+    _ScanIter,
+    _encode,
+    _int_arg,
+    _option,
+    _scan_args,
+)
+from .transaction import _run_atomically
 
 
-class AsyncMockRedisPipeline(MockRedisPipeline):
+class AsyncMockRedisPipeline:
+    """Fake pipeline
 
-    async def execute(self):
+    Commands are queued and run when execute() is awaited.
+    """
+
+    def __init__(self, mock_redis, transaction=True, shard_hint=None):
+        self.mock_redis = mock_redis
+        self._reset()
+
+    def __getattr__(self, name):
+        """
+        Handle all unfound attributes by adding a deferred function call that
+        delegates to the underlying mock redis instance.
+        """
+        command = getattr(self.mock_redis, name)
+        if not callable(command):
+            raise AttributeError(name)
+
+        def wrapper(*args, **kwargs):
+            if self.watching and not self.explicit_transaction:
+                # execute the command immediately
+                return command(*args, **kwargs)
+            else:
+                self.commands.append((command, args, kwargs))
+                return self
+        return wrapper
+
+    def watch(self, *keys):
+        """
+        Put the pipeline into immediate execution mode and remember the
+        current versions of keys.
+        """
+        if self.explicit_transaction:
+            raise RedisError("Cannot issue a WATCH after a MULTI")
+        self.watching = True
+        keyspace = self.mock_redis._keyspace
+        for key in map(_encode, keys):
+            self._watched_keys[key] = keyspace.version(key)
+
+    def multi(self):
+        """
+        Start a transactional block of the pipeline after WATCH commands
+        are issued. End the transactional block with `execute`.
+        """
+        if self.explicit_transaction:
+            raise RedisError("Cannot issue nested calls to MULTI")
+        if self.commands:
+            raise RedisError("Commands without an initial WATCH have already been issued")
+        self.explicit_transaction = True
+
+    async def execute(self, raise_on_error=True):
         """
         Execute all of the saved commands and return results.
+
+        The commands run as one unit, without returning to the event loop
+        in between. A failing command doesn't stop the ones after it, like
+        in a Redis transaction. If raise_on_error is True, the first error
+        is raised afterwards, otherwise errors are returned in place of
+        the results of the failed commands.
         """
         try:
-            for key, value in self._watched_keys.items():
-                if self.mock_redis.redis.get(self.mock_redis._encode(key)) != value:
-                    raise WatchError("Watched variable changed.")
-            results = []
-            for command in self.commands:
-                results.append(await command())
-            return results
+            keyspace = self.mock_redis._keyspace
+            for key, version in self._watched_keys.items():
+                if keyspace.version(key) != version:
+                    raise WatchVariableError("Watched variable changed.")
+            results = _run_atomically(keyspace, self.commands)
         finally:
             self._reset()
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def _reset(self):
+        """
+        Reset instance variables.
+        """
+        self.commands = []
+        self.watching = False
+        self._watched_keys = {}
+        self.explicit_transaction = False
+
+    def __exit__(self, *argv, **kwargs):
+        pass
+
+    def __enter__(self, *argv, **kwargs):
+        return self
+
+
+@command(b'DEL', -2)
+def _del(keyspace, *keys):
+    return keyspace.delete_many(list(map(_encode, keys)))
+
+
+@command(b'UNLINK', -2)
+def _unlink(keyspace, *keys):
+    return keyspace.delete_many(list(map(_encode, keys)))
+
+
+@command(b'EXISTS', -2)
+def _exists(keyspace, *keys):
+    return keyspace.count_existing(list(map(_encode, keys)))
+
+
+@command(b'TOUCH', -2)
+def _touch(keyspace, *keys):
+    # there is no access time to update
+    return keyspace.count_existing(list(map(_encode, keys)))
+
+
+@command(b'EXPIRE', 3)
+def _expire(keyspace, key, seconds):
+    return int(keyspace.expire_in(_encode(key), _int_arg(seconds)))
+
+
+@command(b'EXPIREAT', 3)
+def _expireat(keyspace, key, timestamp):
+    return int(keyspace.expire_at(_encode(key), _int_arg(timestamp)))
+
+
+@command(b'PEXPIRE', 3)
+def _pexpire(keyspace, key, milliseconds):
+    return int(keyspace.expire_in(_encode(key), _int_arg(milliseconds) / 1000))
+
+
+@command(b'PEXPIREAT', 3)
+def _pexpireat(keyspace, key, timestamp):
+    return int(keyspace.expire_at(_encode(key), _int_arg(timestamp) / 1000))
+
+
+@command(b'PERSIST', 2)
+def _persist(keyspace, key):
+    return int(keyspace.persist(_encode(key)))
+
+
+@command(b'TTL', 2)
+def _ttl(keyspace, key):
+    ret = keyspace.ttl(_encode(key))
+    if ret is None:
+        return -1
+    if ret == -2:
+        return ret
+    # Redis rounds half up, not to the nearest even number
+    return int(ret + 0.5)
+
+
+@command(b'PTTL', 2)
+def _pttl(keyspace, key):
+    ret = keyspace.ttl(_encode(key))
+    if ret is None:
+        return -1
+    if ret == -2:
+        return ret
+    return int(ret * 1000 + 0.5)
+
+
+@command(b'KEYS', 2)
+def _keys(keyspace, pattern):
+    return keyspace.keys_matching(pattern)
+
+
+@command(b'DBSIZE', 1)
+def _dbsize(keyspace):
+    return len(keyspace)
+
+
+@command(b'FLUSHDB', -1)
+def _flushdb(keyspace, *args):
+    if args and (len(args) > 1 or _option(args[0]) != b'ASYNC'):
+        raise ReplyError("ERR syntax error")
+    keyspace.flush()
+    return b'OK'
+
+
+@command(b'SCAN', -2)
+def _scan(keyspace, cursor, *args):
+    cursor, match, count = _scan_args(cursor, args)
+    cursor, keys = keyspace.scan(cursor, match, count)
+    return [b'%d' % cursor, keys]
 
 
 class GenericCommandsMixin:
     """Generic commands mixin
     """
-    SET_IF_EXIST = "SET_IF_EXIST"
-    SET_IF_NOT_EXIST = "SET_IF_NOT_EXIST"
-
     def pipeline(self, transaction=True, shard_hint=None):
         return AsyncMockRedisPipeline(self, transaction, shard_hint)
 
     async def delete(self, key, *keys):
         """Delete specified key(s)"""
-        return self._redis.delete(key, *keys)
+        return self._execute(b'DEL', key, *keys)
 
     async def exists(self, key, *keys):
         """Check if key(s) exist
@@ -44,87 +213,117 @@ class GenericCommandsMixin:
         If the same existing key is given multiple times, it is
         counted multiple times.
         """
-        all_keys = (key,) + keys
-        existing = 0
-        # redis-py and, by extension mockredispy still only support
-        # single-key checks that return True/False
-        for k in all_keys:
-            if self._redis.exists(k):
-                existing += 1
-
-        return existing
+        return self._execute(b'EXISTS', key, *keys)
 
     async def expire(self, key, timeout):
-        """Set a timeout on a key
+        """Set a timeout on key.
 
-        For now, only supports integer timeouts, until pexpire is implemented
+        if timeout is float it will be multiplied by 1000
+        coerced to int and passed to `pexpire` method.
+
+        Otherwise raises TypeError if timeout argument is not int.
         """
-        # TODO: support float timeouts and forward to pexpire, like aio-redis
+        if isinstance(timeout, float):
+            return await self.pexpire(key, int(timeout * 1000))
         if not isinstance(timeout, int):
             raise TypeError(
                 "timeout argument must be int, not {!r}".format(timeout))
-        return self._redis.expire(key, timeout)
-
-    async def get(self, key, encoding=_NOTSET):
-        """Gets the value of a key"""
-        if encoding == _NOTSET:
-            encoding = self._encoding
-        ret = self._redis.get(key)
+        return bool(self._execute(b'EXPIRE', key, timeout))
 
-        if encoding is None:
-            return ret
-
-        if hasattr(ret, 'decode'):
-            ret = ret.decode(encoding)
-        return ret
+    async def expireat(self, key, timestamp):
+        """Set expire timestamp on a key.
 
-    async def incr(self, key):
-        """Increments key by 1"""
-        return self._redis.incr(key)
+        if timeout is float it will be multiplied by 1000
+        coerced to int and passed to `pexpireat` method.
 
-    async def incrby(self, key, amount):
-        """Increments key by the amount specified"""
-        return self._redis.incrby(key, amount)
+        Otherwise raises TypeError if timestamp argument is not int.
+        """
+        if isinstance(timestamp, float):
+            return await self.pexpireat(key, int(timestamp * 1000))
+        if not isinstance(timestamp, int):
+            raise TypeError("timestamp argument must be int, not {!r}"
+                            .format(timestamp))
+        return bool(self._execute(b'EXPIREAT', key, timestamp))
 
     async def keys(self, pattern, *, encoding=_NOTSET):
         """Returns all keys matching pattern."""
-        if encoding == _NOTSET:
-            encoding = self._encoding
+        return self._execute(b'KEYS', pattern, encoding=encoding)
 
-        ret = self._redis.keys(pattern)
+    async def persist(self, key):
+        """Remove the existing timeout on key."""
+        return bool(self._execute(b'PERSIST', key))
 
-        if encoding is None:
-            return ret
+    async def pexpire(self, key, timeout):
+        """Set a milliseconds timeout on key.
 
-        return list(map(lambda x: x.decode(encoding), ret))
+        :raises TypeError: if timeout is not int
+        """
+        if not isinstance(timeout, int):
+            raise TypeError("timeout argument must be int, not {!r}"
+                            .format(timeout))
+        return bool(self._execute(b'PEXPIRE', key, timeout))
 
-    async def mget(self, keys, *args, encoding=_NOTSET):
-        """Returns all keys matching pattern."""
-        if encoding == _NOTSET:
-            encoding = self._encoding
-        ret = self._redis.mget(keys, *args)
+    async def pexpireat(self, key, timestamp):
+        """Set expire timestamp on key, timestamp in milliseconds.
+
+        :raises TypeError: if timeout is not int
+        """
+        if not isinstance(timestamp, int):
+            raise TypeError("timestamp argument must be int, not {!r}"
+                            .format(timestamp))
+        return bool(self._execute(b'PEXPIREAT', key, timestamp))
+
+    async def pttl(self, key):
+        """Returns time-to-live for a key, in milliseconds.
+
+        Returns -2 if the key does not exist and -1 if the key exists but
+        has no associated expire.
+        """
+        return self._execute(b'PTTL', key)
 
-        if encoding is None:
-            return ret
+    async def touch(self, key, *keys):
+        """Alters the last access time of a key(s).
 
-        return list(map(lambda x: x.decode(encoding), ret))
+        Returns the number of keys that were touched.
+        """
+        return self._execute(b'TOUCH', key, *keys)
 
-    async def set(self, key, value, *, expire=None, pexpire=None, exist=None):
-        """Sets the value of a key"""
-        nx = xx = False
-        if exist is self.SET_IF_EXIST:
-            xx = True
-        elif exist is self.SET_IF_NOT_EXIST:
-            nx = True
-        return self._redis.set(key, value, ex=expire, px=pexpire, nx=nx, xx=xx)
+    async def unlink(self, key, *keys):
+        """Delete a key asynchronously in another thread."""
+        return self._execute(b'UNLINK', key, *keys)
 
     async def ttl(self, key):
         """Return the TTL of a key in seconds"""
-        return self._redis.ttl(key)
+        return self._execute(b'TTL', key)
 
     async def dbsize(self):
-        return self._redis.dbsize()
+        return self._execute(b'DBSIZE')
+
+    async def flushdb(self):
+        """Remove all keys from the current database"""
+        return self._execute(b'FLUSHDB', encoding=None) == b'OK'
 
     async def scan(self, cursor=0, match=None, count=None):
-        """Incrementally iterate the keys space."""
-        return self._redis.scan(cursor=cursor, match=match, count=count)
+        """Incrementally iterate the keys space.
+
+        Cursors point after the last key returned, so keys that exist for
+        the whole iteration are returned exactly once.
+        """
+        args = []
+        if match is not None:
+            args += [b'MATCH', match]
+        if count is not None:
+            args += [b'COUNT', count]
+        cursor, keys = self._execute(b'SCAN', cursor, *args)
+        return int(cursor), keys
+
+    def iscan(self, *, match=None, count=None):
+        """Incrementally iterate the keys space using async for.
+
+        Usage example:
+
+        >>> async for key in redis.iscan(match='something*'):
+        ...     print('Matched:', key)
+
+        """
+        return _ScanIter(lambda cur: self.scan(cur, match=match, count=count))
@@ -1,47 +1,211 @@
-from mockaioredis.util import _NOTSET
+import itertools
+import math
+import random
+
+from aioredis.errors import ReplyError
+
+from mockaioredis.registry import command
+from mockaioredis.util import (
+    _INT64_MAX,
+    _INT64_MIN,
+    _NOTSET,
+    _encode,
+    _float_arg,
+    _format_float,
+    _int_arg,
+    _irange_sorted,
+    _option,
+    _scan_args,
+    _scan_page,
+    _ScanIter,
+)
+
+
+def _hash_pairs(keyspace, name, key, pairs):
+    """Store field/value pairs in a hash, return the number of new fields"""
+    if not pairs or len(pairs) % 2:
+        raise ReplyError("ERR wrong number of arguments for '{}' command".format(name))
+    h = keyspace.get_or_create(_encode(key), dict)
+    before = len(h)
+    it = map(_encode, pairs)
+    h.update(zip(it, it))
+    return len(h) - before
+
+
+@command(b'HSET', -4)
+def _hset(keyspace, key, *pairs):
+    return _hash_pairs(keyspace, 'hset', key, pairs)
+
+
+@command(b'HMSET', -4)
+def _hmset(keyspace, key, *pairs):
+    _hash_pairs(keyspace, 'hmset', key, pairs)
+    return b'OK'
+
+
+@command(b'HSETNX', 4)
+def _hsetnx(keyspace, key, field, value):
+    key = _encode(key)
+    field = _encode(field)
+    if field in (keyspace.get(key, dict) or ()):
+        return 0
+    keyspace.get_or_create(key, dict)[field] = _encode(value)
+    return 1
+
+
+@command(b'HGET', 3)
+def _hget(keyspace, key, field):
+    h = keyspace.get(_encode(key), dict) or {}
+    return h.get(_encode(field))
+
+
+@command(b'HEXISTS', 3)
+def _hexists(keyspace, key, field):
+    h = keyspace.get(_encode(key), dict) or {}
+    return int(_encode(field) in h)
+
+
+@command(b'HGETALL', 2)
+def _hgetall(keyspace, key):
+    h = keyspace.get(_encode(key), dict) or {}
+    return list(itertools.chain.from_iterable(h.items()))
+
+
+@command(b'HMGET', -3)
+def _hmget(keyspace, key, *fields):
+    h = keyspace.get(_encode(key), dict) or {}
+    return [h.get(field) for field in map(_encode, fields)]
+
+
+@command(b'HDEL', -3)
+def _hdel(keyspace, key, *fields):
+    key = _encode(key)
+    h = keyspace.get(key, dict)
+    if h is None:
+        return 0
+
+    deleted = 0
+    for field in map(_encode, fields):
+        if h.pop(field, None) is not None:
+            deleted += 1
+    if deleted:
+        keyspace.changed(key)
+    return deleted
+
+
+@command(b'HINCRBY', 4)
+def _hincrby(keyspace, key, field, increment):
+    increment = _int_arg(increment)
+    key, field = _encode(key), _encode(field)
+    h = keyspace.get(key, dict) or {}
+    value = _int_arg(h.get(field, b'0'), "ERR hash value is not an integer")
+    value += increment
+    if not _INT64_MIN <= value <= _INT64_MAX:
+        raise ReplyError("ERR increment or decrement would overflow")
+    keyspace.get_or_create(key, dict)[field] = b'%d' % value
+    return value
+
+
+@command(b'HINCRBYFLOAT', 4)
+def _hincrbyfloat(keyspace, key, field, increment):
+    increment = _float_arg(increment)
+    key, field = _encode(key), _encode(field)
+    h = keyspace.get(key, dict) or {}
+    value = _float_arg(h.get(field, 0), "ERR hash value is not a float")
+    value += increment
+    if math.isnan(value) or math.isinf(value):
+        raise ReplyError("ERR increment would produce NaN or Infinity")
+    ret = keyspace.get_or_create(key, dict)[field] = _format_float(value)
+    return ret
+
+
+@command(b'HLEN', 2)
+def _hlen(keyspace, key):
+    return len(keyspace.get(_encode(key), dict) or ())
+
+
+@command(b'HSTRLEN', 3)
+def _hstrlen(keyspace, key, field):
+    h = keyspace.get(_encode(key), dict) or {}
+    return len(h.get(_encode(field), b''))
+
+
+@command(b'HVALS', 2)
+def _hvals(keyspace, key):
+    return list((keyspace.get(_encode(key), dict) or {}).values())
+
+
+@command(b'HRANDFIELD', -2)
+def _hrandfield(keyspace, key, *args):
+    if len(args) > 2 or (len(args) == 2 and _option(args[1]) != b'WITHVALUES'):
+        raise ReplyError("ERR syntax error")
+    key = _encode(key)
+    count = _int_arg(args[0]) if args else None
+    h = keyspace.get(key, dict) or {}
+    if not h:
+        return None if count is None else []
+
+    # sampling needs no order, so no sorted copy of the fields is made
+    if count is None:
+        return next(itertools.islice(h, random.randrange(len(h)), None))
+    if count == 0:
+        return []
+    if count < 0:
+        # Allow duplicates
+        fields = random.choices(list(h), k=-count)
+    elif count >= len(h):
+        fields = list(h)
+    else:
+        fields = random.sample(list(h), count)
+    if len(args) == 2:
+        return [item for field in fields for item in (field, h[field])]
+    return fields
+
+
+@command(b'HKEYS', 2)
+def _hkeys(keyspace, key):
+    return list(keyspace.get(_encode(key), dict) or ())
+
+
+@command(b'HSCAN', -3)
+def _hscan(keyspace, key, cursor, *args):
+    cursor, match, count = _scan_args(cursor, args)
+    key = _encode(key)
+    fields = keyspace.sorted_members(key, dict)
+    cursor, fields = _scan_page(_irange_sorted(fields), cursor, match, count)
+    h = keyspace.get(key, dict) or {}
+    return [b'%d' % cursor, [item for field in fields for item in (field, h[field])]]
+
 
 class HashCommandsMixin:
 
-    async def hset(self, key, field, value):
-        return self._redis.hset(key, field, value)
+    async def hset(self, key, field, value, *pairs):
+        """Set the values of one or more hash fields.
 
-    async def hget(self, key, field, encoding=_NOTSET):
-        if encoding == _NOTSET:
-            encoding = self._encoding
-        ret = self._redis.hget(key, field)
+        Returns the number of fields that were added.
+        """
+        if len(pairs) % 2 != 0:
+            raise TypeError("length of pairs must be an even number")
+        return self._execute(b'HSET', key, field, value, *pairs)
 
-        if encoding is None:
-            return ret
+    async def hsetnx(self, key, field, value):
+        """Set the value of a hash field, only if the field does not exist."""
+        return self._execute(b'HSETNX', key, field, value)
 
-        if hasattr(ret, 'decode'):
-            ret = ret.decode(encoding)
-        return ret
+    async def hget(self, key, field, encoding=_NOTSET):
+        return self._execute(b'HGET', key, field, encoding=encoding)
 
     async def hexists(self, key, filed):
-        return self._redis.hexists(key, filed)
+        return bool(self._execute(b'HEXISTS', key, filed))
 
     async def hgetall(self, key, encoding=_NOTSET):
-        if encoding == _NOTSET:
-            encoding = self._encoding
-
-        ret = self._redis.hgetall(key)
-        if encoding is None:
-            return ret
-        new = {}
-        for k, v in ret.items():
-            k = k.decode(encoding)
-            if hasattr(v, 'decode'):
-                v = v.decode(encoding)
-            new[k] = v
-
-        return new
+        it = iter(self._execute(b'HGETALL', key, encoding=encoding))
+        return dict(zip(it, it))
 
     async def hmset(self, key, field, value, *pairs):
         if len(pairs) % 2 != 0:
             raise TypeError("length of pairs must be an even number")
-        it = iter( (field, value) + pairs )
-        arg_dict = dict(zip(it, it))
-        return self._redis.hmset(key, arg_dict)
+        return self._execute(b'HMSET', key, field, value, *pairs, encoding=None) == b'OK'
 
     async def hmset_dict(self, key, *args, **kwargs):
         if not args and not kwargs:
@@ -54,44 +218,75 @@ class HashCommandsMixin:
                 raise TypeError("args[0] must be a dict")
             args_dict = args[0].copy()
         args_dict.update(kwargs)
-        return self._redis.hmset(key, args_dict)
+        pairs = itertools.chain.from_iterable(args_dict.items())
+        return self._execute(b'HMSET', key, *pairs, encoding=None) == b'OK'
 
     async def hmget(self, key, field, *fields, encoding=_NOTSET):
-        if encoding == _NOTSET:
-            encoding = self._encoding
-        ret = self._redis.hmget(key, field, *fields)
+        return self._execute(b'HMGET', key, field, *fields, encoding=encoding)
 
-        if encoding is None:
-            return ret
+    async def hdel(self, key, field, *fields):
+        """Delete one or more hash fields."""
+        return self._execute(b'HDEL', key, field, *fields)
 
-        new = []
-        for val in ret:
-            if hasattr(val, 'decode'):
-                val = val.decode(encoding)
-            new.append(val)
+    async def hincrby(self, key, field, increment=1):
+        """Increment the integer value of a hash field by the given number."""
+        return self._execute(b'HINCRBY', key, field, increment)
 
-        return new
+    async def hincrbyfloat(self, key, field, increment=1.0):
+        """Increment the float value of a hash field by the given number."""
+        return float(self._execute(b'HINCRBYFLOAT', key, field, increment))
 
-    async def hdel(self, key, field, *fields):
-        """Delete one or more hash fields."""
+    async def hlen(self, key):
+        """Get the number of fields in a hash."""
+        return self._execute(b'HLEN', key)
+
+    async def hstrlen(self, key, field):
+        """Get the length of the value of a hash field."""
+        return self._execute(b'HSTRLEN', key, field)
 
-        return self._redis.hdel(key, field, *fields)
+    async def hvals(self, key, *, encoding=_NOTSET):
+        """Get all the values in a hash."""
+        return self._execute(b'HVALS', key, encoding=encoding)
+
+    async def hrandfield(self, key, count=None, *, withvalues=False, encoding=_NOTSET):
+        """Get one or multiple random fields from a hash.
+
+        With withvalues, returns a list of (field, value) pairs.
+        """
+        args = [key]
+        if count is not None:
+            args.append(count)
+            if withvalues:
+                args.append(b'WITHVALUES')
+        elif withvalues:
+            raise TypeError("withvalues requires a count")
+        ret = self._execute(b'HRANDFIELD', *args, encoding=encoding)
+        if withvalues:
+            return list(zip(ret[::2], ret[1::2]))
+        return ret
 
     async def hkeys(self, key, *, encoding=_NOTSET):
         """Get all the fields in a hash."""
+        return self._execute(b'HKEYS', key, encoding=encoding)
 
-        if encoding == _NOTSET:
-            encoding = self._encoding
+    async def hscan(self, key, cursor=0, match=None, count=None):
+        """Incrementally iterate hash fields and associated values."""
+        args = [key, cursor]
+        if match is not None:
+            args += [b'MATCH', match]
+        if count is not None:
+            args += [b'COUNT', count]
+        cursor, items = self._execute(b'HSCAN', *args)
+        return int(cursor), list(zip(items[::2], items[1::2]))
 
-        ret = self._redis.hkeys(key)
+    def ihscan(self, key, *, match=None, count=None):
+        """Incrementally iterate hash fields and associated values
+        using async for.
 
-        if encoding is None:
-            return ret
+        Usage example:
 
-        new = []
-        for val in ret:
-            if hasattr(val, 'decode'):
-                val = val.decode(encoding)
-            new.append(val)
+        >>> async for name, val in redis.ihscan(key, match='something*'):
+        ...     print('Matched:', name, '->', val)
 
-        return new
+        """
+        return _ScanIter(lambda cur: self.hscan(key, cur, match=match, count=count))
@@ -0,0 +1,71 @@
+'HyperLogLog commands'
+from mockaioredis import hyperloglog
+from mockaioredis.registry import command
+from mockaioredis.util import _encode
+
+# HyperLogLogs are strings, see mockaioredis.hyperloglog for the format
+
+
+@command(b'PFADD', -2)
+def _pfadd(keyspace, key, *elements):
+    key = _encode(key)
+    value = keyspace.get(key, bytearray)
+    if value is None:
+        value = hyperloglog.new()
+        hyperloglog.add(value, map(_encode, elements))
+        keyspace.set(key, value)
+        return 1
+    if not hyperloglog.add(value, map(_encode, elements)):
+        return 0
+    keyspace.changed(key)
+    return 1
+
+
+@command(b'PFCOUNT', -2)
+def _pfcount(keyspace, *keys):
+    values = [keyspace.get(_encode(key), bytearray) for key in keys]
+    values = [value for value in values if value is not None]
+    if len(keys) == 1:
+        return hyperloglog.count(values[0]) if values else 0
+    return hyperloglog.cardinality(hyperloglog.merge(values))
+
+
+@command(b'PFMERGE', -2)
+def _pfmerge(keyspace, destkey, *sourcekeys):
+    destkey = _encode(destkey)
+    dest = keyspace.get(destkey, bytearray)
+    sources = [keyspace.get(_encode(key), bytearray) for key in sourcekeys]
+    values = [value for value in [dest] + sources if value is not None]
+    registers = hyperloglog.merge(values)
+    # merging a dense input makes the result dense, like in Redis
+    dense = any(map(hyperloglog.is_dense, values))
+    if dest is None:
+        dest = hyperloglog.new()
+        hyperloglog.store(dest, registers, dense)
+        keyspace.set(destkey, dest)
+    else:
+        hyperloglog.store(dest, registers, dense)
+        keyspace.changed(destkey)
+    return b'OK'
+
+
+class HyperLogLogCommandsMixin:
+    '''HyperLogLog commands mixin
+
+    Run the Redis HyperLogLog commands
+    '''
+
+    async def pfadd(self, key, value, *values):
+        """Adds the specified elements to the specified HyperLogLog."""
+        return self._execute(b'PFADD', key, value, *values)
+
+    async def pfcount(self, key, *keys):
+        """Return the approximated cardinality of
+        the set(s) observed by the HyperLogLog at key(s).
+        """
+        return self._execute(b'PFCOUNT', key, *keys)
+
+    async def pfmerge(self, destkey, sourcekey, *sourcekeys):
+        """Merge N different HyperLogLogs into a single one."""
+        return self._execute(b'PFMERGE', destkey, sourcekey, *sourcekeys,
+                             encoding=None) == b'OK'
@@ -1,6 +1,319 @@
 'List commands'
+import collections
+import itertools
+
+from aioredis.errors import ReplyError
+
+from mockaioredis.registry import Blocked, command
+from mockaioredis.util import (
+    _NOTSET,
+    _encode,
+    _float_arg,
+    _int_arg,
+    _option,
+    _translate_range,
+)
+
+
+@command(b'LINDEX', 3)
+def _lindex(keyspace, key, index):
+    lst = keyspace.get(_encode(key), collections.deque) or ()
+    try:
+        return lst[_int_arg(index)]
+    except IndexError:
+        return None
+
+
+@command(b'LLEN', 2)
+def _llen(keyspace, key):
+    return len(keyspace.get(_encode(key), collections.deque) or ())
+
+
+@command(b'LPUSH', -3)
+def _lpush(keyspace, key, *values):
+    lst = keyspace.get_or_create(_encode(key), collections.deque)
+    lst.extendleft(map(_encode, values))
+    return len(lst)
+
+
+@command(b'RPUSH', -3)
+def _rpush(keyspace, key, *values):
+    lst = keyspace.get_or_create(_encode(key), collections.deque)
+    lst.extend(map(_encode, values))
+    return len(lst)
+
+
+def _pushx(keyspace, key, values, push):
+    key = _encode(key)
+    lst = keyspace.get(key, collections.deque)
+    if lst is None:
+        return 0
+    push(lst, map(_encode, values))
+    keyspace.changed(key)
+    return len(lst)
+
+
+@command(b'LPUSHX', -3)
+def _lpushx(keyspace, key, *values):
+    return _pushx(keyspace, key, values, collections.deque.extendleft)
+
+
+@command(b'RPUSHX', -3)
+def _rpushx(keyspace, key, *values):
+    return _pushx(keyspace, key, values, collections.deque.extend)
+
+
+@command(b'LINSERT', 5)
+def _linsert(keyspace, key, where, pivot, value):
+    where = _option(where)
+    if where not in (b'BEFORE', b'AFTER'):
+        raise ReplyError("ERR syntax error")
+    key = _encode(key)
+    lst = keyspace.get(key, collections.deque)
+    if lst is None:
+        return 0
+    try:
+        index = lst.index(_encode(pivot))
+    except ValueError:
+        return -1
+    if where == b'AFTER':
+        index += 1
+    lst.insert(index, _encode(value))
+    keyspace.changed(key)
+    return len(lst)
+
+
+@command(b'LPOP', 2)
+def _lpop(keyspace, key):
+    key = _encode(key)
+    lst = keyspace.get(key, collections.deque)
+    if not lst:
+        return None
+    ret = lst.popleft()
+    keyspace.changed(key)
+    return ret
+
+
+@command(b'RPOP', 2)
+def _rpop(keyspace, key):
+    key = _encode(key)
+    lst = keyspace.get(key, collections.deque)
+    if not lst:
+        return None
+    ret = lst.pop()
+    keyspace.changed(key)
+    return ret
+
+
+@command(b'LRANGE', 4)
+def _lrange(keyspace, key, start, stop):
+    lst = keyspace.get(_encode(key), collections.deque) or ()
+    idx = _translate_range(len(lst), _int_arg(start), _int_arg(stop))
+    return list(itertools.islice(lst, idx.start, idx.stop))
+
+
+@command(b'LTRIM', 4)
+def _ltrim(keyspace, key, start, stop):
+    key = _encode(key)
+    start = _int_arg(start)
+    stop = _int_arg(stop)
+    lst = keyspace.get(key, collections.deque)
+    if lst is None:
+        return b'OK'
+
+    idx = _translate_range(len(lst), start, stop)
+    if len(idx) < len(lst) // 2:
+        kept = list(itertools.islice(lst, idx.start, idx.stop))
+        lst.clear()
+        lst.extend(kept)
+    else:
+        # drop values off the ends, so capping a list that grew by a few
+        # values costs only as much as the values removed
+        for _ in range(len(lst) - idx.stop):
+            lst.pop()
+        for _ in range(idx.start):
+            lst.popleft()
+    keyspace.changed(key)
+    return b'OK'
+
+
+@command(b'LREM', 4)
+def _lrem(keyspace, key, count, value):
+    key = _encode(key)
+    count = _int_arg(count)
+    value = _encode(value)
+    lst = keyspace.get(key, collections.deque)
+    if not lst or value not in lst:
+        return 0
+
+    if count == 0:
+        kept = [item for item in lst if item != value]
+    else:
+        kept = []
+        left = abs(count)
+        for item in (lst if count > 0 else reversed(lst)):
+            if left and item == value:
+                left -= 1
+            else:
+                kept.append(item)
+        if count < 0:
+            kept.reverse()
+    removed = len(lst) - len(kept)
+    lst.clear()
+    lst.extend(kept)
+    keyspace.changed(key)
+    return removed
+
+
+def _lpos_args(args):
+    rank = 1
+    count = None
+    maxlen = 0
+    if len(args) % 2:
+        raise ReplyError("ERR syntax error")
+    for option, value in zip(args[::2], args[1::2]):
+        option = _option(option)
+        value = _int_arg(value)
+        if option == b'RANK':
+            if value == 0:
+                raise ReplyError(
+                    "ERR RANK can't be zero: use 1 to start from the first match, "
+                    "2 from the second ... or use negative to start from the last "
+                    "match going forward.")
+            rank = value
+        elif option == b'COUNT':
+            if value < 0:
+                raise ReplyError("ERR COUNT can't be negative")
+            count = value
+        elif option == b'MAXLEN':
+            if value < 0:
+                raise ReplyError("ERR MAXLEN can't be negative")
+            maxlen = value
+        else:
+            raise ReplyError("ERR syntax error")
+    return rank, count, maxlen
+
+
+@command(b'LPOS', -3)
+def _lpos(keyspace, key, element, *args):
+    rank, count, maxlen = _lpos_args(args)
+    element = _encode(element)
+    lst = keyspace.get(_encode(key), collections.deque) or collections.deque()
+    if rank == 1 and count is None and not maxlen:
+        try:
+            return lst.index(element)
+        except ValueError:
+            return None
+
+    if rank > 0:
+        indices = range(len(lst))
+        items = lst
+    else:
+        indices = range(len(lst) - 1, -1, -1)
+        items = reversed(lst)
+    if maxlen:
+        indices = indices[:maxlen]
+    skip = abs(rank) - 1
+    matches = []
+    for index, item in zip(indices, items):
+        if item != element:
+            continue
+        if skip:
+            skip -= 1
+            continue
+        matches.append(index)
+        if count is None or len(matches) == count:
+            break
+
+    if count is None:
+        return matches[0] if matches else None
+    return matches
+
+
+@command(b'RPOPLPUSH', 3)
+def _rpoplpush(keyspace, sourcekey, destkey):
+    sourcekey = _encode(sourcekey)
+    destkey = _encode(destkey)
+    source = keyspace.get(sourcekey, collections.deque)
+    # check the destination type before modifying anything
+    keyspace.get(destkey, collections.deque)
+    if not source:
+        return None
+
+    ret = source.pop()
+    keyspace.changed(sourcekey)
+    keyspace.get_or_create(destkey, collections.deque).appendleft(ret)
+    return ret
+
+
+@command(b'LSET', 4)
+def _lset(keyspace, key, index, value):
+    key = _encode(key)
+    index = _int_arg(index)
+    lst = keyspace.get(key, collections.deque)
+    if lst is None:
+        raise ReplyError("ERR no such key")
+    try:
+        lst[index] = _encode(value)
+    except IndexError:
+        raise ReplyError("ERR index out of range") from None
+    keyspace.changed(key)
+    return b'OK'
+
+
+# Blocking pops
+#
+# If none of the keys holds a list, the handlers return a Blocked with the
+# function that pops from a key once it got created, see Keyspace.block().
+
+def _timeout_arg(timeout):
+    timeout = _float_arg(timeout, "ERR timeout is not a float or out of range")
+    if timeout < 0:
+        raise ReplyError("ERR timeout is negative")
+    return timeout
+
+
+def _pop_head(keyspace, key):
+    value = _lpop(keyspace, key)
+    return None if value is None else [key, value]
+
+
+def _pop_tail(keyspace, key):
+    value = _rpop(keyspace, key)
+    return None if value is None else [key, value]
+
+
+def _blocking_pop(keyspace, pop, args):
+    keys = list(map(_encode, args[:-1]))
+    timeout = _timeout_arg(args[-1])
+    for key in keys:
+        reply = pop(keyspace, key)
+        if reply is not None:
+            return reply
+    return Blocked(keys, pop, timeout)
+
+
+@command(b'BLPOP', -3)
+def _blpop(keyspace, *args):
+    return _blocking_pop(keyspace, _pop_head, args)
+
+
+@command(b'BRPOP', -3)
+def _brpop(keyspace, *args):
+    return _blocking_pop(keyspace, _pop_tail, args)
+
+
+@command(b'BRPOPLPUSH', 4)
+def _brpoplpush(keyspace, sourcekey, destkey, timeout):
+    sourcekey = _encode(sourcekey)
+    destkey = _encode(destkey)
+    timeout = _timeout_arg(timeout)
+    reply = _rpoplpush(keyspace, sourcekey, destkey)
+    if reply is not None:
+        return reply
+    return Blocked([sourcekey], lambda keyspace, key: _rpoplpush(keyspace, key, destkey),
+                   timeout)
 
-from mockaioredis.util import _NOTSET
 
 class ListCommandsMixin:
     '''List commands mixin
@@ -8,93 +321,143 @@ class ListCommandsMixin:
     Run (some) of the Redis list commands
     '''
 
-    async def lindex(self, key, idx, *, encoding=_NOTSET):
-        """Get an element from the list by index."""
-        if encoding == _NOTSET:
-            encoding = self._encoding
+    async def blpop(self, key, *keys, timeout=0, encoding=_NOTSET):
+        """Remove and get the first element in a list, or block until
+        one is available.
 
-        ret = self._redis.lindex(key, idx)
-
-        if encoding is None:
-            return ret
+        :raises TypeError: if timeout is not int
+        :raises ValueError: if timeout is less than 0
+        """
+        if not isinstance(timeout, int):
+            raise TypeError("timeout argument must be int")
+        if timeout < 0:
+            raise ValueError("timeout must be greater equal 0")
+        return await self.execute(b'BLPOP', key, *keys, timeout, encoding=encoding)
+
+    async def brpop(self, key, *keys, timeout=0, encoding=_NOTSET):
+        """Remove and get the last element in a list, or block until one
+        is available.
+
+        :raises TypeError: if timeout is not int
+        :raises ValueError: if timeout is less than 0
+        """
+        if not isinstance(timeout, int):
+            raise TypeError("timeout argument must be int")
+        if timeout < 0:
+            raise ValueError("timeout must be greater equal 0")
+        return await self.execute(b'BRPOP', key, *keys, timeout, encoding=encoding)
+
+    async def brpoplpush(self, sourcekey, destkey, timeout=0, encoding=_NOTSET):
+        """Remove the last element of a list and push it onto another
+        list, or block until one is available.
+
+        :raises TypeError: if timeout is not int
+        :raises ValueError: if timeout is less than 0
+        """
+        if not isinstance(timeout, int):
+            raise TypeError("timeout argument must be int")
+        if timeout < 0:
+            raise ValueError("timeout must be greater equal 0")
+        return await self.execute(b'BRPOPLPUSH', sourcekey, destkey, timeout,
+                                  encoding=encoding)
 
-        return ret.decode(encoding)
+    async def lindex(self, key, idx, *, encoding=_NOTSET):
+        """Get an element from the list by index."""
+        if not isinstance(idx, int):
+            raise TypeError("index argument must be int")
+        return self._execute(b'LINDEX', key, idx, encoding=encoding)
 
     async def llen(self, key):
         '''Returns the length of the list stored at key'''
-        return self._redis.llen(key)
-
+        return self._execute(b'LLEN', key)
 
     async def lpush(self, key, value, *values):
         '''Insert specified values at the head of the list'''
-        return self._redis.lpush(key, value, *values)
-
+        return self._execute(b'LPUSH', key, value, *values)
 
-    async def lpop(self, key, *, encoding=_NOTSET):
-        '''Pop a value off the head of the list'''
-        if encoding == _NOTSET:
-            encoding = self._encoding
+    async def lpushx(self, key, value, *values):
+        '''Insert values at the head of the list, only if the list exists'''
+        return self._execute(b'LPUSHX', key, value, *values)
 
-        ret = self._redis.lpop(key)
+    async def linsert(self, key, pivot, value, before=False):
+        """Inserts value in the list stored at key either before or
+        after the reference value pivot.
+        """
+        where = b'AFTER' if not before else b'BEFORE'
+        return self._execute(b'LINSERT', key, where, pivot, value)
 
-        if encoding is None:
-            return ret
+    async def lpos(self, key, element, *, rank=None, count=None, maxlen=None):
+        """Return the index of matching elements inside a list.
 
-        return ret.decode(encoding)
+        Returns a list of indices if count is given, 0 meaning all matches.
+        """
+        args = []
+        if rank is not None:
+            args += [b'RANK', rank]
+        if count is not None:
+            args += [b'COUNT', count]
+        if maxlen is not None:
+            args += [b'MAXLEN', maxlen]
+        return self._execute(b'LPOS', key, element, *args)
 
+    async def lpop(self, key, *, encoding=_NOTSET):
+        '''Pop a value off the head of the list'''
+        return self._execute(b'LPOP', key, encoding=encoding)
 
     async def rpush(self, key, value, *values):
         '''Insert specified values at the tail of the list'''
-        return self._redis.rpush(key, value, *values)
+        return self._execute(b'RPUSH', key, value, *values)
 
+    async def rpushx(self, key, value, *values):
+        '''Insert values at the tail of the list, only if the list exists'''
+        return self._execute(b'RPUSHX', key, value, *values)
 
     async def rpop(self, key, *, encoding=_NOTSET):
         '''Pop a value off the tail of the list'''
-        if encoding == _NOTSET:
-            encoding = self._encoding
-
-        ret = self._redis.rpop(key)
-
-        if encoding is None:
-            return ret
-
-        return ret.decode(encoding)
+        return self._execute(b'RPOP', key, encoding=encoding)
 
     async def lrange(self, key, start, stop, *, encoding=_NOTSET):
         """Returns the specified elements of the list stored at key.
 
         :raises TypeError: if start or stop is not int
         """
-        if encoding == _NOTSET:
-            encoding = self._encoding
-
         if not isinstance(start, int):
             raise TypeError("start is not of type int")
         if not isinstance(stop, int):
             raise TypeError("stop is not of type int")
+        return self._execute(b'LRANGE', key, start, stop, encoding=encoding)
+
+    async def lrem(self, key, count, value):
+        """Removes the first count occurrences of elements equal to value
+        from the list stored at key.
 
-        ret = self._redis.lrange(key, start, stop)
+        :raises TypeError: if count is not int
+        """
+        if not isinstance(count, int):
+            raise TypeError("count argument must be int")
+        return self._execute(b'LREM', key, count, value)
 
-        if encoding is None:
-            return ret
+    async def ltrim(self, key, start, stop):
+        """Trim an existing list so that it will contain only the specified
+        range of elements specified.
 
-        return list(map(lambda x: x.decode(encoding), ret))
+        :raises TypeError: if start or stop is not int
+        """
+        if not isinstance(start, int):
+            raise TypeError("start argument must be int")
+        if not isinstance(stop, int):
+            raise TypeError("stop argument must be int")
+        return self._execute(b'LTRIM', key, start, stop, encoding=None) == b'OK'
 
     async def rpoplpush(self, sourcekey, destkey, *, encoding=_NOTSET):
         """Atomically returns and removes the last element (tail) of the
         list stored at source, and pushes the element at the first element
         (head) of the list stored at destination.
         """
-        if encoding == _NOTSET:
-            encoding = self._encoding
-
-        ret = self._redis.rpoplpush(sourcekey, destkey)
-
-        if encoding is None:
-            return ret
-
-        return ret.decode(encoding)
+        return self._execute(b'RPOPLPUSH', sourcekey, destkey, encoding=encoding)
 
     async def lset(self, key, idx, value):
         """Sets the list element at index to value"""
-        return self._redis.lset(key, idx, value)
+        if not isinstance(idx, int):
+            raise TypeError("index argument must be int")
+        return self._execute(b'LSET', key, idx, value, encoding=None) == b'OK'
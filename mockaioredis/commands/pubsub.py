@@ -0,0 +1,159 @@
+'Pub/Sub commands'
+import json
+import types
+
+from aioredis.abc import AbcChannel
+from aioredis.errors import ReplyError
+
+from mockaioredis.pubsub import Channel
+from mockaioredis.registry import command
+from mockaioredis.util import _NOTSET, _encode, _option
+
+
+@command(b'PUBLISH', 3)
+def _publish(keyspace, channel, message):
+    return keyspace.broker.publish(_encode(channel), _encode(message))
+
+
+@command(b'PUBSUB', -2)
+def _pubsub(keyspace, subcommand, *args):
+    subcommand = _option(subcommand)
+    broker = keyspace.broker
+    if subcommand == b'CHANNELS' and len(args) <= 1:
+        return broker.channels(*map(_encode, args))
+    if subcommand == b'NUMSUB':
+        return [item for name in map(_encode, args)
+                for item in (name, broker.numsub(name))]
+    if subcommand == b'NUMPAT' and not args:
+        return broker.numpat()
+    raise ReplyError("ERR Unknown subcommand or wrong number of arguments for '{}'. "
+                     "Try PUBSUB HELP.".format(subcommand.decode(errors='replace')))
+
+
+class PubSubCommandsMixin:
+    '''Pub/Sub commands mixin
+
+    Subscriptions are delivered by the broker of the keyspace, to the
+    same Channel objects aioredis uses.
+    '''
+
+    async def publish(self, channel, message):
+        """Post a message to channel."""
+        return self._execute(b'PUBLISH', channel, message)
+
+    async def publish_json(self, channel, obj):
+        """Post a JSON-encoded message to channel."""
+        return await self.publish(channel, json.dumps(obj))
+
+    async def subscribe(self, channel, *channels):
+        """Subscribe to specified channels.
+
+        Arguments can be instances of :class:`~aioredis.Channel`.
+        Returns a list of :class:`~aioredis.Channel` objects.
+        """
+        return self._subscribe(False, (channel,) + channels)
+
+    async def unsubscribe(self, channel, *channels):
+        """Unsubscribe from specific channels.
+
+        Arguments can be instances of :class:`~aioredis.Channel`.
+        """
+        return self._unsubscribe(False, (channel,) + channels)
+
+    async def psubscribe(self, pattern, *patterns):
+        """Subscribe to specified patterns.
+
+        Arguments can be instances of :class:`~aioredis.Channel`.
+        Returns a list of :class:`~aioredis.Channel` objects with
+        ``is_pattern`` property set to ``True``.
+        """
+        return self._subscribe(True, (pattern,) + patterns)
+
+    async def punsubscribe(self, pattern, *patterns):
+        """Unsubscribe from specific patterns.
+
+        Arguments can be instances of :class:`~aioredis.Channel`.
+        """
+        return self._unsubscribe(True, (pattern,) + patterns)
+
+    async def pubsub_channels(self, pattern=None, *, encoding=_NOTSET):
+        """Lists the currently active channels."""
+        args = [b'CHANNELS']
+        if pattern is not None:
+            args.append(pattern)
+        return self._execute(b'PUBSUB', *args, encoding=encoding)
+
+    async def pubsub_numsub(self, *channels):
+        """Returns the number of subscribers for the specified channels."""
+        it = iter(self._execute(b'PUBSUB', b'NUMSUB', *channels))
+        return dict(zip(it, it))
+
+    async def pubsub_numpat(self):
+        """Returns the number of subscriptions to patterns."""
+        return self._execute(b'PUBSUB', b'NUMPAT')
+
+    @property
+    def channels(self):
+        """Returns read-only channels dict."""
+        return types.MappingProxyType(self._pubsub_channels)
+
+    @property
+    def patterns(self):
+        """Returns read-only patterns dict."""
+        return types.MappingProxyType(self._pubsub_patterns)
+
+    @property
+    def in_pubsub(self):
+        """Provides the number of subscribed channels and patterns."""
+        return len(self._pubsub_channels) + len(self._pubsub_patterns)
+
+    def _subscribe(self, is_pattern, channels):
+        if None in channels:
+            raise TypeError("args must not contain None")
+        channels = [ch if isinstance(ch, AbcChannel) else Channel(ch, is_pattern)
+                    for ch in channels]
+        if not all(ch.is_pattern == is_pattern for ch in channels):
+            raise ValueError("Not all channels {} match command {}".format(
+                channels, 'PSUBSCRIBE' if is_pattern else 'SUBSCRIBE'))
+
+        broker = self._keyspace.broker
+        if is_pattern:
+            owner, subscribe = self._pubsub_patterns, broker.psubscribe
+        else:
+            owner, subscribe = self._pubsub_channels, broker.subscribe
+        ret = []
+        for ch in channels:
+            # like aioredis, subscribing to a name twice keeps the first channel
+            current = owner.get(ch.name)
+            if current is None:
+                current = owner[ch.name] = ch
+                subscribe(ch.name, ch, owner)
+            ret.append(current)
+        return ret
+
+    def _unsubscribe(self, is_pattern, channels):
+        if None in channels:
+            raise TypeError("args must not contain None")
+        broker = self._keyspace.broker
+        if is_pattern:
+            owner, unsubscribe, kind = (self._pubsub_patterns, broker.punsubscribe,
+                                        b'punsubscribe')
+        else:
+            owner, unsubscribe, kind = (self._pubsub_channels, broker.unsubscribe,
+                                        b'unsubscribe')
+        ret = []
+        for ch in channels:
+            name = ch.name if isinstance(ch, AbcChannel) else _encode(ch)
+            current = owner.pop(name, None)
+            if current is not None:
+                unsubscribe(name, current)
+                current.close()
+            ret.append([kind, name, self.in_pubsub])
+        return ret
+
+    def _unsubscribe_all(self):
+        '''Drop all subscriptions, when the client is closed'''
+        if self._pubsub_channels:
+            self._unsubscribe(False, list(self._pubsub_channels))
+        if self._pubsub_patterns:
+            self._unsubscribe(True, list(self._pubsub_patterns))
@@ -0,0 +1,84 @@
+'Scripting commands'
+from aioredis.errors import ReplyError
+
+from mockaioredis.registry import command
+from mockaioredis.scripting import run_script
+from mockaioredis.util import _NOTSET, _encode, _int_arg, _option
+
+
+def _split_keys(numkeys, args):
+    numkeys = _int_arg(numkeys)
+    if numkeys < 0:
+        raise ReplyError("ERR Number of keys can't be negative")
+    if numkeys > len(args):
+        raise ReplyError("ERR Number of keys can't be greater than number of args")
+    return args[:numkeys], args[numkeys:]
+
+
+@command(b'EVAL', -3)
+def _eval(keyspace, script, numkeys, *args):
+    keys, args = _split_keys(numkeys, args)
+    _, handler = keyspace.scripts.load(script)
+    return run_script(keyspace, handler, keys, args)
+
+
+@command(b'EVALSHA', -3)
+def _evalsha(keyspace, sha, numkeys, *args):
+    keys, args = _split_keys(numkeys, args)
+    handler = keyspace.scripts.get(_encode(sha))
+    if handler is None:
+        raise ReplyError("NOSCRIPT No matching script. Please use EVAL.")
+    return run_script(keyspace, handler, keys, args)
+
+
+@command(b'SCRIPT', -2)
+def _script(keyspace, subcommand, *args):
+    subcommand = _option(subcommand)
+    scripts = keyspace.scripts
+    if subcommand == b'LOAD' and len(args) == 1:
+        sha, _ = scripts.load(args[0])
+        return sha
+    if subcommand == b'EXISTS' and args:
+        return [int(_encode(sha) in scripts) for sha in args]
+    if subcommand == b'FLUSH' and len(args) <= 1:
+        if args and _option(args[0]) not in (b'ASYNC', b'SYNC'):
+            raise ReplyError("ERR SCRIPT FLUSH only support SYNC|ASYNC option")
+        scripts.flush()
+        return b'OK'
+    if subcommand == b'KILL' and not args:
+        # scripts run to completion before anything else can run
+        raise ReplyError("NOTBUSY No scripts in execution right now.")
+    raise ReplyError("ERR Unknown subcommand or wrong number of arguments for '{}'. "
+                     "Try SCRIPT HELP.".format(subcommand.decode(errors='replace')))
+
+
+class ScriptingCommandsMixin:
+    '''Scripting commands mixin
+
+    Scripts run the Python handlers registered for them with
+    mockaioredis.register_script()
+    '''
+
+    async def eval(self, script, keys=[], args=[], *, encoding=_NOTSET):
+        """Execute a Lua script server side."""
+        return self._execute(b'EVAL', script, len(keys), *keys, *args, encoding=encoding)
+
+    async def evalsha(self, digest, keys=[], args=[], *, encoding=_NOTSET):
+        """Execute a Lua script server side by its SHA1 digest."""
+        return self._execute(b'EVALSHA', digest, len(keys), *keys, *args, encoding=encoding)
+
+    async def script_exists(self, digest, *digests):
+        """Check existence of scripts in the script cache."""
+        return self._execute(b'SCRIPT', b'EXISTS', digest, *digests)
+
+    async def script_kill(self):
+        """Kill the script currently in execution."""
+        return self._execute(b'SCRIPT', b'KILL', encoding=None) == b'OK'
+
+    async def script_flush(self):
+        """Remove all the scripts from the script cache."""
+        return self._execute(b'SCRIPT', b'FLUSH', encoding=None) == b'OK'
+
+    async def script_load(self, script):
+        """Load the specified Lua script into the script cache."""
+        return self._execute(b'SCRIPT', b'LOAD', script)
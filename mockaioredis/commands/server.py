@@ -0,0 +1,78 @@
+'Server commands'
+from aioredis.commands.server import parse_info
+from aioredis.errors import ReplyError
+
+from mockaioredis import memory
+from mockaioredis.registry import command
+from mockaioredis.util import _encode, _int_arg, _option
+
+# INFO sections that include the memory section, the only one there is
+_MEMORY_SECTIONS = frozenset((b'MEMORY', b'DEFAULT', b'ALL', b'EVERYTHING'))
+
+
+def _memory_section(stats):
+    lines = ['# Memory']
+    for field in ('used_memory', 'used_memory_peak'):
+        value = getattr(stats, field)
+        lines.append('{}:{}'.format(field, value))
+        lines.append('{}_human:{}'.format(field, memory.human(value)))
+    lines.append('used_memory_overhead:{}'.format(stats.used_memory_overhead))
+    lines.append('used_memory_dataset:{}'.format(stats.used_memory_dataset))
+    return '\r\n'.join(lines) + '\r\n'
+
+
+@command(b'INFO', -1)
+def _info(keyspace, *sections):
+    sections = {_option(section) for section in sections} or {b'DEFAULT'}
+    if sections.isdisjoint(_MEMORY_SECTIONS):
+        return b''
+    return _memory_section(keyspace.memory_stats()).encode()
+
+
+@command(b'MEMORY', -2)
+def _memory(keyspace, subcommand, *args):
+    subcommand = _option(subcommand)
+    if subcommand == b'USAGE' and args:
+        key, *options = args
+        samples = memory.DEFAULT_SAMPLES
+        if options:
+            if len(options) != 2 or _option(options[0]) != b'SAMPLES':
+                raise ReplyError("ERR syntax error")
+            samples = _int_arg(options[1])
+            if samples < 0:
+                raise ReplyError("ERR syntax error")
+        return keyspace.memory_usage(_encode(key), samples)
+    raise ReplyError("ERR Unknown subcommand or wrong number of arguments for '{}'. "
+                     "Try MEMORY HELP.".format(subcommand.decode(errors='replace')))
+
+
+class ServerCommandsMixin:
+    '''Server commands mixin
+
+    Report the estimated memory usage of the keyspace, see
+    mockaioredis.memory
+    '''
+
+    async def info(self, section='default'):
+        """Get information and statistics about the server.
+
+        Only the memory section is supported, for the database of this
+        client.
+
+        :raises ValueError: if section is invalid
+        """
+        if not section:
+            raise ValueError("invalid section")
+        reply = self._execute(b'INFO', section, encoding='utf-8')
+        return parse_info(reply) if reply else {}
+
+    async def memory_usage(self, key, *, samples=None):
+        """Return the number of bytes key and its value take in memory,
+        or None if the key does not exist.
+        """
+        args = [] if samples is None else [b'SAMPLES', samples]
+        return self._execute(b'MEMORY', b'USAGE', key, *args)
+
+    def memory_stats(self):
+        """Return the mockaioredis.MemoryStats of the keyspace."""
+        return self._keyspace.memory_stats()
@@ -1,117 +1,351 @@
+import itertools
+
 from aioredis.errors import ReplyError
 
-from mockaioredis.util import _NOTSET, _decode_item, _decode_items, _ScanIter
+from mockaioredis.indexedset import IndexedSet
+from mockaioredis.registry import command
+from mockaioredis.util import (
+    _NOTSET,
+    _encode,
+    _int_arg,
+    _irange_sorted,
+    _option,
+    _scan_args,
+    _scan_page,
+    _ScanIter,
+)
+
+
+def _sets(keyspace, keys):
+    """Return the sets stored at keys, treating missing keys as empty"""
+    return [keyspace.get(_encode(key), IndexedSet) or () for key in keys]
+
+
+def _store_set(keyspace, destkey, members):
+    """Replace destkey with the IndexedSet members, return its size"""
+    destkey = _encode(destkey)
+    if members:
+        keyspace.set(destkey, members)
+    else:
+        keyspace.delete(destkey)
+    return len(members)
+
+
+# Set algebra
+#
+# Every operation is planned by the sizes of its inputs: intersections
+# walk the smallest set and look its members up in the others, so
+# intersecting 10 members with a million costs 10 lookups. The *STORE
+# variants fill an IndexedSet directly instead of going through a list.
+
+def _inter(sets):
+    """Iterate over the members of all sets, smallest set first"""
+    if not sets or not all(sets):
+        return iter(())
+    smallest, *others = sorted(sets, key=len)
+    if not others:
+        return iter(smallest)
+    if len(others) == 1:
+        other = others[0]
+        return (member for member in smallest if member in other)
+    return (member for member in smallest
+            if all(member in other for other in others))
+
+
+def _diff(first, others):
+    """Return the members of first that are in none of others"""
+    others = [other for other in others if other]
+    if not first or not others:
+        return IndexedSet(first)
+    if len(first) * len(others) <= sum(map(len, others)):
+        # look every member of first up in the others, largest first
+        # since those are the most likely to contain it
+        others.sort(key=len, reverse=True)
+        return IndexedSet(member for member in first
+                          if not any(member in other for other in others))
+    # the others are small, so copying first and removing them is cheaper
+    result = IndexedSet(first)
+    for other in others:
+        result.difference_update(other)
+        if not result:
+            break
+    return result
+
+
+def _union(sets):
+    """Return the union of sets, copying the largest and adding the others"""
+    sets = sorted(sets, key=len, reverse=True)
+    result = IndexedSet(sets[0] if sets else ())
+    for other in sets[1:]:
+        result.update(other)
+    return result
+
+
+@command(b'SDIFF', -2)
+def _sdiff(keyspace, *keys):
+    first, *others = _sets(keyspace, keys)
+    return list(_diff(first, others))
+
+
+@command(b'SDIFFSTORE', -3)
+def _sdiffstore(keyspace, destkey, *keys):
+    first, *others = _sets(keyspace, keys)
+    return _store_set(keyspace, destkey, _diff(first, others))
+
+
+@command(b'SINTER', -2)
+def _sinter(keyspace, *keys):
+    return list(_inter(_sets(keyspace, keys)))
+
+
+@command(b'SINTERSTORE', -3)
+def _sinterstore(keyspace, destkey, *keys):
+    return _store_set(keyspace, destkey, IndexedSet(_inter(_sets(keyspace, keys))))
+
+
+@command(b'SINTERCARD', -3)
+def _sintercard(keyspace, numkeys, *args):
+    numkeys = _int_arg(numkeys, "ERR numkeys should be greater than 0")
+    if numkeys <= 0:
+        raise ReplyError("ERR numkeys should be greater than 0")
+    if numkeys > len(args):
+        raise ReplyError("ERR Number of keys can't be greater than number of args")
+    keys, args = args[:numkeys], args[numkeys:]
+    limit = 0
+    if args:
+        if len(args) != 2 or _option(args[0]) != b'LIMIT':
+            raise ReplyError("ERR syntax error")
+        limit = _int_arg(args[1], "ERR LIMIT can't be negative")
+        if limit < 0:
+            raise ReplyError("ERR LIMIT can't be negative")
+
+    members = _inter(_sets(keyspace, keys))
+    if limit:
+        members = itertools.islice(members, limit)
+    return sum(1 for _ in members)
+
+
+@command(b'SADD', -3)
+def _sadd(keyspace, key, *values):
+    key = _encode(key)
+    members = keyspace.get(key, IndexedSet)
+    if members is None:
+        members = keyspace.get_or_create(key, IndexedSet)
+        members.update(map(_encode, values))
+        return len(members)
+    before = len(members)
+    members.update(map(_encode, values))
+    added = len(members) - before
+    if added:
+        keyspace.changed(key)
+    return added
+
+
+@command(b'SCARD', 2)
+def _scard(keyspace, key):
+    return len(keyspace.get(_encode(key), IndexedSet) or ())
+
+
+@command(b'SISMEMBER', 3)
+def _sismember(keyspace, key, member):
+    members = keyspace.get(_encode(key), IndexedSet) or ()
+    return int(_encode(member) in members)
+
+
+@command(b'SMISMEMBER', -3)
+def _smismember(keyspace, key, *members):
+    current = keyspace.get(_encode(key), IndexedSet) or ()
+    return [int(member in current) for member in map(_encode, members)]
+
+
+@command(b'SMEMBERS', 2)
+def _smembers(keyspace, key):
+    return list(keyspace.get(_encode(key), IndexedSet) or ())
+
+
+@command(b'SMOVE', 4)
+def _smove(keyspace, sourcekey, destkey, member):
+    sourcekey = _encode(sourcekey)
+    destkey = _encode(destkey)
+    member = _encode(member)
+    source = keyspace.get(sourcekey, IndexedSet)
+    # check the destination type before modifying anything
+    keyspace.get(destkey, IndexedSet)
+    if source is None or member not in source:
+        return 0
+
+    source.remove(member)
+    keyspace.changed(sourcekey)
+    keyspace.get_or_create(destkey, IndexedSet).add(member)
+    return 1
+
+
+@command(b'SPOP', -2)
+def _spop(keyspace, key, *args):
+    if len(args) > 1:
+        raise ReplyError("ERR syntax error")
+    count = _int_arg(args[0]) if args else None
+    if count is not None and count < 0:
+        raise ReplyError("ERR index out of range")
+
+    key = _encode(key)
+    members = keyspace.get(key, IndexedSet)
+    if not members or count == 0:
+        return None if count is None else []
+
+    if count is None:
+        value = members.pop()
+    else:
+        value = members.pop_sample(count)
+    keyspace.changed(key)
+    return value
+
+
+@command(b'SRANDMEMBER', -2)
+def _srandmember(keyspace, key, *args):
+    if len(args) > 1:
+        raise ReplyError("ERR syntax error")
+    members = keyspace.get(_encode(key), IndexedSet)
+
+    if not args:
+        return members.choice() if members else None
+
+    count = _int_arg(args[0])
+    if count == 0 or not members:
+        return []
+    if count < 0:
+        # Allow duplicates
+        return members.choices(-count)
+    # Don't allow duplicates
+    return members.sample(count)
+
+
+@command(b'SREM', -3)
+def _srem(keyspace, key, *members):
+    key = _encode(key)
+    current = keyspace.get(key, IndexedSet)
+    if current is None:
+        return 0
+
+    before = len(current)
+    current.difference_update(map(_encode, members))
+    removed = before - len(current)
+    if removed:
+        keyspace.changed(key)
+    return removed
+
+
+@command(b'SUNION', -2)
+def _sunion(keyspace, *keys):
+    return list(_union(_sets(keyspace, keys)))
+
+
+@command(b'SUNIONSTORE', -3)
+def _sunionstore(keyspace, destkey, *keys):
+    return _store_set(keyspace, destkey, _union(_sets(keyspace, keys)))
+
+
+@command(b'SSCAN', -3)
+def _sscan(keyspace, key, cursor, *args):
+    cursor, match, count = _scan_args(cursor, args)
+    members = keyspace.sorted_members(_encode(key), IndexedSet)
+    cursor, members = _scan_page(_irange_sorted(members), cursor, match, count)
+    return [b'%d' % cursor, members]
 
 
 class SetCommandsMixin:
-    async def sadd(self, key, *values):
+
+    async def sadd(self, key, member, *members):
         """Add one or more members to a set."""
-        return self._redis.sadd(key, *values)
+        return self._execute(b'SADD', key, member, *members)
 
     async def scard(self, key):
         """Get the number of members in a set."""
-        return self._redis.scard(key)
+        return self._execute(b'SCARD', key)
 
     async def sdiff(self, key, *keys):
         """Subtract multiple sets."""
-        return list(self._redis.sdiff(key, *keys))
+        return self._execute(b'SDIFF', key, *keys)
 
     async def sdiffstore(self, destkey, key, *keys):
         """Subtract multiple sets and store the resulting set in a key."""
-        return self._redis.sdiffstore(destkey, key, *keys)
+        return self._execute(b'SDIFFSTORE', destkey, key, *keys)
 
     async def sinter(self, key, *keys):
         """Intersect multiple sets.
 
         Warning: order is not consistent with aioredis
         """
-        return list(self._redis.sinter(key, *keys))
+        return self._execute(b'SINTER', key, *keys)
 
     async def sinterstore(self, destkey, key, *keys):
         """Intersect multiple sets and store the resulting set in a key."""
-        return self._redis.sinterstore(destkey, key, *keys)
+        return self._execute(b'SINTERSTORE', destkey, key, *keys)
+
+    async def sintercard(self, key, *keys, limit=None):
+        """Return the size of the intersection of multiple sets.
+
+        Counting stops at limit, if given.
+        """
+        args = [len(keys) + 1, key, *keys]
+        if limit is not None:
+            args += [b'LIMIT', limit]
+        return self._execute(b'SINTERCARD', *args)
 
     async def sismember(self, key, member):
         """Determine if a given value is a member of a set."""
-        return self._redis.sismember(key, member)
+        return self._execute(b'SISMEMBER', key, member)
+
+    async def smismember(self, key, member, *members):
+        """Determine which of the given values are members of a set."""
+        return [bool(ret) for ret in self._execute(b'SMISMEMBER', key, member, *members)]
 
     async def smembers(self, key, *, encoding=_NOTSET):
         """Get all the members in a set.
 
         Warning: order is not consistent with aioredis
         """
-        if encoding == _NOTSET:
-            encoding = self._encoding
-
-        items = self._redis.smembers(key)
-        return list(_decode_items(items, encoding))
+        return self._execute(b'SMEMBERS', key, encoding=encoding)
 
     async def smove(self, sourcekey, destkey, member):
         """Move a member from one set to another."""
-        try:
-            return int(self._redis.smove(sourcekey, destkey, member))
-        except TypeError:
-            raise ReplyError("WRONGTYPE")
+        return self._execute(b'SMOVE', sourcekey, destkey, member)
 
     async def spop(self, key, count=None, *, encoding=_NOTSET):
         """Remove and return one or multiple random members from a set."""
-        if encoding == _NOTSET:
-            encoding = self._encoding
-
-        if count is None:
-            value = self._redis.spop(key)
-            return _decode_item(value, encoding)
-
-        if count == 0:
-            return []
-        if count < 0:
-            raise ReplyError("ERR index out of range")
-
-        total = len(self._redis.smembers(key))
-        count = min(count, total)
-        values = (self._redis.spop(key) for _ in range(count))
-        return list(_decode_items(values, encoding))
+        args = [key]
+        if count is not None:
+            args.append(count)
+        return self._execute(b'SPOP', *args, encoding=encoding)
 
     async def srandmember(self, key, count=None, *, encoding=_NOTSET):
         """Get one or multiple random members from a set."""
-        if encoding == _NOTSET:
-            encoding = self._encoding
-
-        if count is None:
-            value = self._redis.srandmember(key)
-            return _decode_item(value, encoding)
-
-        if count == 0:
-            return []
-
-        if count < 0:
-            # Allow duplicates
-            count = -count
-            output = [self._redis.srandmember(key) for _ in range(count)]
-        else:
-            # Don't allow duplicates
-            original = self._redis.smembers(key)
-            count = min(count, len(original))
-            output = [self._redis.spop(key) for _ in range(count)]
-            self._redis.sadd(key, *original)
-
-        return list(_decode_items(output, encoding))
+        args = [key]
+        if count is not None:
+            args.append(count)
+        return self._execute(b'SRANDMEMBER', *args, encoding=encoding)
 
     async def srem(self, key, member, *members):
         """Remove one or more members from a set."""
-        return self._redis.srem(key, member, *members)
+        return self._execute(b'SREM', key, member, *members)
 
     async def sunion(self, key, *keys):
         """Add multiple sets."""
-        return self._redis.sunion(key, *keys)
+        return self._execute(b'SUNION', key, *keys)
 
     async def sunionstore(self, destkey, key, *keys):
         """Add multiple sets and store the resulting set in a key."""
-        return self._redis.sunionstore(destkey, key, *keys)
+        return self._execute(b'SUNIONSTORE', destkey, key, *keys)
 
     async def sscan(self, key, cursor=0, match=None, count=None):
         """Incrementally iterate Set elements."""
-        return list(self._redis.sscan(key, cursor, match, count))
+        args = [key, cursor]
+        if match is not None:
+            args += [b'MATCH', match]
+        if count is not None:
+            args += [b'COUNT', count]
+        cursor, members = self._execute(b'SSCAN', *args)
+        return int(cursor), members
 
     def isscan(self, key, *, match=None, count=None):
         """Incrementally iterate set elements using async for.
@@ -0,0 +1,684 @@
+'Sorted set commands'
+import math
+
+from aioredis.errors import ReplyError
+
+from mockaioredis.indexedset import IndexedSet
+from mockaioredis.registry import command
+from mockaioredis.sortedset import SortedSet
+from mockaioredis.util import (
+    _NOTSET,
+    _encode,
+    _float_arg,
+    _format_float,
+    _int_arg,
+    _irange_sorted,
+    _option,
+    _scan_args,
+    _scan_page,
+    _ScanIter,
+    _translate_range,
+)
+
+# min and max are shadowed by the argument names of the range commands
+_min = min
+_max = max
+
+
+def _int_or_float(value):
+    '''Convert a score reply the way aioredis does'''
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _pairs_int_or_float(values):
+    it = iter(values)
+    return [(member, _int_or_float(score)) for member, score in zip(it, it)]
+
+
+def _encode_min_max(flag, min, max):
+    if flag is SortedSetCommandsMixin.ZSET_EXCLUDE_MIN:
+        return '({}'.format(min), max
+    elif flag is SortedSetCommandsMixin.ZSET_EXCLUDE_MAX:
+        return min, '({}'.format(max)
+    elif flag is SortedSetCommandsMixin.ZSET_EXCLUDE_BOTH:
+        return '({}'.format(min), '({}'.format(max)
+    return min, max
+
+
+def _check_score(score):
+    if math.isnan(score):
+        raise ReplyError("ERR resulting score is not a number (NaN)")
+    return score
+
+
+def _score_bound(value):
+    '''Parse a score range boundary, return (score, exclusive)'''
+    value = _encode(value)
+    exclusive = value.startswith(b'(')
+    if exclusive:
+        value = value[1:]
+    return _float_arg(value, "ERR min or max is not a float"), exclusive
+
+
+def _zset(keyspace, key):
+    '''Return the sorted set at key, or an empty one'''
+    return keyspace.get(_encode(key), SortedSet) or SortedSet()
+
+
+def _score_range(zset, min, max):
+    low, exclude_low = _score_bound(min)
+    high, exclude_high = _score_bound(max)
+    return zset.score_range(low, high, exclude_low, exclude_high)
+
+
+def _range_options(args, limit):
+    '''Parse WITHSCORES and (if limit is set) LIMIT offset count'''
+    withscores = False
+    offset = count = None
+    i = 0
+    while i < len(args):
+        option = _option(args[i])
+        if option == b'WITHSCORES':
+            withscores = True
+            i += 1
+        elif limit and option == b'LIMIT' and i + 2 < len(args):
+            offset = _int_arg(args[i + 1])
+            count = _int_arg(args[i + 2])
+            i += 3
+        else:
+            raise ReplyError("ERR syntax error")
+    return withscores, offset, count
+
+
+def _format_range(pairs, withscores):
+    if not withscores:
+        return [member for _, member in pairs]
+    ret = []
+    for score, member in pairs:
+        ret.append(member)
+        ret.append(_format_float(score))
+    return ret
+
+
+@command(b'ZADD', -4)
+def _zadd(keyspace, key, *args):
+    exist = None
+    changed = incr = False
+    i = 0
+    while i < len(args):
+        option = _option(args[i])
+        if option in (b'NX', b'XX'):
+            if exist not in (None, option):
+                raise ReplyError("ERR XX and NX options at the same time are not compatible")
+            exist = option
+        elif option == b'CH':
+            changed = True
+        elif option == b'INCR':
+            incr = True
+        else:
+            break
+        i += 1
+    args = args[i:]
+    if not args or len(args) % 2:
+        raise ReplyError("ERR syntax error")
+    if incr and len(args) > 2:
+        raise ReplyError("ERR INCR option supports a single increment-element pair")
+    pairs = [(_float_arg(score), _encode(member))
+             for score, member in zip(args[::2], args[1::2])]
+
+    key = _encode(key)
+    zset = keyspace.get(key, SortedSet)
+    if incr:
+        score, member = pairs[0]
+        old = zset.score(member) if zset else None
+        if exist == b'XX' and old is None:
+            return None
+        if exist == b'NX' and old is not None:
+            return None
+        new = _check_score((old or 0) + score)
+        if new != old:
+            keyspace.get_or_create(key, SortedSet).add(member, new)
+        return _format_float(new)
+
+    if zset is None and exist == b'XX':
+        return 0
+    count = 0
+    modified = False
+    for score, member in pairs:
+        old = zset.score(member) if zset is not None else None
+        if exist == b'XX' and old is None:
+            continue
+        if exist == b'NX' and old is not None:
+            continue
+        if old is None or (changed and old != score):
+            count += 1
+        if old != score:
+            if zset is None:
+                zset = keyspace.get_or_create(key, SortedSet)
+            zset.add(member, score)
+            modified = True
+    # adding members with the scores they have doesn't count as a write
+    if modified:
+        keyspace.changed(key)
+    return count
+
+
+@command(b'ZCARD', 2)
+def _zcard(keyspace, key):
+    return len(_zset(keyspace, key))
+
+
+@command(b'ZCOUNT', 4)
+def _zcount(keyspace, key, min, max):
+    start, stop = _score_range(_zset(keyspace, key), min, max)
+    return stop - start
+
+
+@command(b'ZINCRBY', 4)
+def _zincrby(keyspace, key, increment, member):
+    increment = _float_arg(increment)
+    key = _encode(key)
+    member = _encode(member)
+    zset = keyspace.get(key, SortedSet)
+    old = zset.score(member) if zset else None
+    score = _check_score((old or 0) + increment)
+    if score != old:
+        keyspace.get_or_create(key, SortedSet).add(member, score)
+    return _format_float(score)
+
+
+@command(b'ZRANGE', -4)
+def _zrange(keyspace, key, start, stop, *args):
+    withscores, _, _ = _range_options(args, limit=False)
+    zset = _zset(keyspace, key)
+    idx = _translate_range(len(zset), _int_arg(start), _int_arg(stop))
+    return _format_range(zset.slice(idx.start, idx.stop), withscores)
+
+
+@command(b'ZREVRANGE', -4)
+def _zrevrange(keyspace, key, start, stop, *args):
+    withscores, _, _ = _range_options(args, limit=False)
+    zset = _zset(keyspace, key)
+    length = len(zset)
+    idx = _translate_range(length, _int_arg(start), _int_arg(stop))
+    pairs = zset.slice(length - idx.stop, length - idx.start)
+    pairs.reverse()
+    return _format_range(pairs, withscores)
+
+
+@command(b'ZRANGEBYSCORE', -4)
+def _zrangebyscore(keyspace, key, min, max, *args):
+    withscores, offset, count = _range_options(args, limit=True)
+    zset = _zset(keyspace, key)
+    start, stop = _score_range(zset, min, max)
+    if offset is not None:
+        if offset < 0:
+            return []
+        start = _min(start + offset, stop)
+        if count >= 0:
+            stop = _min(stop, start + count)
+    return _format_range(zset.slice(start, stop), withscores)
+
+
+@command(b'ZREVRANGEBYSCORE', -4)
+def _zrevrangebyscore(keyspace, key, max, min, *args):
+    withscores, offset, count = _range_options(args, limit=True)
+    zset = _zset(keyspace, key)
+    start, stop = _score_range(zset, min, max)
+    if offset is not None:
+        if offset < 0:
+            return []
+        stop = _max(stop - offset, start)
+        if count >= 0:
+            start = _max(start, stop - count)
+    pairs = zset.slice(start, stop)
+    pairs.reverse()
+    return _format_range(pairs, withscores)
+
+
+@command(b'ZRANK', 3)
+def _zrank(keyspace, key, member):
+    return _zset(keyspace, key).rank(_encode(member))
+
+
+@command(b'ZREVRANK', 3)
+def _zrevrank(keyspace, key, member):
+    zset = _zset(keyspace, key)
+    rank = zset.rank(_encode(member))
+    if rank is None:
+        return None
+    return len(zset) - 1 - rank
+
+
+@command(b'ZREM', -3)
+def _zrem(keyspace, key, *members):
+    key = _encode(key)
+    zset = keyspace.get(key, SortedSet)
+    if zset is None:
+        return 0
+    removed = sum(zset.discard(member) for member in map(_encode, members))
+    if removed:
+        keyspace.changed(key)
+    return removed
+
+
+@command(b'ZSCORE', 3)
+def _zscore(keyspace, key, member):
+    score = _zset(keyspace, key).score(_encode(member))
+    if score is None:
+        return None
+    return _format_float(score)
+
+
+def _zpop(keyspace, key, args, *, reverse):
+    if len(args) > 1:
+        raise ReplyError("ERR syntax error")
+    count = _int_arg(args[0]) if args else 1
+
+    key = _encode(key)
+    zset = keyspace.get(key, SortedSet)
+    if zset is None or count <= 0:
+        return []
+    if reverse:
+        pairs = zset.slice(_max(len(zset) - count, 0), len(zset))
+        pairs.reverse()
+    else:
+        pairs = zset.slice(0, count)
+    for _, member in pairs:
+        zset.discard(member)
+    keyspace.changed(key)
+    return _format_range(pairs, withscores=True)
+
+
+@command(b'ZPOPMIN', -2)
+def _zpopmin(keyspace, key, *args):
+    return _zpop(keyspace, key, args, reverse=False)
+
+
+@command(b'ZPOPMAX', -2)
+def _zpopmax(keyspace, key, *args):
+    return _zpop(keyspace, key, args, reverse=True)
+
+
+def _store_args(keyspace, numkeys, args):
+    '''Parse the arguments of ZINTERSTORE and ZUNIONSTORE
+
+    Returns a list of ({member: score}, weight) for the input keys and the
+    aggregate function. Plain sets can be used as sorted sets with all
+    scores 1.
+    '''
+    numkeys = _int_arg(numkeys)
+    if numkeys < 1:
+        raise ReplyError("ERR at least 1 input key is needed for ZUNIONSTORE/ZINTERSTORE")
+    if numkeys > len(args):
+        raise ReplyError("ERR syntax error")
+    keys, args = args[:numkeys], args[numkeys:]
+    weights = [1.0] * numkeys
+    func = _sum
+    i = 0
+    while i < len(args):
+        option = _option(args[i])
+        if option == b'WEIGHTS' and i + numkeys < len(args):
+            weights = [_float_arg(weight, "ERR weight value is not a float")
+                       for weight in args[i + 1:i + 1 + numkeys]]
+            i += 1 + numkeys
+        elif option == b'AGGREGATE' and i + 1 < len(args):
+            func = _AGGREGATES.get(_option(args[i + 1]))
+            if func is None:
+                raise ReplyError("ERR syntax error")
+            i += 2
+        else:
+            raise ReplyError("ERR syntax error")
+
+    inputs = []
+    for key, weight in zip(map(_encode, keys), weights):
+        value = keyspace.get(key)
+        if value is None:
+            scores = {}
+        elif isinstance(value, SortedSet):
+            scores = value.scores()
+        elif isinstance(value, IndexedSet):
+            scores = dict.fromkeys(value, 1.0)
+        else:
+            # raises the WRONGTYPE error
+            keyspace.get(key, SortedSet)
+        inputs.append((scores, weight))
+    return inputs, func
+
+
+# Like Redis, ZINTERSTORE and ZUNIONSTORE count the NaN of 0 * inf and
+# inf + -inf as 0 instead of failing
+
+def _weighted(score, weight):
+    score *= weight
+    return 0.0 if math.isnan(score) else score
+
+
+def _sum(a, b):
+    total = a + b
+    return 0.0 if math.isnan(total) else total
+
+
+_AGGREGATES = {b'SUM': _sum, b'MIN': min, b'MAX': max}
+
+
+def _store_zset(keyspace, destkey, scores):
+    destkey = _encode(destkey)
+    if scores:
+        keyspace.set(destkey, SortedSet(scores))
+    else:
+        keyspace.delete(destkey)
+    return len(scores)
+
+
+@command(b'ZINTERSTORE', -4)
+def _zinterstore(keyspace, destkey, numkeys, *args):
+    inputs, func = _store_args(keyspace, numkeys, args)
+    # only members of the smallest input can be in the intersection
+    inputs.sort(key=lambda item: len(item[0]))
+    (smallest, weight), others = inputs[0], inputs[1:]
+    result = {}
+    for member, score in smallest.items():
+        score = _weighted(score, weight)
+        for scores, weight_ in others:
+            other = scores.get(member)
+            if other is None:
+                break
+            score = func(score, _weighted(other, weight_))
+        else:
+            result[member] = score
+    return _store_zset(keyspace, destkey, result)
+
+
+@command(b'ZUNIONSTORE', -4)
+def _zunionstore(keyspace, destkey, numkeys, *args):
+    inputs, func = _store_args(keyspace, numkeys, args)
+    result = {}
+    for scores, weight in inputs:
+        for member, score in scores.items():
+            score = _weighted(score, weight)
+            old = result.get(member)
+            result[member] = score if old is None else func(old, score)
+    return _store_zset(keyspace, destkey, result)
+
+
+@command(b'ZSCAN', -3)
+def _zscan(keyspace, key, cursor, *args):
+    cursor, match, count = _scan_args(cursor, args)
+    key = _encode(key)
+    members = keyspace.sorted_members(key, SortedSet)
+    cursor, members = _scan_page(_irange_sorted(members), cursor, match, count)
+    zset = _zset(keyspace, key)
+    items = []
+    for member in members:
+        items.append(member)
+        items.append(_format_float(zset.score(member)))
+    return [b'%d' % cursor, items]
+
+
+class SortedSetCommandsMixin:
+    '''Sorted set commands mixin
+
+    Run (some) of the Redis sorted set commands
+    '''
+    ZSET_EXCLUDE_MIN = 'ZSET_EXCLUDE_MIN'
+    ZSET_EXCLUDE_MAX = 'ZSET_EXCLUDE_MAX'
+    ZSET_EXCLUDE_BOTH = 'ZSET_EXCLUDE_BOTH'
+
+    ZSET_AGGREGATE_SUM = 'ZSET_AGGREGATE_SUM'
+    ZSET_AGGREGATE_MIN = 'ZSET_AGGREGATE_MIN'
+    ZSET_AGGREGATE_MAX = 'ZSET_AGGREGATE_MAX'
+
+    ZSET_IF_NOT_EXIST = 'ZSET_IF_NOT_EXIST'  # NX
+    ZSET_IF_EXIST = 'ZSET_IF_EXIST'  # XX
+
+    @staticmethod
+    def _check_min_max(min, max):
+        if not isinstance(min, (int, float)):
+            raise TypeError("min argument must be int or float")
+        if not isinstance(max, (int, float)):
+            raise TypeError("max argument must be int or float")
+
+    @staticmethod
+    def _limit_args(offset, count):
+        if (offset is not None and count is None) or \
+                (count is not None and offset is None):
+            raise TypeError("offset and count must both be specified")
+        if offset is not None and not isinstance(offset, int):
+            raise TypeError("offset argument must be int")
+        if count is not None and not isinstance(count, int):
+            raise TypeError("count argument must be int")
+        if offset is not None:
+            return [b'LIMIT', offset, count]
+        return []
+
+    def _store_args(self, keys, with_weights, aggregate):
+        args = [len(keys)]
+        if with_weights:
+            assert all(isinstance(val, (list, tuple)) for val in keys), (
+                "All key arguments must be (key, weight) tuples")
+            weights = [b'WEIGHTS']
+            for key, weight in keys:
+                args.append(key)
+                weights.append(weight)
+            args.extend(weights)
+        else:
+            args.extend(keys)
+
+        if aggregate is self.ZSET_AGGREGATE_SUM:
+            args.extend((b'AGGREGATE', b'SUM'))
+        elif aggregate is self.ZSET_AGGREGATE_MAX:
+            args.extend((b'AGGREGATE', b'MAX'))
+        elif aggregate is self.ZSET_AGGREGATE_MIN:
+            args.extend((b'AGGREGATE', b'MIN'))
+        return args
+
+    async def zadd(self, key, score, member, *pairs, exist=None, changed=False,
+                   incr=False):
+        """Add one or more members to a sorted set or update its score.
+
+        :raises TypeError: score not int or float
+        :raises TypeError: length of pairs is not even number
+        """
+        if not isinstance(score, (int, float)):
+            raise TypeError("score argument must be int or float")
+        if len(pairs) % 2 != 0:
+            raise TypeError("length of pairs must be even number")
+        if any(not isinstance(s, (int, float)) for s in pairs[::2]):
+            raise TypeError("all scores must be int or float")
+
+        args = []
+        if exist is self.ZSET_IF_EXIST:
+            args.append(b'XX')
+        elif exist is self.ZSET_IF_NOT_EXIST:
+            args.append(b'NX')
+        if changed:
+            args.append(b'CH')
+        if incr:
+            if pairs:
+                raise ValueError('only one score-element pair '
+                                 'can be specified in this mode')
+            args.append(b'INCR')
+        return self._execute(b'ZADD', key, *args, score, member, *pairs)
+
+    async def zcard(self, key):
+        """Get the number of members in a sorted set."""
+        return self._execute(b'ZCARD', key)
+
+    async def zcount(self, key, min=float('-inf'), max=float('inf'),
+                     *, exclude=None):
+        """Count the members in a sorted set with scores
+        within the given values.
+
+        :raises TypeError: min or max is not float or int
+        :raises ValueError: if min greater than max
+        """
+        self._check_min_max(min, max)
+        if min > max:
+            raise ValueError("min could not be greater than max")
+        return self._execute(b'ZCOUNT', key, *_encode_min_max(exclude, min, max))
+
+    async def zincrby(self, key, increment, member):
+        """Increment the score of a member in a sorted set.
+
+        :raises TypeError: increment is not float or int
+        """
+        if not isinstance(increment, (int, float)):
+            raise TypeError("increment argument must be int or float")
+        return _int_or_float(self._execute(b'ZINCRBY', key, increment, member))
+
+    async def zrange(self, key, start=0, stop=-1, withscores=False,
+                     encoding=_NOTSET):
+        """Return a range of members in a sorted set, by index.
+
+        :raises TypeError: if start is not int
+        :raises TypeError: if stop is not int
+        """
+        if not isinstance(start, int):
+            raise TypeError("start argument must be int")
+        if not isinstance(stop, int):
+            raise TypeError("stop argument must be int")
+        args = [b'WITHSCORES'] if withscores else []
+        ret = self._execute(b'ZRANGE', key, start, stop, *args, encoding=encoding)
+        if withscores:
+            return _pairs_int_or_float(ret)
+        return ret
+
+    async def zrevrange(self, key, start, stop, withscores=False,
+                        encoding=_NOTSET):
+        """Return a range of members in a sorted set, by index,
+        with scores ordered from high to low.
+
+        :raises TypeError: if start or stop is not int
+        """
+        if not isinstance(start, int):
+            raise TypeError("start argument must be int")
+        if not isinstance(stop, int):
+            raise TypeError("stop argument must be int")
+        args = [b'WITHSCORES'] if withscores else []
+        ret = self._execute(b'ZREVRANGE', key, start, stop, *args, encoding=encoding)
+        if withscores:
+            return _pairs_int_or_float(ret)
+        return ret
+
+    async def zrangebyscore(self, key, min=float('-inf'), max=float('inf'),
+                            withscores=False, offset=None, count=None,
+                            *, exclude=None, encoding=_NOTSET):
+        """Return a range of members in a sorted set, by score.
+
+        :raises TypeError: if min or max is not float or int
+        :raises TypeError: if both offset and count are not specified
+        :raises TypeError: if offset is not int
+        :raises TypeError: if count is not int
+        """
+        self._check_min_max(min, max)
+        args = [b'WITHSCORES'] if withscores else []
+        args += self._limit_args(offset, count)
+        min, max = _encode_min_max(exclude, min, max)
+        ret = self._execute(b'ZRANGEBYSCORE', key, min, max, *args, encoding=encoding)
+        if withscores:
+            return _pairs_int_or_float(ret)
+        return ret
+
+    async def zrevrangebyscore(self, key, max=float('inf'), min=float('-inf'),
+                               *, exclude=None, withscores=False,
+                               offset=None, count=None, encoding=_NOTSET):
+        """Return a range of members in a sorted set, by score,
+        with scores ordered from high to low.
+
+        :raises TypeError: if min or max is not float or int
+        :raises TypeError: if both offset and count are not specified
+        :raises TypeError: if offset is not int
+        :raises TypeError: if count is not int
+        """
+        self._check_min_max(min, max)
+        args = [b'WITHSCORES'] if withscores else []
+        args += self._limit_args(offset, count)
+        min, max = _encode_min_max(exclude, min, max)
+        ret = self._execute(b'ZREVRANGEBYSCORE', key, max, min, *args, encoding=encoding)
+        if withscores:
+            return _pairs_int_or_float(ret)
+        return ret
+
+    async def zrank(self, key, member):
+        """Determine the index of a member in a sorted set."""
+        return self._execute(b'ZRANK', key, member)
+
+    async def zrevrank(self, key, member):
+        """Determine the index of a member in a sorted set, with
+        scores ordered from high to low.
+        """
+        return self._execute(b'ZREVRANK', key, member)
+
+    async def zrem(self, key, member, *members):
+        """Remove one or more members from a sorted set."""
+        return self._execute(b'ZREM', key, member, *members)
+
+    async def zscore(self, key, member):
+        """Get the score associated with the given member in a sorted set."""
+        score = self._execute(b'ZSCORE', key, member)
+        if score is None:
+            return None
+        return _int_or_float(score)
+
+    async def zpopmin(self, key, count=None, *, encoding=_NOTSET):
+        """Removes and returns up to count members with the lowest scores
+        in the sorted set stored at key.
+
+        :raises TypeError: if count is not int
+        """
+        if count is not None and not isinstance(count, int):
+            raise TypeError("count argument must be int")
+        args = [] if count is None else [count]
+        return self._execute(b'ZPOPMIN', key, *args, encoding=encoding)
+
+    async def zpopmax(self, key, count=None, *, encoding=_NOTSET):
+        """Removes and returns up to count members with the highest scores
+        in the sorted set stored at key.
+
+        :raises TypeError: if count is not int
+        """
+        if count is not None and not isinstance(count, int):
+            raise TypeError("count argument must be int")
+        args = [] if count is None else [count]
+        return self._execute(b'ZPOPMAX', key, *args, encoding=encoding)
+
+    async def zinterstore(self, destkey, key, *keys,
+                          with_weights=False, aggregate=None):
+        """Intersect multiple sorted sets and store result in a new key.
+
+        :param bool with_weights: when set to true each key must be a tuple
+                                  in form of (key, weight)
+        """
+        args = self._store_args((key,) + keys, with_weights, aggregate)
+        return self._execute(b'ZINTERSTORE', destkey, *args)
+
+    async def zunionstore(self, destkey, key, *keys,
+                          with_weights=False, aggregate=None):
+        """Add multiple sorted sets and store result in a new key."""
+        args = self._store_args((key,) + keys, with_weights, aggregate)
+        return self._execute(b'ZUNIONSTORE', destkey, *args)
+
+    async def zscan(self, key, cursor=0, match=None, count=None):
+        """Incrementally iterate sorted sets elements and associated scores."""
+        args = [key, cursor]
+        if match is not None:
+            args += [b'MATCH', match]
+        if count is not None:
+            args += [b'COUNT', count]
+        cursor, items = self._execute(b'ZSCAN', *args)
+        return int(cursor), _pairs_int_or_float(items)
+
+    def izscan(self, key, *, match=None, count=None):
+        """Incrementally iterate sorted set items using async for.
+
+        Usage example:
+
+        >>> async for val, score in redis.izscan(key, match='something*'):
+        ...     print('Matched:', val, ':', score)
+
+        """
+        return _ScanIter(lambda cur: self.zscan(key, cur, match=match, count=count))
@@ -0,0 +1,735 @@
+'Stream commands'
+import functools
+
+from aioredis.commands.streams import parse_messages, parse_messages_by_stream
+from aioredis.errors import ReplyError
+
+from mockaioredis.registry import Blocked, command
+from mockaioredis.stream import MAX_ID, ConsumerGroup, Stream
+from mockaioredis.util import _NOTSET, _encode, _int_arg, _option
+
+_MAX_PART = MAX_ID[1]
+
+
+def _parse_id(value, missing_seq=0):
+    """Parse a stream ID like b'1526919030474-55' into a tuple
+
+    IDs without a sequence number get missing_seq.
+    """
+    value = _encode(value)
+    ms, dash, seq = value.partition(b'-')
+    try:
+        if not ms.isdigit() or (dash and not seq.isdigit()):
+            raise ValueError(value)
+        entry_id = (int(ms), int(seq) if dash else missing_seq)
+    except ValueError:
+        raise ReplyError("ERR Invalid stream ID specified as stream command argument") from None
+    if entry_id[0] > _MAX_PART or entry_id[1] > _MAX_PART:
+        raise ReplyError("ERR Invalid stream ID specified as stream command argument")
+    return entry_id
+
+
+def _format_id(entry_id):
+    return b'%d-%d' % entry_id
+
+
+def _next_id(entry_id):
+    """Return the smallest ID larger than entry_id, or None if there is none"""
+    ms, seq = entry_id
+    if seq < _MAX_PART:
+        return (ms, seq + 1)
+    if ms < _MAX_PART:
+        return (ms + 1, 0)
+    return None
+
+
+def _previous_id(entry_id):
+    """Return the largest ID smaller than entry_id, or None if there is none"""
+    ms, seq = entry_id
+    if seq > 0:
+        return (ms, seq - 1)
+    if ms > 0:
+        return (ms - 1, _MAX_PART)
+    return None
+
+
+def _start_bound(value):
+    """Parse the lower bound of an ID range: -, an ID or an exclusive (ID"""
+    value = _encode(value)
+    if value == b'-':
+        return (0, 0)
+    if value == b'+':
+        return MAX_ID
+    if value.startswith(b'('):
+        bound = _next_id(_parse_id(value[1:], 0))
+        if bound is None:
+            raise ReplyError("ERR invalid start ID for the interval")
+        return bound
+    return _parse_id(value, 0)
+
+
+def _end_bound(value):
+    """Parse the upper bound of an ID range: +, an ID or an exclusive (ID"""
+    value = _encode(value)
+    if value == b'+':
+        return MAX_ID
+    if value == b'-':
+        return (0, 0)
+    if value.startswith(b'('):
+        bound = _previous_id(_parse_id(value[1:], _MAX_PART))
+        if bound is None:
+            raise ReplyError("ERR invalid end ID for the interval")
+        return bound
+    return _parse_id(value, _MAX_PART)
+
+
+def _entries(pairs):
+    """Turn (id, fields) pairs into an entry list reply"""
+    return [[_format_id(entry_id), list(fields)] for entry_id, fields in pairs]
+
+
+def _entries_after(stream, entry_id, count=None):
+    start = _next_id(entry_id)
+    if start is None:
+        return []
+    return stream.range(start, MAX_ID, count)
+
+
+def _now_ms(keyspace):
+    return int(keyspace.clock() * 1000)
+
+
+def _maxlen_args(args, i):
+    """Parse MAXLEN [=|~] count starting after MAXLEN at args[i]
+
+    Returns a (maxlen, approximate, next index) tuple.
+    """
+    approximate = False
+    if i < len(args) and _encode(args[i]) in (b'=', b'~'):
+        approximate = _encode(args[i]) == b'~'
+        i += 1
+    if i >= len(args):
+        raise ReplyError("ERR syntax error")
+    maxlen = _int_arg(args[i])
+    if maxlen < 0:
+        raise ReplyError("ERR The MAXLEN argument must be >= 0.")
+    return maxlen, approximate, i + 1
+
+
+def _count_arg(args):
+    """Parse the optional COUNT count of XRANGE and XREVRANGE"""
+    if not args:
+        return None
+    if len(args) != 2 or _option(args[0]) != b'COUNT':
+        raise ReplyError("ERR syntax error")
+    count = _int_arg(args[1])
+    return max(count, 0)
+
+
+def _get_group(keyspace, key, group, command_name):
+    stream = keyspace.get(key, Stream)
+    consumer_group = stream.groups.get(group) if stream is not None else None
+    if consumer_group is None:
+        raise ReplyError("NOGROUP No such key '{}' or consumer group '{}' in {}".format(
+            key.decode(errors='replace'), group.decode(errors='replace'), command_name))
+    return stream, consumer_group
+
+
+@command(b'XADD', -5)
+def _xadd(keyspace, key, *args):
+    key = _encode(key)
+    nomkstream = False
+    maxlen = None
+    i = 0
+    while i < len(args):
+        option = _option(args[i])
+        if option == b'NOMKSTREAM':
+            nomkstream = True
+            i += 1
+        elif option == b'MAXLEN':
+            maxlen, approximate, i = _maxlen_args(args, i + 1)
+        else:
+            break
+    fields = args[i + 1:]
+    if i >= len(args) or not fields or len(fields) % 2:
+        raise ReplyError("ERR wrong number of arguments for 'xadd' command")
+
+    stream = keyspace.get(key, Stream)
+    last_id = stream.last_id if stream is not None else (0, 0)
+    value = _encode(args[i])
+    if value == b'*':
+        ms = max(_now_ms(keyspace), last_id[0])
+        entry_id = (ms, last_id[1] + 1) if ms == last_id[0] else (ms, 0)
+    elif value.endswith(b'-*'):
+        ms = _parse_id(value[:-2], 0)[0]
+        entry_id = (ms, last_id[1] + 1) if ms == last_id[0] else (ms, 0)
+    else:
+        entry_id = _parse_id(value, 0)
+        if entry_id == (0, 0):
+            raise ReplyError("ERR The ID specified in XADD must be greater than 0-0")
+    if entry_id[1] > _MAX_PART:
+        raise ReplyError("ERR The stream has exhausted the last possible ID, "
+                         "unable to add more items")
+    if entry_id <= last_id:
+        raise ReplyError("ERR The ID specified in XADD is equal or smaller than the "
+                         "target stream top item")
+
+    if stream is None:
+        if nomkstream:
+            return None
+        stream = keyspace.get_or_create(key, Stream)
+    else:
+        keyspace.changed(key)
+        keyspace.ready(key)
+    stream.append(entry_id, tuple(map(_encode, fields)))
+    if maxlen is not None:
+        stream.trim(maxlen, approximate)
+    return _format_id(entry_id)
+
+
+@command(b'XLEN', 2)
+def _xlen(keyspace, key):
+    return len(keyspace.get(_encode(key), Stream) or ())
+
+
+@command(b'XRANGE', -4)
+def _xrange(keyspace, key, start, end, *args):
+    start = _start_bound(start)
+    end = _end_bound(end)
+    count = _count_arg(args)
+    stream = keyspace.get(_encode(key), Stream)
+    if stream is None:
+        return []
+    return _entries(stream.range(start, end, count))
+
+
+@command(b'XREVRANGE', -4)
+def _xrevrange(keyspace, key, end, start, *args):
+    end = _end_bound(end)
+    start = _start_bound(start)
+    count = _count_arg(args)
+    stream = keyspace.get(_encode(key), Stream)
+    if stream is None:
+        return []
+    return _entries(stream.revrange(end, start, count))
+
+
+@command(b'XDEL', -3)
+def _xdel(keyspace, key, *ids):
+    ids = [_parse_id(entry_id) for entry_id in ids]
+    key = _encode(key)
+    stream = keyspace.get(key, Stream)
+    if stream is None:
+        return 0
+    deleted = sum(stream.delete(entry_id) for entry_id in ids)
+    if deleted:
+        keyspace.changed(key)
+    return deleted
+
+
+@command(b'XTRIM', -4)
+def _xtrim(keyspace, key, strategy, *args):
+    if _option(strategy) != b'MAXLEN':
+        raise ReplyError("ERR syntax error")
+    maxlen, approximate, i = _maxlen_args(args, 0)
+    if i != len(args):
+        raise ReplyError("ERR syntax error")
+    key = _encode(key)
+    stream = keyspace.get(key, Stream)
+    if stream is None:
+        return 0
+    trimmed = stream.trim(maxlen, approximate)
+    if trimmed:
+        keyspace.changed(key)
+    return trimmed
+
+
+def _read_args(name, args):
+    """Parse the [COUNT count] [BLOCK ms] [NOACK] STREAMS key... id... arguments
+
+    Returns a (count, block, noack, keys, ids) tuple, block is in seconds
+    or None.
+    """
+    count = block = None
+    noack = False
+    i = 0
+    while i < len(args):
+        option = _option(args[i])
+        if option == b'STREAMS':
+            break
+        if option == b'COUNT' and i + 1 < len(args):
+            count = max(_int_arg(args[i + 1]), 0) or None
+            i += 2
+        elif option == b'BLOCK' and i + 1 < len(args):
+            block = _int_arg(args[i + 1], "ERR timeout is not an integer or out of range")
+            if block < 0:
+                raise ReplyError("ERR timeout is negative")
+            block /= 1000
+            i += 2
+        elif option == b'NOACK' and name == 'xreadgroup':
+            noack = True
+            i += 1
+        else:
+            raise ReplyError("ERR syntax error")
+    streams = args[i + 1:]
+    if i == len(args) or not streams or len(streams) % 2:
+        raise ReplyError("ERR Unbalanced '{}' list of streams: for each stream key an ID "
+                         "or '$' must be specified.".format(name))
+    half = len(streams) // 2
+    return count, block, noack, list(map(_encode, streams[:half])), streams[half:]
+
+
+def _serve_xread(after, count, keyspace, key):
+    stream = keyspace.get(key, Stream)
+    if stream is None:
+        return keyspace.SKIP
+    entries = _entries_after(stream, after[key], count)
+    if not entries:
+        return keyspace.SKIP
+    return [[key, _entries(entries)]]
+
+
+@command(b'XREAD', -4)
+def _xread(keyspace, *args):
+    count, block, _, keys, ids = _read_args('xread', args)
+    after = {}
+    reply = []
+    for key, entry_id in zip(keys, ids):
+        stream = keyspace.get(key, Stream)
+        if _encode(entry_id) == b'$':
+            after[key] = stream.last_id if stream is not None else (0, 0)
+            continue
+        after[key] = _parse_id(entry_id, 0)
+        if stream is not None:
+            entries = _entries_after(stream, after[key], count)
+            if entries:
+                reply.append([key, _entries(entries)])
+    if reply:
+        return reply
+    if block is None:
+        return None
+    return Blocked(keys, functools.partial(_serve_xread, after, count), block)
+
+
+def _read_group_new(keyspace, key, stream, group, consumer, count, noack):
+    """Deliver the entries the group hasn't seen yet to consumer"""
+    entries = _entries_after(stream, group.last_id, count)
+    if entries:
+        group.last_id = entries[-1][0]
+        if not noack:
+            now = _now_ms(keyspace)
+            for entry_id, _ in entries:
+                group.deliver(entry_id, consumer, now)
+        keyspace.changed(key)
+    return entries
+
+
+def _serve_xreadgroup(group_name, consumer, count, noack, keyspace, key):
+    stream = keyspace.get(key, Stream)
+    group = stream.groups.get(group_name) if stream is not None else None
+    if group is None:
+        raise ReplyError("NOGROUP the consumer group this client was blocked on "
+                         "no longer exists")
+    entries = _read_group_new(keyspace, key, stream, group, consumer, count, noack)
+    if not entries:
+        return keyspace.SKIP
+    return [[key, _entries(entries)]]
+
+
+@command(b'XREADGROUP', -7)
+def _xreadgroup(keyspace, group_option, group_name, consumer, *args):
+    if _option(group_option) != b'GROUP':
+        raise ReplyError("ERR syntax error")
+    group_name = _encode(group_name)
+    consumer = _encode(consumer)
+    count, block, noack, keys, ids = _read_args('xreadgroup', args)
+    ids = [None if _encode(entry_id) == b'>' else _parse_id(entry_id, 0)
+           for entry_id in ids]
+    groups = [_get_group(keyspace, key, group_name, 'XREADGROUP') for key in keys]
+
+    reply = []
+    for key, entry_id, (stream, group) in zip(keys, ids, groups):
+        pending = group.consumer(consumer)
+        if entry_id is None:
+            entries = _read_group_new(keyspace, key, stream, group, consumer, count, noack)
+            if entries:
+                reply.append([key, _entries(entries)])
+            continue
+        # the history of the consumer, entries deleted since come back empty
+        history = []
+        for pending_id in sorted(pending):
+            if pending_id > entry_id:
+                fields = stream.get(pending_id)
+                history.append([_format_id(pending_id),
+                                None if fields is None else list(fields)])
+                if len(history) == count:
+                    break
+        reply.append([key, history])
+    if reply:
+        return reply
+    if block is None or None not in ids:
+        return None
+    return Blocked(keys, functools.partial(_serve_xreadgroup, group_name, consumer, count,
+                                           noack), block)
+
+
+def _xgroup_stream(keyspace, key):
+    stream = keyspace.get(key, Stream)
+    if stream is None:
+        raise ReplyError("ERR The XGROUP subcommand requires the key to exist. Note that "
+                         "for CREATE you may want to use the MKSTREAM option to create an "
+                         "empty stream automatically.")
+    return stream
+
+
+def _xgroup_group(keyspace, key, group_name):
+    group = _xgroup_stream(keyspace, key).groups.get(group_name)
+    if group is None:
+        raise ReplyError("NOGROUP No such consumer group '{}' for key name '{}'".format(
+            group_name.decode(errors='replace'), key.decode(errors='replace')))
+    return group
+
+
+def _group_id(stream, value):
+    if _encode(value) == b'$':
+        return stream.last_id
+    return _parse_id(value, 0)
+
+
+@command(b'XGROUP', -2)
+def _xgroup(keyspace, subcommand, *args):
+    subcommand = _option(subcommand)
+    key = _encode(args[0]) if args else None
+    group_name = _encode(args[1]) if len(args) > 1 else None
+    if subcommand == b'CREATE' and len(args) in (3, 4):
+        if len(args) == 4 and _option(args[3]) != b'MKSTREAM':
+            raise ReplyError("ERR syntax error")
+        if len(args) == 4 and keyspace.get(key, Stream) is None:
+            keyspace.get_or_create(key, Stream)
+        stream = _xgroup_stream(keyspace, key)
+        if group_name in stream.groups:
+            raise ReplyError("BUSYGROUP Consumer Group name already exists")
+        stream.groups[group_name] = ConsumerGroup(_group_id(stream, args[2]))
+        keyspace.changed(key)
+        return b'OK'
+    if subcommand == b'SETID' and len(args) == 3:
+        group = _xgroup_group(keyspace, key, group_name)
+        group.last_id = _group_id(keyspace.get(key, Stream), args[2])
+        keyspace.changed(key)
+        return b'OK'
+    if subcommand == b'DESTROY' and len(args) == 2:
+        stream = _xgroup_stream(keyspace, key)
+        if stream.groups.pop(group_name, None) is None:
+            return 0
+        keyspace.changed(key)
+        # clients blocked on the group get a NOGROUP error
+        keyspace.ready(key)
+        return 1
+    if subcommand == b'CREATECONSUMER' and len(args) == 3:
+        group = _xgroup_group(keyspace, key, group_name)
+        consumer = _encode(args[2])
+        if consumer in group.consumers:
+            return 0
+        group.consumer(consumer)
+        keyspace.changed(key)
+        return 1
+    if subcommand == b'DELCONSUMER' and len(args) == 3:
+        group = _xgroup_group(keyspace, key, group_name)
+        pending = group.consumers.pop(_encode(args[2]), None)
+        if pending is None:
+            return 0
+        for entry_id in pending:
+            del group.pending[entry_id]
+        keyspace.changed(key)
+        return len(pending)
+    raise ReplyError("ERR Unknown subcommand or wrong number of arguments for '{}'. "
+                     "Try XGROUP HELP.".format(subcommand.decode(errors='replace')))
+
+
+@command(b'XACK', -4)
+def _xack(keyspace, key, group_name, *ids):
+    ids = [_parse_id(entry_id) for entry_id in ids]
+    key = _encode(key)
+    stream = keyspace.get(key, Stream)
+    group = stream.groups.get(_encode(group_name)) if stream is not None else None
+    if group is None:
+        return 0
+    acked = sum(group.ack(entry_id) for entry_id in ids)
+    if acked:
+        keyspace.changed(key)
+    return acked
+
+
+@command(b'XPENDING', -3)
+def _xpending(keyspace, key, group_name, *args):
+    key = _encode(key)
+    _, group = _get_group(keyspace, key, _encode(group_name), 'XPENDING')
+    if not args:
+        if not group.pending:
+            return [0, None, None, None]
+        consumers = [[name, b'%d' % len(pending)]
+                     for name, pending in sorted(group.consumers.items()) if pending]
+        return [len(group.pending), _format_id(min(group.pending)),
+                _format_id(max(group.pending)), consumers]
+
+    min_idle = None
+    if _option(args[0]) == b'IDLE':
+        if len(args) < 2:
+            raise ReplyError("ERR syntax error")
+        min_idle = _int_arg(args[1])
+        args = args[2:]
+    if len(args) not in (3, 4):
+        raise ReplyError("ERR syntax error")
+    start = _start_bound(args[0])
+    end = _end_bound(args[1])
+    count = _int_arg(args[2])
+    if len(args) == 4:
+        consumer = _encode(args[3])
+        ids = group.consumers.get(consumer, ())
+    else:
+        ids = group.pending
+
+    now = _now_ms(keyspace)
+    reply = []
+    if count <= 0:
+        return reply
+    for entry_id in sorted(ids):
+        if entry_id < start:
+            continue
+        if entry_id > end:
+            break
+        pending = group.pending[entry_id]
+        idle = now - pending.delivered
+        if min_idle is not None and idle < min_idle:
+            continue
+        reply.append([_format_id(entry_id), pending.consumer, idle, pending.count])
+        if len(reply) == count:
+            break
+    return reply
+
+
+@command(b'XCLAIM', -6)
+def _xclaim(keyspace, key, group_name, consumer, min_idle, *args):
+    key = _encode(key)
+    stream, group = _get_group(keyspace, key, _encode(group_name), 'XCLAIM')
+    consumer = _encode(consumer)
+    min_idle = _int_arg(min_idle, "ERR Invalid min-idle-time argument for XCLAIM")
+
+    ids = []
+    i = 0
+    while i < len(args):
+        try:
+            ids.append(_parse_id(args[i]))
+        except ReplyError:
+            if not ids:
+                raise
+            break
+        i += 1
+
+    now = _now_ms(keyspace)
+    delivered = now
+    retry_count = None
+    force = justid = False
+    while i < len(args):
+        option = _option(args[i])
+        if option == b'FORCE':
+            force = True
+        elif option == b'JUSTID':
+            justid = True
+        elif option == b'IDLE' and i + 1 < len(args):
+            i += 1
+            delivered = now - _int_arg(args[i], "ERR Invalid IDLE option argument for XCLAIM")
+        elif option == b'TIME' and i + 1 < len(args):
+            i += 1
+            delivered = _int_arg(args[i], "ERR Invalid TIME option argument for XCLAIM")
+        elif option == b'RETRYCOUNT' and i + 1 < len(args):
+            i += 1
+            retry_count = _int_arg(args[i],
+                                   "ERR Invalid RETRYCOUNT option argument for XCLAIM")
+        elif option == b'LASTID' and i + 1 < len(args):
+            i += 1
+            last_id = _parse_id(args[i])
+            if last_id > group.last_id:
+                group.last_id = last_id
+        else:
+            raise ReplyError("ERR Unrecognized XCLAIM option '{}'".format(
+                _encode(args[i]).decode(errors='replace')))
+        i += 1
+
+    reply = []
+    modified = False
+    for entry_id in ids:
+        fields = stream.get(entry_id)
+        pending = group.pending.get(entry_id)
+        if pending is None:
+            if not force or fields is None:
+                continue
+            group.deliver(entry_id, consumer, delivered)
+            pending = group.pending[entry_id]
+            pending.count = 0
+        elif min_idle and now - pending.delivered < min_idle:
+            continue
+        elif fields is None:
+            # the entry was deleted, so there is nothing left to claim
+            group.ack(entry_id)
+            modified = True
+            continue
+        group.claim(entry_id, consumer, delivered)
+        modified = True
+        if retry_count is not None:
+            pending.count = retry_count
+        elif not justid:
+            pending.count += 1
+        if justid:
+            reply.append(_format_id(entry_id))
+        else:
+            reply.append([_format_id(entry_id), list(fields)])
+    if modified:
+        keyspace.changed(key)
+    return reply
+
+
+class StreamCommandsMixin:
+    '''Stream commands mixin
+
+    Streams are stored in Stream containers, see mockaioredis.stream
+    '''
+
+    async def xadd(self, stream, fields, message_id=b'*', max_len=None,
+                   exact_len=False, *, encoding=_NOTSET):
+        """Add a message to a stream."""
+        args = []
+        if max_len is not None:
+            if exact_len:
+                args.extend((b'MAXLEN', max_len))
+            else:
+                args.extend((b'MAXLEN', b'~', max_len))
+        args.append(message_id)
+        for k, v in fields.items():
+            args.extend([k, v])
+        return self._execute(b'XADD', stream, *args, encoding=encoding)
+
+    async def xrange(self, stream, start='-', stop='+', count=None, *, encoding=_NOTSET):
+        """Retrieve messages from a stream."""
+        extra = [b'COUNT', count] if count is not None else []
+        return parse_messages(self._execute(b'XRANGE', stream, start, stop, *extra,
+                                            encoding=encoding))
+
+    async def xrevrange(self, stream, start='+', stop='-', count=None, *, encoding=_NOTSET):
+        """Retrieve messages from a stream in reverse order."""
+        extra = [b'COUNT', count] if count is not None else []
+        return parse_messages(self._execute(b'XREVRANGE', stream, start, stop, *extra,
+                                            encoding=encoding))
+
+    async def xread(self, streams, timeout=0, count=None, latest_ids=None, *,
+                    encoding=_NOTSET):
+        """Perform a blocking read on the given stream
+
+        A timeout of None doesn't block at all, 0 blocks forever.
+
+        :raises ValueError: if the length of streams and latest_ids do
+                            not match
+        """
+        args = self._xread(streams, timeout, count, latest_ids)
+        return parse_messages_by_stream(await self.execute(b'XREAD', *args,
+                                                           encoding=encoding))
+
+    async def xread_group(self, group_name, consumer_name, streams, timeout=0,
+                          count=None, latest_ids=None, no_ack=False, *, encoding=_NOTSET):
+        """Perform a blocking read on the given stream as part of a consumer group
+
+        :raises ValueError: if the length of streams and latest_ids do
+                            not match
+        """
+        args = self._xread(streams, timeout, count, latest_ids, no_ack)
+        return parse_messages_by_stream(await self.execute(
+            b'XREADGROUP', b'GROUP', group_name, consumer_name, *args, encoding=encoding))
+
+    async def xgroup_create(self, stream, group_name, latest_id='$', mkstream=False):
+        """Create a consumer group"""
+        args = [b'CREATE', stream, group_name, latest_id]
+        if mkstream:
+            args.append(b'MKSTREAM')
+        return self._execute(b'XGROUP', *args, encoding=None) == b'OK'
+
+    async def xgroup_setid(self, stream, group_name, latest_id='$'):
+        """Set the latest ID for a consumer group"""
+        return self._execute(b'XGROUP', b'SETID', stream, group_name, latest_id,
+                             encoding=None) == b'OK'
+
+    async def xgroup_destroy(self, stream, group_name):
+        """Delete a consumer group, return True if it existed"""
+        return bool(self._execute(b'XGROUP', b'DESTROY', stream, group_name))
+
+    async def xgroup_delconsumer(self, stream, group_name, consumer_name):
+        """Delete a specific consumer from a group
+
+        Returns the number of pending messages the consumer had.
+        """
+        return self._execute(b'XGROUP', b'DELCONSUMER', stream, group_name, consumer_name)
+
+    async def xpending(self, stream, group_name, start=None, stop=None, count=None,
+                       consumer=None, *, encoding=_NOTSET):
+        """Get information on pending messages for a stream
+
+        Returned data will vary depending on the presence (or not)
+        of the start/stop/count parameters. For more details see:
+        https://redis.io/commands/xpending
+
+        :raises ValueError: if the start/stop/count parameters are only
+                            partially specified
+        """
+        ssc = [start, stop, count]
+        ssc_count = len([v for v in ssc if v is not None])
+        if ssc_count != 3 and ssc_count != 0:
+            raise ValueError('Either specify non or all of the start/stop/count arguments')
+        if not any(ssc):
+            ssc = []
+        args = [stream, group_name] + ssc
+        if consumer:
+            args.append(consumer)
+        return self._execute(b'XPENDING', *args, encoding=encoding)
+
+    async def xclaim(self, stream, group_name, consumer_name, min_idle_time, id, *ids,
+                     encoding=_NOTSET):
+        """Claim a message for a given consumer"""
+        return parse_messages(self._execute(b'XCLAIM', stream, group_name, consumer_name,
+                                            min_idle_time, id, *ids, encoding=encoding))
+
+    async def xack(self, stream, group_name, id, *ids):
+        """Acknowledge a message for a given consumer group"""
+        return self._execute(b'XACK', stream, group_name, id, *ids)
+
+    async def xdel(self, stream, id):
+        """Removes the specified entries(IDs) from a stream"""
+        return self._execute(b'XDEL', stream, id)
+
+    async def xtrim(self, stream, max_len, exact_len=False):
+        """trims the stream to a given number of items, evicting older items"""
+        if exact_len:
+            args = [b'MAXLEN', max_len]
+        else:
+            args = [b'MAXLEN', b'~', max_len]
+        return self._execute(b'XTRIM', stream, *args)
+
+    async def xlen(self, stream):
+        """Returns the number of entries inside a stream"""
+        return self._execute(b'XLEN', stream)
+
+    def _xread(self, streams, timeout=0, count=None, latest_ids=None, no_ack=False):
+        """Build the arguments of XREAD and XREADGROUP like aioredis does"""
+        if latest_ids is None:
+            latest_ids = ['$'] * len(streams)
+        if len(streams) != len(latest_ids):
+            raise ValueError('The streams and latest_ids parameters must be of the same length')
+
+        count_args = [b'COUNT', count] if count else []
+        if timeout is None:
+            block_args = []
+        elif not isinstance(timeout, int):
+            raise TypeError("timeout argument must be int, not {!r}".format(timeout))
+        else:
+            block_args = [b'BLOCK', timeout]
+        noack_args = [b'NOACK'] if no_ack else []
+        return count_args + block_args + noack_args + [b'STREAMS'] + list(streams) \
+            + list(latest_ids)
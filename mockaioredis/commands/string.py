@@ -0,0 +1,538 @@
+"""String commands"""
+import itertools
+import math
+
+from aioredis.errors import ReplyError
+
+from mockaioredis.registry import command
+from mockaioredis.util import (
+    _INT64_MAX,
+    _INT64_MIN,
+    _NOTSET,
+    _encode,
+    _float_arg,
+    _format_float,
+    _int_arg,
+    _option,
+)
+
+# Strings are stored as bytearrays, so APPEND, SETRANGE and SETBIT can
+# change them in place instead of copying the whole value.
+
+# Redis limits strings to 512MB
+_MAX_STRING_SIZE = 512 * 1024 * 1024
+
+
+def _string(keyspace, key):
+    '''Return the string at key as bytes, or None if there is none'''
+    value = keyspace.get(_encode(key), bytearray)
+    if value is None:
+        return None
+    return bytes(value)
+
+
+def _byte_range(length, start, end):
+    '''Turn inclusive GETRANGE/BITCOUNT offsets into a slice
+
+    Unlike list ranges, offsets before the start are clamped to the first
+    byte instead of making the range empty.
+    '''
+    if start < 0:
+        start += length
+    if end < 0:
+        end += length
+    start = max(start, 0)
+    end = min(max(end, 0), length - 1)
+    if start > end:
+        return slice(0, 0)
+    return slice(start, end + 1)
+
+
+def _set_string(keyspace, key, value, seconds=None):
+    keyspace.set(key, bytearray(value))
+    if seconds is not None:
+        keyspace.expire_in(key, seconds)
+
+
+@command(b'GET', 2)
+def _get(keyspace, key):
+    return _string(keyspace, key)
+
+
+@command(b'SET', -3)
+def _set(keyspace, key, value, *args):
+    key = _encode(key)
+    value = _encode(value)
+    seconds = None
+    exist = None
+    keepttl = False
+    i = 0
+    while i < len(args):
+        option = _option(args[i])
+        if option in (b'EX', b'PX') and i + 1 < len(args):
+            seconds = _int_arg(args[i + 1])
+            if seconds <= 0:
+                raise ReplyError("ERR invalid expire time in 'set' command")
+            if option == b'PX':
+                seconds /= 1000
+            i += 2
+            continue
+        if option in (b'NX', b'XX'):
+            exist = option
+        elif option == b'KEEPTTL':
+            keepttl = True
+        else:
+            raise ReplyError("ERR syntax error")
+        i += 1
+
+    if exist == b'XX' and key not in keyspace:
+        return None
+    if exist == b'NX' and key in keyspace:
+        return None
+    keyspace.set(key, bytearray(value), keepttl=keepttl)
+    if seconds is not None:
+        keyspace.expire_in(key, seconds)
+    return b'OK'
+
+
+@command(b'SETNX', 3)
+def _setnx(keyspace, key, value):
+    key = _encode(key)
+    if key in keyspace:
+        return 0
+    _set_string(keyspace, key, _encode(value))
+    return 1
+
+
+def _setex(keyspace, name, key, seconds, value):
+    if seconds <= 0:
+        raise ReplyError("ERR invalid expire time in '{}' command".format(name))
+    _set_string(keyspace, _encode(key), _encode(value), seconds)
+    return b'OK'
+
+
+@command(b'SETEX', 4)
+def _setex_seconds(keyspace, key, seconds, value):
+    return _setex(keyspace, 'setex', key, _int_arg(seconds), value)
+
+
+@command(b'PSETEX', 4)
+def _psetex(keyspace, key, milliseconds, value):
+    return _setex(keyspace, 'psetex', key, _int_arg(milliseconds) / 1000, value)
+
+
+@command(b'GETSET', 3)
+def _getset(keyspace, key, value):
+    key = _encode(key)
+    old = _string(keyspace, key)
+    _set_string(keyspace, key, _encode(value))
+    return old
+
+
+@command(b'MGET', -2)
+def _mget(keyspace, *keys):
+    values = keyspace.get_many(list(map(_encode, keys)))
+    # MGET returns nil for keys that don't hold a string
+    return [bytes(value) if type(value) is bytearray else None for value in values]
+
+
+def _mset_items(name, pairs):
+    if len(pairs) % 2:
+        raise ReplyError("ERR wrong number of arguments for '{}' command".format(name))
+    keys = map(_encode, pairs[::2])
+    values = map(bytearray, map(_encode, pairs[1::2]))
+    return list(zip(keys, values))
+
+
+@command(b'MSET', -3)
+def _mset(keyspace, *pairs):
+    keyspace.set_many(_mset_items('mset', pairs))
+    return b'OK'
+
+
+@command(b'MSETNX', -3)
+def _msetnx(keyspace, *pairs):
+    items = _mset_items('msetnx', pairs)
+    if keyspace.count_existing([key for key, _ in items]):
+        return 0
+    keyspace.set_many(items)
+    return 1
+
+
+@command(b'APPEND', 3)
+def _append(keyspace, key, value):
+    string = keyspace.get_or_create(_encode(key), bytearray)
+    string += _encode(value)
+    return len(string)
+
+
+@command(b'STRLEN', 2)
+def _strlen(keyspace, key):
+    return len(keyspace.get(_encode(key), bytearray) or b'')
+
+
+@command(b'GETRANGE', 4)
+def _getrange(keyspace, key, start, end):
+    start = _int_arg(start)
+    end = _int_arg(end)
+    string = keyspace.get(_encode(key), bytearray) or b''
+    return bytes(string[_byte_range(len(string), start, end)])
+
+
+@command(b'SETRANGE', 4)
+def _setrange(keyspace, key, offset, value):
+    offset = _int_arg(offset)
+    if offset < 0:
+        raise ReplyError("ERR offset is out of range")
+    key = _encode(key)
+    value = _encode(value)
+    if not value:
+        # nothing to write, and missing keys are not created
+        return len(keyspace.get(key, bytearray) or b'')
+    if offset + len(value) > _MAX_STRING_SIZE:
+        raise ReplyError("ERR string exceeds maximum allowed size (512MB)")
+
+    string = keyspace.get_or_create(key, bytearray)
+    if len(string) < offset:
+        string.extend(bytes(offset - len(string)))
+    string[offset:offset + len(value)] = value
+    return len(string)
+
+
+def _incrby(keyspace, key, amount):
+    key = _encode(key)
+    value = keyspace.get(key, bytearray)
+    value = 0 if value is None else _int_arg(value)
+    value += amount
+    if not _INT64_MIN <= value <= _INT64_MAX:
+        raise ReplyError("ERR increment or decrement would overflow")
+    keyspace.set(key, bytearray(b'%d' % value), keepttl=True)
+    return value
+
+
+@command(b'INCR', 2)
+def _incr(keyspace, key):
+    return _incrby(keyspace, key, 1)
+
+
+@command(b'INCRBY', 3)
+def _incrby_amount(keyspace, key, amount):
+    return _incrby(keyspace, key, _int_arg(amount))
+
+
+@command(b'DECR', 2)
+def _decr(keyspace, key):
+    return _incrby(keyspace, key, -1)
+
+
+@command(b'DECRBY', 3)
+def _decrby(keyspace, key, amount):
+    return _incrby(keyspace, key, -_int_arg(amount))
+
+
+@command(b'INCRBYFLOAT', 3)
+def _incrbyfloat(keyspace, key, increment):
+    increment = _float_arg(increment)
+    key = _encode(key)
+    value = keyspace.get(key, bytearray)
+    value = 0.0 if value is None else _float_arg(bytes(value))
+    value += increment
+    if math.isnan(value) or math.isinf(value):
+        raise ReplyError("ERR increment would produce NaN or Infinity")
+    ret = _format_float(value)
+    keyspace.set(key, bytearray(ret), keepttl=True)
+    return ret
+
+
+def _bit_offset(offset):
+    offset = _int_arg(offset, "ERR bit offset is not an integer or out of range")
+    if not 0 <= offset < _MAX_STRING_SIZE * 8:
+        raise ReplyError("ERR bit offset is not an integer or out of range")
+    return offset
+
+
+@command(b'GETBIT', 3)
+def _getbit(keyspace, key, offset):
+    offset = _bit_offset(offset)
+    string = keyspace.get(_encode(key), bytearray) or b''
+    byte = offset >> 3
+    if byte >= len(string):
+        return 0
+    return (string[byte] >> (7 - (offset & 7))) & 1
+
+
+@command(b'SETBIT', 4)
+def _setbit(keyspace, key, offset, value):
+    offset = _bit_offset(offset)
+    value = _int_arg(value, "ERR bit is not an integer or out of range")
+    if value not in (0, 1):
+        raise ReplyError("ERR bit is not an integer or out of range")
+
+    string = keyspace.get_or_create(_encode(key), bytearray)
+    byte = offset >> 3
+    if byte >= len(string):
+        string.extend(bytes(byte + 1 - len(string)))
+    mask = 1 << (7 - (offset & 7))
+    old = string[byte] & mask
+    if value:
+        string[byte] |= mask
+    else:
+        string[byte] &= ~mask & 0xff
+    return int(bool(old))
+
+
+@command(b'BITCOUNT', -2)
+def _bitcount(keyspace, key, *args):
+    if len(args) not in (0, 2):
+        raise ReplyError("ERR syntax error")
+    string = keyspace.get(_encode(key), bytearray) or b''
+    if args:
+        string = string[_byte_range(len(string), _int_arg(args[0]), _int_arg(args[1]))]
+    return bin(int.from_bytes(string, 'big')).count('1')
+
+
+@command(b'BITOP', -4)
+def _bitop(keyspace, operation, destkey, *keys):
+    operation = _option(operation)
+    if operation not in (b'AND', b'OR', b'XOR', b'NOT'):
+        raise ReplyError("ERR syntax error")
+    if operation == b'NOT' and len(keys) != 1:
+        raise ReplyError("ERR BITOP NOT must be called with a single source key.")
+
+    strings = [keyspace.get(key, bytearray) or b'' for key in map(_encode, keys)]
+    length = max(map(len, strings))
+    # shorter strings are padded with zero bytes, which works out the same
+    # as shifting the integers to the left
+    values = [int.from_bytes(string, 'big') << (8 * (length - len(string)))
+              for string in strings]
+    if operation == b'NOT':
+        result = values[0] ^ ((1 << (8 * length)) - 1)
+    else:
+        result = values[0]
+        for value in itertools.islice(values, 1, None):
+            if operation == b'AND':
+                result &= value
+            elif operation == b'OR':
+                result |= value
+            else:
+                result ^= value
+
+    destkey = _encode(destkey)
+    if not length:
+        keyspace.delete(destkey)
+    else:
+        keyspace.set(destkey, bytearray(result.to_bytes(length, 'big')))
+    return length
+
+
+class StringCommandsMixin:
+    '''String commands mixin
+
+    Run (some) of the Redis string commands
+    '''
+    SET_IF_EXIST = "SET_IF_EXIST"
+    SET_IF_NOT_EXIST = "SET_IF_NOT_EXIST"
+
+    async def append(self, key, value):
+        """Append a value to key."""
+        return self._execute(b'APPEND', key, value)
+
+    async def bitcount(self, key, start=None, end=None):
+        """Count set bits in a string.
+
+        :raises TypeError: if only start or end specified.
+        """
+        if (start is None) != (end is None):
+            raise TypeError("both start and stop must be specified")
+        args = () if start is None else (start, end)
+        return self._execute(b'BITCOUNT', key, *args)
+
+    async def bitop_and(self, dest, key, *keys):
+        """Perform bitwise AND operations between strings."""
+        return self._execute(b'BITOP', b'AND', dest, key, *keys)
+
+    async def bitop_or(self, dest, key, *keys):
+        """Perform bitwise OR operations between strings."""
+        return self._execute(b'BITOP', b'OR', dest, key, *keys)
+
+    async def bitop_xor(self, dest, key, *keys):
+        """Perform bitwise XOR operations between strings."""
+        return self._execute(b'BITOP', b'XOR', dest, key, *keys)
+
+    async def bitop_not(self, dest, key):
+        """Perform bitwise NOT operations between strings."""
+        return self._execute(b'BITOP', b'NOT', dest, key)
+
+    async def decr(self, key):
+        """Decrement the integer value of a key by one."""
+        return self._execute(b'DECR', key)
+
+    async def decrby(self, key, decrement):
+        """Decrement the integer value of a key by the given number.
+
+        :raises TypeError: if decrement is not int
+        """
+        if not isinstance(decrement, int):
+            raise TypeError("decrement must be of type int")
+        return self._execute(b'DECRBY', key, decrement)
+
+    async def get(self, key, encoding=_NOTSET):
+        """Gets the value of a key"""
+        return self._execute(b'GET', key, encoding=encoding)
+
+    async def getbit(self, key, offset):
+        """Returns the bit value at offset in the string value stored at key.
+
+        :raises TypeError: if offset is not int
+        :raises ValueError: if offset is less than 0
+        """
+        if not isinstance(offset, int):
+            raise TypeError("offset argument must be int")
+        if offset < 0:
+            raise ValueError("offset must be greater equal 0")
+        return self._execute(b'GETBIT', key, offset)
+
+    async def getrange(self, key, start, end, *, encoding=_NOTSET):
+        """Get a substring of the string stored at a key.
+
+        :raises TypeError: if start or end is not int
+        """
+        if not isinstance(start, int):
+            raise TypeError("start argument must be int")
+        if not isinstance(end, int):
+            raise TypeError("end argument must be int")
+        return self._execute(b'GETRANGE', key, start, end, encoding=encoding)
+
+    async def getset(self, key, value, *, encoding=_NOTSET):
+        """Set the string value of a key and return its old value."""
+        return self._execute(b'GETSET', key, value, encoding=encoding)
+
+    async def incr(self, key):
+        """Increments key by 1"""
+        return self._execute(b'INCR', key)
+
+    async def incrby(self, key, amount):
+        """Increments key by the amount specified"""
+        if not isinstance(amount, int):
+            raise TypeError("increment must be of type int")
+        return self._execute(b'INCRBY', key, amount)
+
+    async def incrbyfloat(self, key, increment):
+        """Increment the float value of a key by the given amount.
+
+        :raises TypeError: if increment is not int or float
+        """
+        if not isinstance(increment, (int, float)):
+            raise TypeError("increment must be of type int or float")
+        return float(self._execute(b'INCRBYFLOAT', key, increment))
+
+    async def mget(self, keys, *args, encoding=_NOTSET):
+        """Returns the values of all specified keys."""
+        if isinstance(keys, (list, tuple)):
+            all_keys = list(keys) + list(args)
+        else:
+            all_keys = [keys] + list(args)
+        if not all_keys:
+            return []
+        return self._execute(b'MGET', *all_keys, encoding=encoding)
+
+    async def mset(self, *args):
+        """Set multiple keys to multiple values or unpack dict to keys & values.
+
+        :raises TypeError: if len of args is not event number
+        :raises TypeError: if len of args equals 1 and it is not a dict
+        """
+        data = args
+        if len(args) == 1:
+            if not isinstance(args[0], dict):
+                raise TypeError("if one arg it should be a dict")
+            data = list(itertools.chain.from_iterable(args[0].items()))
+        elif len(args) % 2 != 0:
+            raise TypeError("length of pairs must be even number")
+        return self._execute(b'MSET', *data, encoding=None) == b'OK'
+
+    async def msetnx(self, key, value, *pairs):
+        """Set multiple keys to multiple values,
+        only if none of the keys exist.
+
+        :raises TypeError: if len of pairs is not event number
+        """
+        if len(pairs) % 2 != 0:
+            raise TypeError("length of pairs must be even number")
+        return self._execute(b'MSETNX', key, value, *pairs)
+
+    async def psetex(self, key, milliseconds, value):
+        """Set the value and expiration in milliseconds of a key.
+
+        :raises TypeError: if milliseconds is not int
+        """
+        if not isinstance(milliseconds, int):
+            raise TypeError("milliseconds argument must be int")
+        return self._execute(b'PSETEX', key, milliseconds, value, encoding=None) == b'OK'
+
+    async def set(self, key, value, *, expire=None, pexpire=None, exist=None):
+        """Sets the value of a key"""
+        if expire is not None and not isinstance(expire, int):
+            raise TypeError("expire argument must be int")
+        if pexpire is not None and not isinstance(pexpire, int):
+            raise TypeError("pexpire argument must be int")
+
+        args = []
+        if expire:
+            args[:] = [b'EX', expire]
+        if pexpire:
+            args[:] = [b'PX', pexpire]
+
+        if exist is self.SET_IF_EXIST:
+            args.append(b'XX')
+        elif exist is self.SET_IF_NOT_EXIST:
+            args.append(b'NX')
+        return self._execute(b'SET', key, value, *args, encoding=None) == b'OK'
+
+    async def setbit(self, key, offset, value):
+        """Sets or clears the bit at offset in the string value stored at key.
+
+        :raises TypeError: if offset is not int
+        :raises ValueError: if offset is less than 0 or value is not 0 or 1
+        """
+        if not isinstance(offset, int):
+            raise TypeError("offset argument must be int")
+        if offset < 0:
+            raise ValueError("offset must be greater equal 0")
+        if value not in (0, 1):
+            raise ValueError("value argument must be either 1 or 0")
+        return self._execute(b'SETBIT', key, offset, value)
+
+    async def setex(self, key, seconds, value):
+        """Set the value and expiration of a key.
+
+        If seconds is float it will be multiplied by 1000
+        coerced to int and passed to `psetex` method.
+
+        :raises TypeError: if seconds is neither int nor float
+        """
+        if isinstance(seconds, float):
+            return await self.psetex(key, int(seconds * 1000), value)
+        if not isinstance(seconds, int):
+            raise TypeError("milliseconds argument must be int")
+        return self._execute(b'SETEX', key, seconds, value, encoding=None) == b'OK'
+
+    async def setnx(self, key, value):
+        """Set the value of a key, only if the key does not exist."""
+        return bool(self._execute(b'SETNX', key, value))
+
+    async def setrange(self, key, offset, value):
+        """Overwrite part of a string at key starting at the specified offset.
+
+        :raises TypeError: if offset is not int
+        :raises ValueError: if offset less than 0
+        """
+        if not isinstance(offset, int):
+            raise TypeError("offset argument must be int")
+        if offset < 0:
+            raise ValueError("offset must be greater equal 0")
+        return self._execute(b'SETRANGE', key, offset, value)
+
+    async def strlen(self, key):
+        """Get the length of the value stored in a key."""
+        return self._execute(b'STRLEN', key)
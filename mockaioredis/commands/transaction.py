@@ -0,0 +1,206 @@
+'Transaction commands'
+import asyncio
+
+from aioredis.errors import MultiExecError, ReplyError, WatchVariableError
+
+from mockaioredis.registry import Blocked, command, lookup
+from mockaioredis.util import _encode, _run_sync
+
+# Handlers of the commands that work on the state of a client instead of
+# the keyspace. MockRedis.execute() calls them with the client.
+CLIENT_HANDLERS = set()
+
+
+def _client_command(name, arity):
+    def register(handler):
+        command(name, arity)(handler)
+        CLIENT_HANDLERS.add(handler)
+        return handler
+    return register
+
+
+@_client_command(b'MULTI', 1)
+def _multi(client):
+    if client._multi is not None:
+        raise ReplyError("ERR MULTI calls can not be nested")
+    client._multi = []
+    client._multi_aborted = False
+    return b'OK'
+
+
+@_client_command(b'EXEC', 1)
+def _exec(client):
+    if client._multi is None:
+        raise ReplyError("ERR EXEC without MULTI")
+    queued, client._multi = client._multi, None
+    if client._multi_aborted:
+        client._watched.clear()
+        raise ReplyError("EXECABORT Transaction discarded because of previous errors.")
+    if not client._check_watched():
+        return None
+    keyspace = client._keyspace
+    replies = []
+    with keyspace.atomic():
+        for handler, args in queued:
+            try:
+                replies.append(handler(keyspace, *args))
+            except Exception as exc:
+                replies.append(exc)
+    return [None if type(reply) is Blocked else reply for reply in replies]
+
+
+@_client_command(b'DISCARD', 1)
+def _discard(client):
+    if client._multi is None:
+        raise ReplyError("ERR DISCARD without MULTI")
+    client._multi = None
+    client._watched.clear()
+    return b'OK'
+
+
+@_client_command(b'WATCH', -2)
+def _watch(client, *keys):
+    if client._multi is not None:
+        raise ReplyError("ERR WATCH inside MULTI is not allowed")
+    keyspace = client._keyspace
+    for key in map(_encode, keys):
+        client._watched.setdefault(key, keyspace.version(key))
+    return b'OK'
+
+
+@_client_command(b'UNWATCH', 1)
+def _unwatch(client):
+    client._watched.clear()
+    return b'OK'
+
+
+def _run_atomically(keyspace, calls):
+    '''Run (method, args, kwargs) calls of client methods as one unit
+
+    Returns the results, with the exception of each failed call in its
+    place. The calls don't give control back to the event loop, so no
+    other coroutine can run in between.
+    '''
+    results = []
+    with keyspace.atomic():
+        for method, args, kwargs in calls:
+            try:
+                results.append(_run_sync(method(*args, **kwargs)))
+            except Exception as exc:
+                results.append(exc)
+    return results
+
+
+class MultiExec:
+    '''MULTI/EXEC pipeline wrapper, like aioredis.commands.MultiExec
+
+    Commands called on it return futures, and run as one transaction when
+    execute() is awaited. Errors of single commands don't stop the others,
+    they are set on the futures of the failed commands.
+    '''
+
+    error_class = MultiExecError
+
+    def __init__(self, mock_redis):
+        self._redis = mock_redis
+        # (method, args, kwargs, future) of the queued commands
+        self._calls = []
+        self._done = False
+
+    def __getattr__(self, name):
+        assert not self._done, "Pipeline already executed. Create new one."
+        attr = getattr(self._redis, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            fut = asyncio.get_event_loop().create_future()
+            self._calls.append((attr, args, kwargs, fut))
+            return fut
+        return wrapper
+
+    async def execute(self, *, return_exceptions=False):
+        """Execute all buffered commands as one transaction.
+
+        Any exception that is raised by any command is caught and
+        raised later when processing results.
+        Exceptions can also be returned in result if
+        `return_exceptions` flag is set to True.
+        """
+        assert not self._done, "Pipeline already executed. Create new one."
+        self._done = True
+        if not self._redis._check_watched():
+            error = WatchVariableError("WATCH variable has changed")
+            results = [error] * len(self._calls)
+        else:
+            results = _run_atomically(self._redis._keyspace,
+                                      [call[:3] for call in self._calls])
+        errors = []
+        for result, (_, _, _, fut) in zip(results, self._calls):
+            if isinstance(result, Exception):
+                errors.append(result)
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+        if errors and not return_exceptions:
+            raise self.error_class(errors)
+        return results
+
+
+class TransactionsCommandsMixin:
+    '''Transaction commands mixin
+
+    Run MULTI/EXEC transactions, either with multi_exec() or by sending
+    MULTI, the commands and EXEC through execute()
+    '''
+
+    async def watch(self, key, *keys):
+        """Watch the given keys to determine execution of the MULTI/EXEC block."""
+        return self._execute_client(b'WATCH', key, *keys) == b'OK'
+
+    async def unwatch(self):
+        """Forget about all watched keys."""
+        return self._execute_client(b'UNWATCH') == b'OK'
+
+    def multi_exec(self):
+        """Returns MULTI/EXEC pipeline wrapper.
+
+        Usage:
+
+        >>> tr = redis.multi_exec()
+        >>> fut1 = tr.incr('foo')   # NO `await` as it will block forever!
+        >>> fut2 = tr.incr('bar')
+        >>> result = await tr.execute()
+        >>> result
+        [1, 1]
+        >>> await asyncio.gather(fut1, fut2)
+        [1, 1]
+        """
+        return MultiExec(self)
+
+    def _execute_client(self, name, *args):
+        return lookup(name, len(args))(self, *args)
+
+    def _queue(self, command, args):
+        '''Queue a command sent with execute() between MULTI and EXEC'''
+        # like aioredis, refuse arguments that can't be sent before
+        # anything is queued
+        args = tuple(map(_encode, args))
+        try:
+            handler = lookup(command, len(args))
+        except ReplyError:
+            # like Redis, EXEC fails after errors while queueing
+            self._multi_aborted = True
+            raise
+        if handler in CLIENT_HANDLERS:
+            return handler(self, *args)
+        self._multi.append((handler, args))
+        return b'QUEUED'
+
+    def _check_watched(self):
+        '''Check whether no watched key changed and stop watching them'''
+        keyspace = self._keyspace
+        intact = all(keyspace.version(key) == version
+                     for key, version in self._watched.items())
+        self._watched.clear()
+        return intact
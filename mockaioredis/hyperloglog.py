@@ -0,0 +1,431 @@
+'''HyperLogLog strings in the Redis format
+
+Like in Redis, a HyperLogLog is a string value: a 16 byte header followed
+by the 16384 registers, either as a sparse run-length encoding or as a
+dense array of 6 bit registers. Values can be copied to and from a real
+Redis server with GET and SET.
+
+The sparse encoding is used until a register gets larger than 32 or the
+value grows beyond SPARSE_MAX_BYTES, then the registers are converted to
+the dense encoding. Dense values are updated in place.
+
+Merging registers, for PFMERGE and PFCOUNT over several keys, works on
+whole register arrays at once: the dense array is unpacked with
+bytes.translate() into one byte per register, and the byte-wise maximum
+of two arrays is taken with a handful of big integer operations, so
+there is no Python loop over the registers.
+'''
+import math
+
+from aioredis.errors import ReplyError
+
+__all__ = ['REGISTERS', 'SPARSE_MAX_BYTES', 'add', 'cardinality', 'count', 'is_dense',
+           'is_valid', 'merge', 'new', 'store']
+
+# 2**P registers, the remaining Q hash bits are used to count zeros
+P = 14
+Q = 64 - P
+REGISTERS = 1 << P
+REGISTER_MAX = 63
+
+HEADER_SIZE = 16
+DENSE_SIZE = HEADER_SIZE + (REGISTERS * 6 + 7) // 8
+
+# like the hll-sparse-max-bytes setting of Redis
+SPARSE_MAX_BYTES = 3000
+
+_DENSE = 0
+_SPARSE = 1
+
+_MAGIC = b'HYLL'
+
+# the highest bit of the last byte of the cached cardinality marks it stale
+_STALE = 0x80
+
+# sparse opcodes
+_SPARSE_VAL_MAX_VALUE = 32
+_SPARSE_VAL_MAX_LEN = 4
+_SPARSE_ZERO_MAX_LEN = 64
+_SPARSE_XZERO_MAX_LEN = 16384
+
+_ALPHA_INF = 0.721347520444481703680
+
+_INVALID = "WRONGTYPE Key is not a valid HyperLogLog string value."
+_CORRUPTED = "INVALIDOBJ Corrupted HLL object detected"
+
+_MASK64 = 0xffffffffffffffff
+
+
+def _murmurhash64a(data, seed=0xadc83b19):
+    '''MurmurHash64A, the hash function Redis uses for HyperLogLogs'''
+    m = 0xc6a4a7935bd1e995
+    r = 47
+    length = len(data)
+    h = (seed ^ (length * m)) & _MASK64
+    end = length & ~7
+    for i in range(0, end, 8):
+        k = int.from_bytes(data[i:i+8], 'little')
+        k = (k * m) & _MASK64
+        k ^= k >> r
+        k = (k * m) & _MASK64
+        h ^= k
+        h = (h * m) & _MASK64
+    if length & 7:
+        h ^= int.from_bytes(data[end:], 'little')
+        h = (h * m) & _MASK64
+    h ^= h >> r
+    h = (h * m) & _MASK64
+    h ^= h >> r
+    return h
+
+
+def _position(element):
+    '''Return the register an element goes to and the value it sets there'''
+    h = _murmurhash64a(element)
+    index = h & (REGISTERS - 1)
+    # the position of the first set bit, with a sentinel bit after the
+    # last one so the value is at most Q + 1
+    h = (h >> P) | (1 << Q)
+    return index, (h & -h).bit_length()
+
+
+def new():
+    '''Return an empty HyperLogLog in the sparse encoding'''
+    return bytearray(_header(_SPARSE) + _encode_sparse({}))
+
+
+def _header(encoding):
+    return _MAGIC + bytes((encoding, 0, 0, 0)) + bytes(8)
+
+
+def is_valid(value):
+    '''Check the header of a string value'''
+    if len(value) < HEADER_SIZE or value[:4] != _MAGIC:
+        return False
+    encoding = value[4]
+    if encoding == _DENSE:
+        return len(value) == DENSE_SIZE
+    return encoding == _SPARSE
+
+
+def _check(value):
+    if not is_valid(value):
+        raise ReplyError(_INVALID)
+
+
+def _invalidate(value):
+    value[15] |= _STALE
+
+
+# Sparse encoding
+#
+# The registers are a sequence of runs:
+#   ZERO  00xxxxxx           xxxxxx + 1 registers set to 0
+#   XZERO 01xxxxxx yyyyyyyy  xxxxxxyyyyyyyy + 1 registers set to 0
+#   VAL   1vvvvvxx           xx + 1 registers set to vvvvv + 1
+
+def _sparse_registers(value):
+    '''Return a {register: value} dict of the non-zero registers'''
+    registers = {}
+    index = 0
+    data = value
+    i = HEADER_SIZE
+    n = len(data)
+    while i < n:
+        op = data[i]
+        if op & 0x80:
+            length = (op & 0x3) + 1
+            val = ((op >> 2) & 0x1f) + 1
+            for j in range(index, index + length):
+                registers[j] = val
+            index += length
+            i += 1
+        elif op & 0x40:
+            if i + 1 >= n:
+                raise ReplyError(_CORRUPTED)
+            index += ((op & 0x3f) << 8 | data[i + 1]) + 1
+            i += 2
+        else:
+            index += (op & 0x3f) + 1
+            i += 1
+    if index != REGISTERS:
+        raise ReplyError(_CORRUPTED)
+    return registers
+
+
+def _encode_sparse(registers):
+    '''Run-length encode a {register: value} dict
+
+    Returns None if a register is too large for the sparse encoding.
+    '''
+    out = bytearray()
+    index = 0
+    items = sorted(registers.items())
+    i = 0
+    while i < len(items):
+        start, val = items[i]
+        if val > _SPARSE_VAL_MAX_VALUE:
+            return None
+        _encode_zeros(out, start - index)
+        length = 1
+        while (length < _SPARSE_VAL_MAX_LEN and i + length < len(items) and
+               items[i + length] == (start + length, val)):
+            length += 1
+        out.append(0x80 | (val - 1) << 2 | (length - 1))
+        index = start + length
+        i += length
+    _encode_zeros(out, REGISTERS - index)
+    return out
+
+
+def _encode_zeros(out, length):
+    while length > _SPARSE_ZERO_MAX_LEN:
+        run = min(length, _SPARSE_XZERO_MAX_LEN)
+        out += bytes((0x40 | (run - 1) >> 8, (run - 1) & 0xff))
+        length -= run
+    if length:
+        out.append(length - 1)
+
+
+# Dense encoding
+#
+# 6 bit registers, least significant bits first. Every 3 bytes hold 4
+# registers, which is what the translation tables below unpack and pack.
+
+def _table(func):
+    return bytes(func(i) & 0xff for i in range(256))
+
+
+_LOW6 = _table(lambda b: b & 0x3f)
+_HIGH2 = _table(lambda b: b >> 6)
+_LOW4_UP2 = _table(lambda b: (b & 0xf) << 2)
+_HIGH4 = _table(lambda b: b >> 4)
+_LOW2_UP4 = _table(lambda b: (b & 0x3) << 4)
+_HIGH6 = _table(lambda b: b >> 2)
+_LOW2_UP6 = _table(lambda b: (b & 0x3) << 6)
+_UP2 = _table(lambda b: b << 2)
+_UP4 = _table(lambda b: b << 4)
+
+
+def _or(a, b):
+    '''Byte-wise OR of two byte strings of the same length'''
+    return (int.from_bytes(a, 'little') | int.from_bytes(b, 'little')).to_bytes(
+        len(a), 'little')
+
+
+def _unpack_dense(value):
+    '''Return the registers of a dense value, one byte per register'''
+    data = bytes(value[HEADER_SIZE:])
+    b0, b1, b2 = data[0::3], data[1::3], data[2::3]
+    raw = bytearray(REGISTERS)
+    raw[0::4] = b0.translate(_LOW6)
+    raw[1::4] = _or(b0.translate(_HIGH2), b1.translate(_LOW4_UP2))
+    raw[2::4] = _or(b1.translate(_HIGH4), b2.translate(_LOW2_UP4))
+    raw[3::4] = b2.translate(_HIGH6)
+    return bytes(raw)
+
+
+def _pack_dense(raw):
+    '''Pack one byte per register into the dense encoding'''
+    r0, r1, r2, r3 = raw[0::4], raw[1::4], raw[2::4], raw[3::4]
+    data = bytearray(DENSE_SIZE - HEADER_SIZE)
+    data[0::3] = _or(r0, r1.translate(_LOW2_UP6))
+    data[1::3] = _or(r1.translate(_HIGH6), r2.translate(_UP4))
+    data[2::3] = _or(r2.translate(_HIGH4), r3.translate(_UP2))
+    return data
+
+
+def _dense_get(value, index):
+    pos = index * 6
+    byte = HEADER_SIZE + (pos >> 3)
+    shift = pos & 7
+    reg = value[byte] >> shift
+    if shift > 2:
+        reg |= value[byte + 1] << (8 - shift)
+    return reg & REGISTER_MAX
+
+
+def _dense_set(value, index, reg):
+    pos = index * 6
+    byte = HEADER_SIZE + (pos >> 3)
+    shift = pos & 7
+    value[byte] = (value[byte] & ~(REGISTER_MAX << shift) | reg << shift) & 0xff
+    if shift > 2:
+        value[byte + 1] = (value[byte + 1] & ~(REGISTER_MAX >> (8 - shift)) |
+                           reg >> (8 - shift))
+
+
+def _registers(value):
+    '''Return the registers of a HyperLogLog, one byte per register'''
+    if value[4] == _DENSE:
+        return _unpack_dense(value)
+    return _raw(_sparse_registers(value))
+
+
+def _raw(registers):
+    raw = bytearray(REGISTERS)
+    for index, reg in registers.items():
+        raw[index] = reg
+    return bytes(raw)
+
+
+def _replace(value, registers, raw=None):
+    '''Replace the registers of value, in the sparse encoding if they fit
+
+    registers is a {register: value} dict of the non-zero registers, or
+    None if they are too many for the sparse encoding anyway.
+    '''
+    encoded = None if registers is None else _encode_sparse(registers)
+    if encoded is not None and HEADER_SIZE + len(encoded) <= SPARSE_MAX_BYTES:
+        value[:] = _header(_SPARSE) + encoded
+    else:
+        if raw is None:
+            raw = _raw(registers)
+        value[:] = _header(_DENSE) + _pack_dense(raw)
+    _invalidate(value)
+
+
+def add(value, elements):
+    '''Add elements to the HyperLogLog value, in place
+
+    Returns True if a register changed.
+
+    :raises ReplyError: if value is no valid HyperLogLog
+    '''
+    _check(value)
+    changed = False
+    if value[4] == _SPARSE:
+        registers = _sparse_registers(value)
+        for element in elements:
+            index, reg = _position(element)
+            if reg > registers.get(index, 0):
+                registers[index] = reg
+                changed = True
+        if changed:
+            _replace(value, registers)
+        return changed
+    for element in elements:
+        index, reg = _position(element)
+        if reg > _dense_get(value, index):
+            _dense_set(value, index, reg)
+            changed = True
+    if changed:
+        _invalidate(value)
+    return changed
+
+
+# a 0x80 in every byte of a register array
+_HIGH_BITS = int.from_bytes(b'\x80' * REGISTERS, 'little')
+
+
+def _max(a, b):
+    '''Byte-wise maximum of two register arrays as little endian integers
+
+    All registers are below 0x80, so setting the top bit of every byte of
+    a and subtracting b never borrows across bytes. The top bit of a byte
+    of the difference is then set exactly where a's register is >= b's.
+    '''
+    ge = ((a | _HIGH_BITS) - b) & _HIGH_BITS
+    mask = (ge >> 7) * 0xff
+    return (a & mask) | (b & ~mask)
+
+
+def merge(values):
+    '''Return the register-wise maximum of HyperLogLog values, one byte each
+
+    :raises ReplyError: if a value is no valid HyperLogLog
+    '''
+    merged = 0
+    for value in values:
+        _check(value)
+        merged = _max(merged, int.from_bytes(_registers(value), 'little'))
+    return merged.to_bytes(REGISTERS, 'little')
+
+
+def is_dense(value):
+    '''Return True if value is in the dense encoding'''
+    return value[4] == _DENSE
+
+
+def store(value, raw, dense=False):
+    '''Replace the registers of value with raw, one byte per register
+
+    Like Redis, a value only ever moves from the sparse to the dense
+    encoding: dense values stay dense, and so do sparse ones if dense is
+    True, which PFMERGE passes when one of its inputs is dense.
+    '''
+    registers = None
+    # a sparse VAL opcode holds at most 4 registers in one byte
+    if (not dense and not is_dense(value) and
+            REGISTERS - raw.count(0) <= _SPARSE_VAL_MAX_LEN * SPARSE_MAX_BYTES and
+            max(raw) <= _SPARSE_VAL_MAX_VALUE):
+        registers = {index: reg for index, reg in enumerate(raw) if reg}
+    _replace(value, registers, raw)
+
+
+def _sigma(x):
+    if x == 1.0:
+        return math.inf
+    y = 1.0
+    z = x
+    while True:
+        x *= x
+        z_prime = z
+        z += x * y
+        y += y
+        if z_prime == z:
+            return z
+
+
+def _tau(x):
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y = 1.0
+    z = 1 - x
+    while True:
+        x = math.sqrt(x)
+        z_prime = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z_prime == z:
+            return z / 3
+
+
+def _estimate(histogram):
+    '''The cardinality estimate of Redis, by Otmar Ertl's improved estimator'''
+    m = REGISTERS
+    z = m * _tau((m - histogram[Q + 1]) / m)
+    for j in range(Q, 0, -1):
+        z += histogram[j]
+        z *= 0.5
+    z += m * _sigma(histogram[0] / m)
+    return int(math.floor(_ALPHA_INF * m * m / z + 0.5))
+
+
+def cardinality(raw):
+    '''Estimate the cardinality of registers given one byte per register'''
+    return _estimate([raw.count(reg) for reg in range(Q + 2)])
+
+
+def count(value):
+    '''Return the estimated cardinality of a HyperLogLog value
+
+    Uses and updates the cached cardinality in the header, so value may
+    be changed.
+
+    :raises ReplyError: if value is no valid HyperLogLog
+    '''
+    _check(value)
+    if not value[15] & _STALE:
+        return int.from_bytes(value[8:16], 'little')
+    if value[4] == _SPARSE:
+        registers = _sparse_registers(value)
+        histogram = [0] * (Q + 2)
+        histogram[0] = REGISTERS - len(registers)
+        for reg in registers.values():
+            histogram[reg] += 1
+        result = _estimate(histogram)
+    else:
+        result = cardinality(_unpack_dense(value))
+    value[8:16] = result.to_bytes(8, 'little')
+    return result
@@ -0,0 +1,112 @@
+'Container for Redis sets'
+import collections.abc
+import random
+
+__all__ = ['IndexedSet']
+
+
+class IndexedSet(collections.abc.MutableSet):
+    '''Set with O(1) access to random members
+
+    Members are kept in a list, and a dict maps every member to its
+    position in that list. Removing a member moves the last member into
+    its place, so adding, removing and picking a random member take O(1),
+    and sampling k members takes O(k) no matter how large the set is.
+    '''
+
+    __slots__ = ('_positions', '_members')
+
+    def __init__(self, members=()):
+        self._positions = {}
+        self._members = []
+        self.update(members)
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, member):
+        return member in self._positions
+
+    def __iter__(self):
+        return iter(self._members)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._members)
+
+    def add(self, member):
+        '''Add member, return True if it is new'''
+        positions = self._positions
+        if member in positions:
+            return False
+        positions[member] = len(self._members)
+        self._members.append(member)
+        return True
+
+    def update(self, members):
+        '''Add all of members'''
+        positions = self._positions
+        lst = self._members
+        for member in members:
+            if member not in positions:
+                positions[member] = len(lst)
+                lst.append(member)
+
+    def discard(self, member):
+        '''Remove member, return True if it was in the set'''
+        index = self._positions.pop(member, None)
+        if index is None:
+            return False
+        lst = self._members
+        last = lst.pop()
+        if index < len(lst):
+            lst[index] = last
+            self._positions[last] = index
+        return True
+
+    def difference_update(self, members):
+        '''Remove all of members'''
+        for member in members:
+            self.discard(member)
+
+    def clear(self):
+        self._positions.clear()
+        self._members.clear()
+
+    def choice(self):
+        '''Return a random member
+
+        :raises IndexError: if the set is empty
+        '''
+        return random.choice(self._members)
+
+    def sample(self, k):
+        '''Return a list of min(k, len(self)) distinct random members'''
+        if k >= len(self._members):
+            return list(self._members)
+        return random.sample(self._members, k)
+
+    def choices(self, k):
+        '''Return a list of k random members, which may repeat'''
+        return random.choices(self._members, k=k)
+
+    def pop(self):
+        '''Remove and return a random member
+
+        :raises KeyError: if the set is empty
+        '''
+        if not self._members:
+            raise KeyError('pop from an empty set')
+        member = self.choice()
+        self.discard(member)
+        return member
+
+    def pop_sample(self, k):
+        '''Remove and return a list of min(k, len(self)) random members'''
+        if k >= len(self._members):
+            members = self._members
+            self._members = []
+            self._positions = {}
+            return members
+        members = random.sample(self._members, k)
+        self.difference_update(members)
+        return members
@@ -0,0 +1,669 @@
+'In-process keyspaces shared by fake clients and pools'
+import asyncio
+import collections
+import contextlib
+import heapq
+import itertools
+import sys
+import time
+
+from aioredis.errors import ReplyError
+
+from mockaioredis import memory
+from mockaioredis.indexedset import IndexedSet
+from mockaioredis.pubsub import Broker
+from mockaioredis.scripting import ScriptCache
+from mockaioredis.sortedlist import SortedList
+from mockaioredis.sortedset import SortedSet
+from mockaioredis.stream import Stream
+from mockaioredis.util import _compile_pattern, _pattern_prefix, _scan_page
+
+__all__ = ['Keyspace', 'ManualClock', 'get_keyspace', 'flush_keyspaces', 'reset_keyspaces']
+
+# (address, db) -> Keyspace
+_KEYSPACES = {}
+# address -> Broker shared by all databases, like Pub/Sub in Redis
+_BROKERS = {}
+# address -> ScriptCache shared by all databases, like scripts in Redis
+_SCRIPT_CACHES = {}
+
+_WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+class ManualClock:
+    '''Clock that only moves when told to, for testing expiry
+
+    Pass it as the clock of a Keyspace and call advance() instead of
+    sleeping until keys expire.
+    '''
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        '''Move the clock forward by seconds'''
+        self.now += seconds
+
+
+def _running_loop():
+    '''Return the running event loop, or None outside of one
+
+    asyncio.get_running_loop() only exists from Python 3.7 on, and
+    get_event_loop() warns outside of a running loop on newer versions.
+    '''
+    if sys.version_info >= (3, 7):
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        # no loop set in this thread
+        return None
+    return loop if loop.is_running() else None
+
+
+def _time_out(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class Keyspace:
+    '''A single fake Redis database
+
+    Keys are bytes. Every value is stored in a container matching its Redis
+    type: bytearray for strings, dict for hashes, collections.deque for lists,
+    IndexedSet for sets, SortedSet for sorted sets and Stream for streams.
+    Command implementations get the container of a key with get() or
+    get_or_create() and work on it directly.
+
+    Every write bumps the version of the key it touches, so WATCH can tell
+    whether a key was modified by comparing two integers. Commands that
+    modify a container in place have to report that with changed().
+
+    Deadlines of keys with a time to live are kept in a min-heap. Expired
+    keys are removed when they are accessed, before commands that look at
+    the whole keyspace, and by a timer on the running event loop that fires
+    at the earliest deadline, so they don't linger until someone touches
+    them. Time is read from clock, which defaults to time.time() and can be
+    replaced to control expiry in tests, see ManualClock.
+
+    The memory usage of every key is estimated like Redis would report it,
+    see mockaioredis.memory. The total is kept up to date incrementally:
+    writes only note the key they touch, and memory_stats() estimates the
+    keys written since the last call again instead of the whole keyspace.
+
+    Pub/Sub messages go through broker, and scripts are cached in scripts,
+    which keyspaces of the same address share.
+
+    All keys are also kept in a sorted index, which SCAN walks with cursors
+    that stay valid while keys are added and removed.
+
+    Clients of blocking commands wait in per-key FIFO queues, see block().
+    Creating a container at a key somebody waits on marks the key as ready,
+    as does ready(), and serve_blocked() hands out the new values once the
+    command is done. Nothing polls, idle waiters cost no CPU time.
+    '''
+
+    TYPE_NAMES = {
+        bytearray: b'string',
+        dict: b'hash',
+        collections.deque: b'list',
+        IndexedSet: b'set',
+        SortedSet: b'zset',
+        Stream: b'stream',
+    }
+
+    # containers that stay around when they are empty
+    KEEP_EMPTY = (bytearray, Stream)
+
+    # number of containers sorted_members() keeps sorted copies of
+    SORTED_CACHE_SIZE = 16
+
+    # what serve functions of blocked clients return if just their client
+    # can't be served, see block()
+    SKIP = object()
+
+    def __init__(self, clock=None, broker=None, scripts=None):
+        self.clock = clock or time.time
+        self.broker = broker or Broker()
+        self.scripts = scripts or ScriptCache()
+        self._data = {}
+        # key -> absolute deadline in clock seconds
+        self._expires = {}
+        # heap of (deadline, key); entries whose deadline no longer matches
+        # _expires are stale and skipped when they come up
+        self._deadlines = []
+        # timer handle of the active expiry sweep, its loop and its deadline
+        self._sweep = None
+        self._sweep_loop = None
+        self._sweep_at = None
+        # key -> version of the last write, taken from a keyspace-wide counter
+        self._versions = {}
+        self._version = 0
+        self._index = SortedList()
+        # key -> (version, sorted members), see sorted_members()
+        self._sorted = collections.OrderedDict()
+        # key -> deque of (future, serve) entries of blocked clients
+        self._blocked = {}
+        # keys with blocked clients that got created since the last
+        # serve_blocked()
+        self._ready = collections.deque()
+        # nesting depth of atomic() blocks
+        self._atomic = 0
+        # key -> estimated memory usage in bytes, see memory_stats()
+        self._sizes = {}
+        self._dataset_size = 0
+        self._memory_peak = 0
+        # keys written since their size was last estimated
+        self._unaccounted = set()
+
+    def __len__(self):
+        self._expire_all()
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def _touch(self, key):
+        self._version += 1
+        self._versions[key] = self._version
+        self._unaccounted.add(key)
+
+    def _remove(self, key):
+        del self._data[key]
+        self._expires.pop(key, None)
+        self._index.discard(key)
+        self._touch(key)
+
+    def _check_expired(self, key):
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= self.clock():
+            self._remove(key)
+
+    def _expire_keys(self, keys):
+        '''Remove the expired keys among keys, reading the clock only once'''
+        expires = self._expires
+        if not expires:
+            return
+        now = self.clock()
+        for key in keys:
+            deadline = expires.get(key)
+            if deadline is not None and deadline <= now:
+                self._remove(key)
+
+    def _expire_all(self):
+        '''Remove all expired keys, popping their deadlines off the heap'''
+        deadlines = self._deadlines
+        now = self.clock()
+        while deadlines and deadlines[0][0] <= now:
+            deadline, key = heapq.heappop(deadlines)
+            if self._expires.get(key) == deadline:
+                self._remove(key)
+
+    def _push_deadline(self, key, deadline):
+        deadlines = self._deadlines
+        heapq.heappush(deadlines, (deadline, key))
+        # drop stale entries once they make up most of the heap
+        if len(deadlines) > 2 * len(self._expires) + 64:
+            self._deadlines = [(d, k) for k, d in self._expires.items()]
+            heapq.heapify(self._deadlines)
+        self._schedule_sweep()
+
+    def _schedule_sweep(self):
+        '''Arrange for the earliest deadline to be swept on the event loop
+
+        Does nothing outside of a running event loop, lazy expiry still
+        applies there.
+        '''
+        if not self._deadlines:
+            return
+        loop = _running_loop()
+        if loop is None:
+            return
+        deadline = self._deadlines[0][0]
+        sweep = self._sweep
+        if sweep is not None and not sweep.cancelled():
+            if self._sweep_loop is loop and self._sweep_at <= deadline:
+                return
+            sweep.cancel()
+        self._sweep_loop = loop
+        self._sweep_at = deadline
+        self._sweep = loop.call_later(max(0, deadline - self.clock()), self._run_sweep)
+
+    def _run_sweep(self):
+        self._sweep = None
+        self._expire_all()
+        self._schedule_sweep()
+
+    def get(self, key, kind=None):
+        '''Return the container stored at key, or None if there is none
+
+        :raises ReplyError: if kind is given and the key holds another type
+        '''
+        if key in self._expires:
+            self._check_expired(key)
+        value = self._data.get(key)
+        if value is not None and kind is not None and type(value) is not kind:
+            raise ReplyError(_WRONGTYPE)
+        return value
+
+    def get_or_create(self, key, kind):
+        '''Return the container stored at key for writing
+
+        Creates an empty container if needed and counts as a modification
+        of key.
+
+        :raises ReplyError: if the key holds another type
+        '''
+        value = self.get(key, kind)
+        if value is None:
+            value = self._data[key] = kind()
+            self._index.add(key)
+            self.ready(key)
+        self._touch(key)
+        return value
+
+    def set(self, key, value, *, keepttl=False):
+        '''Store value at key, replacing any previous value'''
+        if self.get(key) is None:
+            self._index.add(key)
+        self._data[key] = value
+        if not keepttl:
+            self._expires.pop(key, None)
+        self._touch(key)
+
+    def delete(self, key):
+        '''Delete key, return True if it existed'''
+        if self.get(key) is None:
+            return False
+        self._remove(key)
+        return True
+
+    # Multi-key variants of the methods above, for commands like MSET and
+    # DEL with many keys. keys must be a list, and each method goes over it
+    # once instead of doing the expiry and index work key by key.
+
+    def get_many(self, keys):
+        '''Return a list of the containers stored at keys, None for missing keys'''
+        self._expire_keys(keys)
+        return list(map(self._data.get, keys))
+
+    def count_existing(self, keys):
+        '''Return how many of keys exist, counting repeated keys repeatedly'''
+        self._expire_keys(keys)
+        return sum(map(self._data.__contains__, keys))
+
+    def set_many(self, items):
+        '''Store the values of a list of (key, value) pairs
+
+        Like calling set() for every pair.
+        '''
+        data = self._data
+        expires = self._expires
+        versions = self._versions
+        version = self._version
+        unaccounted = self._unaccounted
+        new = []
+        for key, value in items:
+            # an expired key is replaced right away, so it doesn't need to
+            # be removed first
+            if key not in data:
+                new.append(key)
+            data[key] = value
+            if expires:
+                expires.pop(key, None)
+            version += 1
+            versions[key] = version
+            unaccounted.add(key)
+        self._version = version
+        self._index.update(new)
+
+    def delete_many(self, keys):
+        '''Delete keys, return the number of keys that existed'''
+        self._expire_keys(keys)
+        data = self._data
+        deleted = 0
+        for key in keys:
+            if key in data:
+                self._remove(key)
+                deleted += 1
+        return deleted
+
+    def changed(self, key):
+        '''Record an in-place modification of the container at key
+
+        Deletes the key if its container is now empty, like Redis does.
+        Empty strings and streams are values of their own and are kept.
+        '''
+        value = self._data.get(key, True)
+        if not value and type(value) not in self.KEEP_EMPTY:
+            self.delete(key)
+        else:
+            self._touch(key)
+
+    def version(self, key):
+        '''Return the modification counter of key
+
+        The counter changes whenever the key is written, deleted or expires.
+        Keys that were never written have version 0.
+        '''
+        if key in self._expires:
+            self._check_expired(key)
+        return self._versions.get(key, 0)
+
+    def keys(self):
+        '''Return a list of all keys'''
+        self._expire_all()
+        return list(self._data)
+
+    def expires_count(self):
+        '''Return the number of keys with a time to live'''
+        self._expire_all()
+        return len(self._expires)
+
+    def keys_matching(self, pattern):
+        '''Return a list of all keys matching a glob-style pattern
+
+        Only the keys starting with the literal prefix of the pattern are
+        looked at, found through the sorted key index. Patterns like
+        b'prefix:*' don't need a regular expression at all.
+        '''
+        self._expire_all()
+        prefix, prefix_only = _pattern_prefix(pattern)
+        if prefix:
+            candidates = list(itertools.takewhile(
+                lambda key: key.startswith(prefix), self._index.irange(prefix)))
+        else:
+            candidates = list(self._index)
+        if not prefix_only:
+            regex = _compile_pattern(pattern)
+            candidates = [key for key in candidates if regex.fullmatch(key)]
+        return candidates
+
+    def scan(self, cursor, match=None, count=None):
+        '''Return a (cursor, keys) page of the keyspace for SCAN'''
+        self._expire_all()
+        return _scan_page(
+            lambda last: self._index.irange(last, inclusive=False),
+            cursor, match, count)
+
+    def sorted_members(self, key, kind):
+        '''Return the members of the container at key as a sorted list
+
+        For hashes, these are the fields. The list is cached until the key
+        is modified, so scanning an unchanged container only sorts it once.
+        Any write to the key throws the list away, and the next call sorts
+        the whole container again, which costs O(n log n).
+
+        :raises ReplyError: if the key holds another type than kind
+        '''
+        container = self.get(key, kind)
+        if container is None:
+            return []
+        version = self._versions.get(key, 0)
+        cached = self._sorted.get(key)
+        if cached is not None and cached[0] == version:
+            self._sorted.move_to_end(key)
+            return cached[1]
+
+        members = sorted(container)
+        self._sorted[key] = (version, members)
+        if len(self._sorted) > self.SORTED_CACHE_SIZE:
+            self._sorted.popitem(last=False)
+        return members
+
+    def memory_usage(self, key, samples=memory.DEFAULT_SAMPLES):
+        '''Return the estimated memory usage of key in bytes, or None if it does not exist
+
+        Like MEMORY USAGE, elements of large containers are sampled, see
+        mockaioredis.memory.usage().
+        '''
+        value = self.get(key)
+        if value is None:
+            return None
+        return memory.usage(key, value, samples)
+
+    def memory_stats(self):
+        '''Return a MemoryStats with the estimated memory usage of the keyspace
+
+        Keys are measured exactly, without sampling. Only the keys written
+        since the last call are measured again.
+        '''
+        self._expire_all()
+        data = self._data
+        sizes = self._sizes
+        dataset = self._dataset_size
+        for key in self._unaccounted:
+            dataset -= sizes.pop(key, 0)
+            value = data.get(key)
+            if value is not None:
+                size = sizes[key] = memory.usage(key, value, 0)
+                dataset += size
+        self._unaccounted.clear()
+        self._dataset_size = dataset
+        overhead = memory.overhead(len(data), len(self._expires))
+        used = dataset + overhead
+        self._memory_peak = max(self._memory_peak, used)
+        return memory.MemoryStats(used, self._memory_peak, overhead, dataset, len(data))
+
+    def type(self, key):
+        '''Return the Redis type name of the value at key'''
+        value = self.get(key)
+        if value is None:
+            return b'none'
+        return self.TYPE_NAMES[type(value)]
+
+    def expire_at(self, key, deadline):
+        '''Set the absolute expiry time of key, return False if it does not exist
+
+        deadline is in seconds of the keyspace clock.
+        '''
+        if self.get(key) is None:
+            return False
+        if deadline <= self.clock():
+            self.delete(key)
+        else:
+            self._expires[key] = deadline
+            self._push_deadline(key, deadline)
+            self._touch(key)
+        return True
+
+    def expire_in(self, key, seconds):
+        '''Let key expire after seconds, return False if it does not exist'''
+        return self.expire_at(key, self.clock() + seconds)
+
+    def persist(self, key):
+        '''Remove the expiry time of key, return True if it had one'''
+        if self.get(key) is None or self._expires.pop(key, None) is None:
+            return False
+        # the heap entry is left behind and skipped as stale
+        self._touch(key)
+        return True
+
+    def ttl(self, key):
+        '''Return the remaining time to live of key in seconds
+
+        Returns None if the key has no expiry and -2 if it does not exist.
+        '''
+        if self.get(key) is None:
+            return -2
+        deadline = self._expires.get(key)
+        if deadline is None:
+            return None
+        return deadline - self.clock()
+
+    async def block(self, keys, serve, timeout=0):
+        '''Wait until serve() returns a reply for one of keys
+
+        serve(keyspace, key) is called by serve_blocked() when key got
+        ready, and returns the reply of the blocked command. It returns None
+        if nobody can be served from key right now, and SKIP if only this
+        client can't, like a stream reader that already saw the new entries.
+        Clients are served in the order they started waiting. Returns None
+        once timeout seconds have passed, a timeout of 0 waits forever.
+        '''
+        # inside a coroutine, this is the running loop on all versions
+        loop = asyncio.get_event_loop()
+        waiter = loop.create_future()
+        entry = (waiter, serve)
+        for key in keys:
+            self._blocked.setdefault(key, collections.deque()).append(entry)
+        timer = None
+        if timeout:
+            timer = loop.call_later(timeout, _time_out, waiter)
+        try:
+            return await waiter
+        finally:
+            if timer is not None:
+                timer.cancel()
+            for key in keys:
+                waiters = self._blocked.get(key)
+                if waiters is None:
+                    continue
+                try:
+                    waiters.remove(entry)
+                except ValueError:
+                    pass
+                if not waiters:
+                    del self._blocked[key]
+
+    def ready(self, key):
+        '''Mark key as ready for the clients blocked on it
+
+        Containers created by get_or_create() are marked automatically,
+        commands that add to an existing container blocking commands wait
+        on, like XADD, have to call this.
+        '''
+        if key in self._blocked:
+            self._ready.append(key)
+
+    @contextlib.contextmanager
+    def atomic(self):
+        '''Run the commands of the with block as one unit
+
+        Blocked clients are served once the block is done instead of after
+        every command, so they can't see intermediate states, and blocking
+        commands reply right away, like in MULTI/EXEC transactions.
+        '''
+        self._atomic += 1
+        try:
+            yield
+        finally:
+            self._atomic -= 1
+        self.serve_blocked()
+
+    @property
+    def in_atomic(self):
+        '''True inside an atomic() block'''
+        return self._atomic > 0
+
+    def serve_blocked(self):
+        '''Serve the clients blocked on keys that got ready
+
+        Has to be called after every command, it returns right away if
+        there is nothing to do or inside an atomic() block.
+        '''
+        ready = self._ready
+        if self._atomic:
+            return
+        while ready:
+            key = ready.popleft()
+            waiters = self._blocked.get(key)
+            i = 0
+            while waiters and i < len(waiters):
+                waiter, serve = waiters[i]
+                if waiter.done():
+                    del waiters[i]
+                    continue
+                try:
+                    reply = serve(self, key)
+                except ReplyError as exc:
+                    del waiters[i]
+                    waiter.set_exception(exc)
+                    continue
+                if reply is None:
+                    break
+                if reply is self.SKIP:
+                    i += 1
+                    continue
+                del waiters[i]
+                waiter.set_result(reply)
+
+    def flush(self):
+        '''Remove all keys'''
+        # every key that existed gets a new version, the versions of keys
+        # that were deleted before are kept. Forgetting them would give a
+        # key written since a WATCH the version it had when it was watched.
+        self._version += 1
+        versions = self._versions
+        for key in self._data:
+            versions[key] = self._version
+        self._data.clear()
+        self._expires.clear()
+        self._deadlines.clear()
+        if self._sweep is not None:
+            self._sweep.cancel()
+            self._sweep = None
+        self._index.clear()
+        self._sorted.clear()
+        self._sizes.clear()
+        self._dataset_size = 0
+        self._unaccounted.clear()
+
+
+def _normalize_address(address):
+    '''Turn an address into something hashable
+
+    aioredis accepts both ('host', port) tuples/lists and URI strings
+    '''
+    if isinstance(address, list):
+        return tuple(address)
+    return address
+
+
+def get_keyspace(address, db=None):
+    '''Return the keyspace for address and db
+
+    Every call for the same address and db returns the same keyspace, so all
+    clients and pool connections created for it see the same data.
+    '''
+    address = _normalize_address(address)
+    key = (address, db or 0)
+    try:
+        return _KEYSPACES[key]
+    except KeyError:
+        broker = _BROKERS.setdefault(address, Broker())
+        scripts = _SCRIPT_CACHES.setdefault(address, ScriptCache())
+        keyspace = _KEYSPACES[key] = Keyspace(broker=broker, scripts=scripts)
+        return keyspace
+
+
+def flush_keyspaces(address=None):
+    '''Remove all data from the registered keyspaces
+
+    If address is given, only flush the databases of that address.
+    Clients that are already connected stay connected to the (now empty)
+    keyspace.
+    '''
+    if address is not None:
+        address = _normalize_address(address)
+    for (addr, _), keyspace in _KEYSPACES.items():
+        if address is None or addr == address:
+            keyspace.flush()
+
+
+def reset_keyspaces():
+    '''Flush and forget all registered keyspaces
+
+    Useful as a test teardown step: clients created afterwards start out
+    with fresh, empty keyspaces.
+    '''
+    flush_keyspaces()
+    _KEYSPACES.clear()
+    _BROKERS.clear()
+    _SCRIPT_CACHES.clear()
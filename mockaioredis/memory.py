@@ -0,0 +1,280 @@
+'''Memory usage estimates of keys, modeled on Redis
+
+Redis measures memory with its allocator, which mockaioredis doesn't
+have. Instead, the size of a key is worked out from the way Redis 7
+would store its value with the default configuration: small hashes, sets
+and sorted sets as listpacks, sets of integers as intsets, larger ones as
+hash tables and skiplists, lists as quicklists of listpack nodes and
+streams as radix trees of listpacks. Allocations are rounded up to the
+size classes of jemalloc.
+
+The numbers won't match a real server byte for byte, but they grow and
+shrink with the data like the ones of Redis do, which is what tests
+catching payload size regressions need.
+'''
+import collections
+import itertools
+import re
+
+from mockaioredis.indexedset import IndexedSet
+from mockaioredis.sortedset import SortedSet
+from mockaioredis.stream import Stream
+
+__all__ = ['MemoryStats', 'DEFAULT_SAMPLES', 'human', 'overhead', 'usage']
+
+# number of elements MEMORY USAGE looks at without SAMPLES
+DEFAULT_SAMPLES = 5
+
+MemoryStats = collections.namedtuple(
+    'MemoryStats',
+    'used_memory used_memory_peak used_memory_overhead used_memory_dataset keys')
+MemoryStats.__doc__ = '''Memory usage of a keyspace in bytes
+
+used_memory is the sum of used_memory_dataset, the sizes of all keys, and
+used_memory_overhead, the hash tables of the keyspace itself.
+used_memory_peak is the largest used_memory reported so far.
+'''
+
+# encoding thresholds of the default Redis configuration
+_LISTPACK_ENTRIES = 128
+_LISTPACK_VALUE = 64
+_INTSET_ENTRIES = 512
+_LIST_NODE_BYTES = 8192
+_STREAM_NODE_BYTES = 4096
+_STREAM_NODE_ENTRIES = 100
+
+# struct sizes on 64 bit platforms
+_ROBJ = 16
+_DICT = 56
+_DICT_ENTRY = 24
+_QUICKLIST = 40
+_QUICKLIST_NODE = 32
+_ZSET = 16 + 32
+_SKIPLIST_HEADER = 24 + 32 * 16
+# with the average of 1.33 levels per node
+_SKIPLIST_NODE = 48
+_STREAM = 56 + 24
+_RAX_NODE = 48
+_CONSUMER_GROUP = 48
+_CONSUMER = 48
+_PENDING = 48
+_LISTPACK_HEADER = 7
+_EMBSTR_MAX = 44
+
+_INT = re.compile(rb'0|-?[1-9][0-9]{0,18}')
+
+
+def _alloc(size):
+    '''Round size up to the next jemalloc size class'''
+    if size <= 8:
+        return 8
+    if size <= 128:
+        return (size + 15) & -16
+    step = 1 << (size - 1).bit_length() - 3
+    return (size + step - 1) & -step
+
+
+def _sds(length):
+    if length < 1 << 8:
+        header = 3
+    elif length < 1 << 16:
+        header = 5
+    elif length < 1 << 32:
+        header = 9
+    else:
+        header = 17
+    return _alloc(header + length + 1)
+
+
+def _dict(length):
+    '''Size of a Redis dict with length entries, without the entries'''
+    buckets = 4
+    while buckets < length:
+        buckets <<= 1
+    return _DICT + _alloc(8 * buckets)
+
+
+def _as_int(value):
+    '''Return value as an integer if Redis would store it as one, or None'''
+    if len(value) <= 20 and _INT.fullmatch(value):
+        number = int(value)
+        if -2 ** 63 <= number < 2 ** 63:
+            return number
+    return None
+
+
+def _lp_int(number):
+    if 0 <= number < 128:
+        size = 1
+    elif -4096 <= number < 4096:
+        size = 2
+    elif -2 ** 15 <= number < 2 ** 15:
+        size = 3
+    elif -2 ** 23 <= number < 2 ** 23:
+        size = 4
+    elif -2 ** 31 <= number < 2 ** 31:
+        size = 5
+    else:
+        size = 9
+    return size + 1
+
+
+def _lp_entry(value):
+    '''Size of a string in a listpack, including its back length'''
+    number = _as_int(value)
+    if number is not None:
+        return _lp_int(number)
+    length = len(value)
+    if length < 64:
+        size = length + 1
+    elif length < 4096:
+        size = length + 2
+    else:
+        size = length + 5
+    if size < 128:
+        return size + 1
+    if size < 16384:
+        return size + 2
+    return size + 3
+
+
+def _lp_score(score):
+    if score.is_integer() and -2 ** 63 <= score < 2 ** 63:
+        return _lp_int(int(score))
+    return _lp_entry(repr(score).encode())
+
+
+def _fits_listpack(values):
+    return all(len(value) <= _LISTPACK_VALUE for value in values)
+
+
+def _sampled(sizes, count, samples):
+    '''Return the total of count sizes, estimated from the first samples
+
+    All of them are added up if samples is 0.
+    '''
+    if samples:
+        sizes = itertools.islice(sizes, samples)
+    total = seen = 0
+    for size in sizes:
+        total += size
+        seen += 1
+    if not seen:
+        return 0
+    return total * count // seen
+
+
+def _string(value):
+    if _as_int(value) is not None:
+        return _ROBJ
+    if len(value) <= _EMBSTR_MAX:
+        return _alloc(_ROBJ + 3 + len(value) + 1)
+    return _ROBJ + _sds(len(value))
+
+
+def _hash(value, samples):
+    length = len(value)
+    if length <= _LISTPACK_ENTRIES and _fits_listpack(itertools.chain.from_iterable(value.items())):
+        entries = sum(_lp_entry(field) + _lp_entry(val) for field, val in value.items())
+        return _ROBJ + _alloc(_LISTPACK_HEADER + entries)
+    return _ROBJ + _dict(length) + _sampled(
+        (_DICT_ENTRY + _sds(len(field)) + _sds(len(val)) for field, val in value.items()),
+        length, samples)
+
+
+def _list(value, samples):
+    payload = _sampled(map(_lp_entry, value), len(value), samples)
+    if len(value) <= _LISTPACK_ENTRIES and payload < _LIST_NODE_BYTES:
+        return _ROBJ + _alloc(_LISTPACK_HEADER + payload)
+    nodes = max(1, -(-payload // _LIST_NODE_BYTES))
+    return _ROBJ + _QUICKLIST + nodes * (
+        _QUICKLIST_NODE + _alloc(_LISTPACK_HEADER + payload // nodes))
+
+
+def _set(value, samples):
+    length = len(value)
+    if length <= _INTSET_ENTRIES:
+        numbers = [_as_int(member) for member in value]
+        if None not in numbers:
+            largest = max(map(abs, numbers), default=0)
+            width = 2 if largest < 2 ** 15 else 4 if largest < 2 ** 31 else 8
+            return _ROBJ + _alloc(8 + width * length)
+    if length <= _LISTPACK_ENTRIES and _fits_listpack(value):
+        return _ROBJ + _alloc(_LISTPACK_HEADER + sum(map(_lp_entry, value)))
+    return _ROBJ + _dict(length) + _sampled(
+        (_DICT_ENTRY + _sds(len(member)) for member in value), length, samples)
+
+
+def _sorted_set(value, samples):
+    length = len(value)
+    scores = value.scores()
+    if length <= _LISTPACK_ENTRIES and _fits_listpack(scores):
+        entries = sum(_lp_entry(member) + _lp_score(score) for member, score in scores.items())
+        return _ROBJ + _alloc(_LISTPACK_HEADER + entries)
+    return _ROBJ + _ZSET + _dict(length) + _SKIPLIST_HEADER + _sampled(
+        (_DICT_ENTRY + _SKIPLIST_NODE + _sds(len(member)) for member in scores),
+        length, samples)
+
+
+def _stream_entry(item):
+    # ID deltas, flags, field count and the back count of the entry
+    _, fields = item
+    return 8 + sum(map(_lp_entry, fields))
+
+
+def _stream(value, samples):
+    length = len(value)
+    payload = _sampled(map(_stream_entry, value), length, samples)
+    nodes = max(-(-payload // _STREAM_NODE_BYTES), -(-length // _STREAM_NODE_ENTRIES))
+    size = _ROBJ + _STREAM
+    if nodes:
+        size += nodes * (_RAX_NODE + _alloc(_LISTPACK_HEADER + payload // nodes))
+    for name, group in value.groups.items():
+        size += _CONSUMER_GROUP + _sds(len(name)) + _RAX_NODE
+        size += len(group.pending) * (_PENDING + _RAX_NODE)
+        for consumer, pending in group.consumers.items():
+            size += _CONSUMER + _sds(len(consumer)) + len(pending) * _RAX_NODE
+    return size
+
+
+def usage(key, value, samples=DEFAULT_SAMPLES):
+    '''Return the estimated size of a key and its value in bytes
+
+    Like MEMORY USAGE, the size of the elements of large containers is
+    estimated from the first samples of them, or all of them if samples
+    is 0. Small containers are always measured exactly.
+    '''
+    kind = type(value)
+    if kind is bytearray:
+        size = _string(value)
+    elif kind is dict:
+        size = _hash(value, samples)
+    elif kind is collections.deque:
+        size = _list(value, samples)
+    elif kind is IndexedSet:
+        size = _set(value, samples)
+    elif kind is SortedSet:
+        size = _sorted_set(value, samples)
+    elif kind is Stream:
+        size = _stream(value, samples)
+    else:
+        raise TypeError("can't estimate the size of {!r}".format(kind))
+    return _DICT_ENTRY + _sds(len(key)) + size
+
+
+def overhead(keys, expires):
+    '''Return the size of the hash tables of a keyspace
+
+    keys and expires are the numbers of keys and of keys with a time to live.
+    '''
+    return _dict(keys) + _dict(expires) + expires * _DICT_ENTRY
+
+
+def human(size):
+    '''Format a number of bytes like the *_human fields of INFO'''
+    if size < 1024:
+        return '{}B'.format(size)
+    for unit in 'KMGTP':
+        size /= 1024
+        if size < 1024 or unit == 'P':
+            return '{:.2f}{}'.format(size, unit)
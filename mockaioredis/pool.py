@@ -54,6 +54,13 @@ class MockRedisPool:
 
     def __init__(self, address, db=0, password=0, encoding=None,
                  *, minsize, maxsize, commands_factory, ssl=None, loop=None):
+        assert isinstance(minsize, int) and minsize >= 0, (
+            "minsize must be int >= 0", minsize, type(minsize))
+        assert maxsize is not None, "Arbitrary pool size is disallowed."
+        assert isinstance(maxsize, int) and maxsize > 0, (
+            "maxsize must be int > 0", maxsize, type(maxsize))
+        assert minsize <= maxsize, (
+            "Invalid pool min/max sizes", minsize, maxsize)
         if loop is not None and sys.version_info >= (3, 8):
             warnings.warn("The loop argument is deprecated",
                           DeprecationWarning)
@@ -70,8 +77,7 @@ class MockRedisPool:
         self._ssl = ssl
         self._loop = loop
 
-        # fake it here, we always only have one connection
-        self._pool = collections.deque(maxlen=1)
+        self._pool = collections.deque(maxlen=maxsize)
         self._used = set()
         self._acquiring = 0
 
@@ -84,15 +90,23 @@ class MockRedisPool:
             self._close_state = asyncio.Event()
             self._close_waiter = asyncio.ensure_future(self._do_close())
 
+    @property
+    def address(self):
+        return self._address
+
+    @property
+    def db(self):
+        return self._db or 0
+
     @property
     def minsize(self):
-        '''always return 1'''
-        return 1
+        '''Minimum pool size'''
+        return self._minsize
 
     @property
     def maxsize(self):
-        '''always return 1'''
-        return 1
+        '''Maximum pool size'''
+        return self._maxsize
 
     @property
     def size(self):
@@ -108,7 +122,12 @@ class MockRedisPool:
             waiters = []
             while self._pool:
                 conn = self._pool.popleft()
-            # fake connections, so no need to do anything for used connections
+                conn.close()
+                waiters.append(conn.wait_closed())
+            for conn in self._used:
+                conn.close()
+                waiters.append(conn.wait_closed())
+            await asyncio.gather(*waiters)
 
     def close(self):
         if not self._close_state.is_set():
@@ -126,9 +145,11 @@ class MockRedisPool:
             await asyncio.shield(self._close_waiter)
 
     async def acquire(self):
-        '''Pretend to aquire a connection.
+        '''Acquire a free connection from the pool
 
-        In fact, always return the same MockRedis object once free'''
+        Creates a new connection if none is free and the pool has not yet
+        reached maxsize, otherwise waits for a connection to be released.
+        '''
         async with self._cond:
             while True:
                 await self._fill_free(override_min=True)
@@ -140,7 +161,7 @@ class MockRedisPool:
                     await self._cond.wait()
 
     def release(self, conn):
-        '''Release our single MockRedis connection'''
+        '''Return a connection to the pool'''
         assert conn in self._used, "Invalid connection, maybe from other pool?"
         self._used.remove(conn)
         self._pool.append(conn)
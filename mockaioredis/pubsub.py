@@ -0,0 +1,169 @@
+'In-process Pub/Sub broker'
+import collections
+
+import aioredis.pubsub
+
+from mockaioredis.util import _compile_pattern, _pattern_prefix
+
+__all__ = ['Broker', 'Channel']
+
+
+class Channel(aioredis.pubsub.Channel):
+    '''aioredis Channel with a bounded queue
+
+    Like Redis disconnects subscribers that fall too far behind, the broker
+    drops the subscription of a channel holding maxsize unread messages
+    and closes it. The messages already queued can still be read.
+    '''
+
+    MAXSIZE = 10000
+
+    def __init__(self, name, is_pattern, loop=None, *, maxsize=None):
+        super().__init__(name, is_pattern, loop=loop)
+        self.maxsize = self.MAXSIZE if maxsize is None else maxsize
+
+    @property
+    def full(self):
+        '''True if the channel holds maxsize unread messages'''
+        return self._queue.qsize() >= self.maxsize
+
+
+class _Pattern:
+    '''Subscribers of a pattern and its compiled matcher'''
+
+    __slots__ = ('match', 'subscribers')
+
+    def __init__(self, pattern):
+        prefix, prefix_only = _pattern_prefix(pattern)
+        # patterns like b'news.*' match everything starting with their
+        # prefix, which the prefix index already made sure of
+        self.match = None if prefix_only else _compile_pattern(pattern).fullmatch
+        self.subscribers = {}
+
+
+class Broker:
+    '''Routes published messages to the channels subscribed to them
+
+    A subscriber is a Channel object (or any aioredis AbcChannel) and the
+    dict of its client that maps names to channels, which loses the entry
+    when the broker drops the subscription.
+
+    Publishing looks the channel name up in a dict, and only tries the
+    patterns whose literal prefix the name starts with. Patterns are grouped
+    by prefix, so a publish costs one dict lookup per distinct prefix
+    length plus one precompiled match per candidate pattern, independent
+    of the number of subscribers and non-matching patterns.
+    '''
+
+    def __init__(self):
+        # channel name -> {channel: client dict}
+        self._channels = {}
+        # pattern -> _Pattern
+        self._patterns = {}
+        # literal prefix -> {pattern: _Pattern}
+        self._prefixes = {}
+        # prefix length -> number of prefixes of that length
+        self._prefix_lengths = collections.Counter()
+
+    def subscribe(self, name, channel, owner):
+        '''Deliver the messages published to name to channel'''
+        self._channels.setdefault(name, {})[channel] = owner
+
+    def unsubscribe(self, name, channel):
+        '''Stop delivering messages published to name to channel'''
+        subscribers = self._channels.get(name)
+        if subscribers is None:
+            return
+        subscribers.pop(channel, None)
+        if not subscribers:
+            del self._channels[name]
+
+    def psubscribe(self, pattern, channel, owner):
+        '''Deliver the messages published to names matching pattern to channel'''
+        entry = self._patterns.get(pattern)
+        if entry is None:
+            entry = self._patterns[pattern] = _Pattern(pattern)
+            prefix, _ = _pattern_prefix(pattern)
+            group = self._prefixes.setdefault(prefix, {})
+            if not group:
+                self._prefix_lengths[len(prefix)] += 1
+            group[pattern] = entry
+        entry.subscribers[channel] = owner
+
+    def punsubscribe(self, pattern, channel):
+        '''Stop delivering messages matching pattern to channel'''
+        entry = self._patterns.get(pattern)
+        if entry is None:
+            return
+        entry.subscribers.pop(channel, None)
+        if entry.subscribers:
+            return
+        del self._patterns[pattern]
+        prefix, _ = _pattern_prefix(pattern)
+        group = self._prefixes[prefix]
+        del group[pattern]
+        if not group:
+            del self._prefixes[prefix]
+            self._prefix_lengths[len(prefix)] -= 1
+            if not self._prefix_lengths[len(prefix)]:
+                del self._prefix_lengths[len(prefix)]
+
+    def publish(self, name, message):
+        '''Deliver message to all subscribers of name, return their number'''
+        receivers = 0
+        dropped = []
+        subscribers = self._channels.get(name)
+        if subscribers:
+            receivers += _deliver(subscribers, message, dropped)
+        if self._patterns:
+            for length in self._prefix_lengths:
+                if length > len(name):
+                    continue
+                group = self._prefixes.get(name[:length])
+                if not group:
+                    continue
+                for entry in group.values():
+                    if entry.match is None or entry.match(name):
+                        receivers += _deliver(entry.subscribers, (name, message), dropped)
+        for channel, owner in dropped:
+            self._drop(channel, owner)
+        return receivers
+
+    def _drop(self, channel, owner):
+        if channel.is_pattern:
+            self.punsubscribe(channel.name, channel)
+        else:
+            self.unsubscribe(channel.name, channel)
+        if owner.get(channel.name) is channel:
+            del owner[channel.name]
+        channel.close()
+
+    def channels(self, pattern=None):
+        '''Return a list of the channel names with subscribers'''
+        if pattern is None:
+            return list(self._channels)
+        match = _compile_pattern(pattern).fullmatch
+        return [name for name in self._channels if match(name)]
+
+    def numsub(self, name):
+        '''Return the number of subscribers of name, without patterns'''
+        return len(self._channels.get(name, ()))
+
+    def numpat(self):
+        '''Return the number of patterns with subscribers'''
+        return len(self._patterns)
+
+
+def _deliver(subscribers, message, dropped):
+    '''Put message into the channels of subscribers, return how many got it
+
+    Full channels are added to dropped instead.
+    '''
+    delivered = 0
+    for channel, owner in subscribers.items():
+        if getattr(channel, 'full', False):
+            dropped.append((channel, owner))
+        else:
+            channel.put_nowait(message)
+            delivered += 1
+    return delivered
@@ -0,0 +1,65 @@
+'Table of the Redis commands the fake clients understand'
+from aioredis.errors import ReplyError
+
+__all__ = ['COMMANDS', 'Blocked', 'command', 'lookup']
+
+# upper case command name -> handler
+COMMANDS = {}
+
+# upper case command name -> arity, counting the command name itself like the
+# Redis command table does; a negative arity -N means at least N
+ARITY = {}
+
+
+def command(name, arity):
+    '''Register the decorated function as the handler of command name
+
+    Handlers are called with the keyspace and the raw command arguments,
+    and return the raw reply: bytes, an int, None or a list of those.
+    They raise ReplyError for everything Redis answers with an error.
+    Blocking commands that can't reply right away return a Blocked
+    instead.
+    '''
+    def register(handler):
+        COMMANDS[name] = handler
+        ARITY[name] = arity
+        return handler
+    return register
+
+
+class Blocked:
+    '''Reply of a blocking command that has to wait for keys
+
+    The client waits with Keyspace.block(keys, serve, timeout) and replies
+    with what it returns.
+    '''
+    __slots__ = ('keys', 'serve', 'timeout')
+
+    def __init__(self, keys, serve, timeout):
+        self.keys = keys
+        self.serve = serve
+        self.timeout = timeout
+
+
+def lookup(name, nargs):
+    '''Return the handler for a call of command name with nargs arguments
+
+    :raises ReplyError: if the command is unknown or nargs does not match
+                        its arity
+    '''
+    if isinstance(name, str):
+        name = name.encode()
+    name = bytes(name).upper()
+    try:
+        arity = ARITY[name]
+    except KeyError:
+        raise ReplyError("ERR unknown command '{}'".format(
+            name.decode(errors='replace'))) from None
+    if arity >= 0:
+        wrong = nargs + 1 != arity
+    else:
+        wrong = nargs + 1 < -arity
+    if wrong:
+        raise ReplyError("ERR wrong number of arguments for '{}' command".format(
+            name.decode(errors='replace').lower()))
+    return COMMANDS[name]
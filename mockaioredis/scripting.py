@@ -0,0 +1,159 @@
+'''Python stand-ins for Lua scripts
+
+There is no Lua interpreter in here. Instead, the Python function
+registered for the source of a script runs whenever a client sends that
+script with EVAL, or its SHA1 digest with EVALSHA after loading it. The
+function gets a ScriptClient to run commands with, just like Lua scripts
+get the redis object, and the KEYS and ARGV lists:
+
+    @mockaioredis.register_script(RELEASE_LOCK)
+    def release_lock(redis, keys, args):
+        if redis.call('GET', keys[0]) == args[0]:
+            return redis.call('DEL', keys[0])
+        return 0
+
+Handlers are plain functions and can't await anything, so a script runs
+as one uninterruptible unit, like it does in Redis.
+'''
+import hashlib
+import inspect
+
+from aioredis.errors import ReplyError
+
+from mockaioredis.registry import Blocked, lookup
+from mockaioredis.util import _encode
+
+__all__ = ['ScriptCache', 'ScriptClient', 'register_script', 'run_script', 'script_sha']
+
+# SHA1 hex digest -> handler of all registered scripts
+_HANDLERS = {}
+
+# commands scripts can't run
+_NOT_ALLOWED = frozenset((b'EVAL', b'EVALSHA', b'SCRIPT', b'MULTI', b'EXEC', b'DISCARD',
+                          b'WATCH', b'UNWATCH'))
+
+
+def script_sha(source):
+    '''Return the SHA1 digest EVALSHA knows script source by, as bytes'''
+    return hashlib.sha1(_encode(source)).hexdigest().encode()
+
+
+def register_script(source):
+    '''Register the decorated function as the implementation of a Lua script
+
+    The function is called as handler(redis, keys, args), with a
+    ScriptClient and the lists of keys and arguments as bytes. Its return
+    value is converted like Lua values are: True becomes 1, False None,
+    floats are truncated to integers, strings are encoded and lists end
+    at their first None.
+    '''
+    def register(handler):
+        if inspect.iscoroutinefunction(handler):
+            raise TypeError("script handlers can't be coroutine functions")
+        _HANDLERS[script_sha(source)] = handler
+        return handler
+    return register
+
+
+class ScriptCache:
+    '''The scripts a server knows, by SHA1 digest
+
+    Like the Redis script cache, it is shared by all databases of a
+    server. Loading a script looks its handler up once, EVALSHA then only
+    takes a dict lookup.
+    '''
+
+    def __init__(self):
+        self._scripts = {}
+
+    def load(self, source):
+        '''Add a script to the cache, return its SHA1 digest and handler
+
+        :raises ReplyError: if no handler is registered for the script
+        '''
+        sha = script_sha(source)
+        handler = self._scripts.get(sha)
+        if handler is None:
+            handler = _HANDLERS.get(sha)
+            if handler is None:
+                raise ReplyError("ERR Error compiling script (new function): no Python "
+                                 "handler registered for script {}".format(sha.decode()))
+            self._scripts[sha] = handler
+        return sha, handler
+
+    def get(self, sha):
+        '''Return the handler of a cached script, or None'''
+        return self._scripts.get(sha.lower())
+
+    def __contains__(self, sha):
+        return sha.lower() in self._scripts
+
+    def flush(self):
+        self._scripts.clear()
+
+
+class ScriptClient:
+    '''The redis object of running scripts'''
+
+    __slots__ = ('_keyspace',)
+
+    def __init__(self, keyspace):
+        self._keyspace = keyspace
+
+    def call(self, command, *args):
+        '''Run a command and return its raw reply
+
+        :raises ReplyError: if the command fails, which fails the script
+        '''
+        handler = lookup(command, len(args))
+        if _encode(command).upper() in _NOT_ALLOWED:
+            raise ReplyError("ERR This Redis command is not allowed from script")
+        reply = handler(self._keyspace, *args)
+        if type(reply) is Blocked:
+            # blocking commands don't block in scripts
+            return None
+        return reply
+
+    def pcall(self, command, *args):
+        '''Run a command, return its raw reply or the ReplyError it failed with'''
+        try:
+            return self.call(command, *args)
+        except ReplyError as exc:
+            return exc
+
+    @staticmethod
+    def error_reply(message):
+        '''Return an error, scripts returning it fail with message'''
+        return ReplyError(message)
+
+    @staticmethod
+    def status_reply(message):
+        return _encode(message)
+
+
+def _convert(value):
+    '''Convert the return value of a handler like Redis converts Lua values'''
+    if value is None or value is False:
+        return None
+    if value is True:
+        return 1
+    if isinstance(value, ReplyError):
+        raise value
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        ret = []
+        for item in value:
+            if item is None:
+                break
+            ret.append(_convert(item))
+        return ret
+    return _encode(value)
+
+
+def run_script(keyspace, handler, keys, args):
+    '''Run a script handler and return the raw reply'''
+    return _convert(handler(ScriptClient(keyspace), list(map(_encode, keys)),
+                            list(map(_encode, args))))
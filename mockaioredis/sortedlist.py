@@ -0,0 +1,217 @@
+'Sorted list used for the key index and sorted sets'
+import bisect
+import itertools
+
+__all__ = ['SortedList']
+
+
+class SortedList:
+    '''List that keeps its values sorted
+
+    Values are stored in a list of sorted sublists holding at most
+    2 * LOAD values each, with the maximum of every sublist kept in a
+    separate list. Finding a value takes two binary searches, and adding or
+    removing one only moves the values of a single sublist.
+
+    Positional access goes through a Fenwick tree over the sublist lengths,
+    which is rebuilt lazily after a sublist is split or removed, so
+    bisect_left(), bisect_right() and indexing take O(log n).
+    '''
+
+    LOAD = 1000
+
+    def __init__(self, iterable=()):
+        self._lists = []
+        self._maxes = []
+        self._len = 0
+        # Fenwick tree over the sublist lengths, None if it needs a rebuild
+        self._tree = None
+        self.update(iterable)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._lists)
+
+    def __contains__(self, value):
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            return False
+        sub = self._lists[i]
+        j = bisect.bisect_left(sub, value)
+        return sub[j] == value
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, list(self))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('list index out of range')
+        i, offset = self._locate(index)
+        return self._lists[i][offset]
+
+    def _build_tree(self):
+        tree = [0]
+        tree.extend(map(len, self._lists))
+        size = len(tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, i, delta):
+        tree = self._tree
+        if tree is None:
+            return
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _offset(self, i):
+        '''Return the number of values in the sublists before sublist i'''
+        if self._tree is None:
+            self._build_tree()
+        tree = self._tree
+        total = 0
+        while i:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        '''Return (sublist, offset) of the value at position index'''
+        if self._tree is None:
+            self._build_tree()
+        tree = self._tree
+        i = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = i + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                i = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return i, index
+
+    def bisect_left(self, value):
+        '''Return the position value would be inserted at, before equal values'''
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            return self._len
+        return self._offset(i) + bisect.bisect_left(self._lists[i], value)
+
+    def bisect_right(self, value):
+        '''Return the position value would be inserted at, after equal values'''
+        i = bisect.bisect_right(self._maxes, value)
+        if i == len(self._maxes):
+            return self._len
+        return self._offset(i) + bisect.bisect_right(self._lists[i], value)
+
+    def islice(self, start=0, stop=None):
+        '''Iterate over the values at positions start to stop'''
+        if stop is None or stop > self._len:
+            stop = self._len
+        if start >= stop:
+            return iter(())
+        i, offset = self._locate(start)
+        return itertools.islice(
+            itertools.chain(
+                itertools.islice(self._lists[i], offset, None),
+                itertools.chain.from_iterable(itertools.islice(self._lists, i + 1, None)),
+            ),
+            stop - start)
+
+    def clear(self):
+        self._lists = []
+        self._maxes = []
+        self._len = 0
+        self._tree = None
+
+    def update(self, iterable):
+        '''Add all values of iterable
+
+        A handful of values is added one by one, larger batches are merged
+        by rebuilding the sublists in a single sort.
+        '''
+        values = list(iterable)
+        if len(values) * 16 < self._len:
+            for value in values:
+                self.add(value)
+            return
+        values.extend(self)
+        values.sort()
+        load = self.LOAD
+        self._lists = [values[i:i+load] for i in range(0, len(values), load)]
+        self._maxes = [sub[-1] for sub in self._lists]
+        self._len = len(values)
+        self._tree = None
+
+    def add(self, value):
+        '''Add value, keeping the list sorted'''
+        maxes = self._maxes
+        if not maxes:
+            self._lists.append([value])
+            maxes.append(value)
+            self._len = 1
+            self._tree = None
+            return
+
+        i = bisect.bisect_left(maxes, value)
+        if i == len(maxes):
+            i -= 1
+            self._lists[i].append(value)
+            maxes[i] = value
+        else:
+            bisect.insort(self._lists[i], value)
+        self._len += 1
+
+        sub = self._lists[i]
+        if len(sub) > 2 * self.LOAD:
+            self._lists[i:i+1] = [sub[:self.LOAD], sub[self.LOAD:]]
+            maxes[i:i+1] = [sub[self.LOAD - 1], sub[-1]]
+            self._tree = None
+        else:
+            self._tree_add(i, 1)
+
+    def discard(self, value):
+        '''Remove value if it is present'''
+        maxes = self._maxes
+        i = bisect.bisect_left(maxes, value)
+        if i == len(maxes):
+            return
+        sub = self._lists[i]
+        j = bisect.bisect_left(sub, value)
+        if sub[j] != value:
+            return
+        del sub[j]
+        self._len -= 1
+        if sub:
+            maxes[i] = sub[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._lists[i]
+            del maxes[i]
+            self._tree = None
+
+    def irange(self, minimum=None, inclusive=True):
+        '''Iterate over the values from minimum onwards
+
+        With inclusive=False, values equal to minimum are skipped.
+        The list must not be modified while iterating.
+        '''
+        if minimum is None:
+            return iter(self)
+        find = bisect.bisect_left if inclusive else bisect.bisect_right
+        i = find(self._maxes, minimum)
+        if i == len(self._maxes):
+            return iter(())
+        first = self._lists[i]
+        return itertools.chain(
+            itertools.islice(first, find(first, minimum), None),
+            itertools.chain.from_iterable(itertools.islice(self._lists, i + 1, None)),
+        )
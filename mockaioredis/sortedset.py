@@ -0,0 +1,95 @@
+'Container for Redis sorted sets'
+import types
+
+from mockaioredis.sortedlist import SortedList
+
+__all__ = ['SortedSet']
+
+
+class _Max:
+    '''Sorts after every member, for score range boundaries'''
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_MAX = _Max()
+
+
+class SortedSet:
+    '''Members with scores, ordered by score and then by member
+
+    Scores are looked up in a dict, the order is kept in a SortedList of
+    (score, member) tuples, so adding, removing and ranking members as
+    well as finding score ranges take O(log n).
+    '''
+
+    __slots__ = ('_scores', '_order')
+
+    def __init__(self, scores=None):
+        '''Create a sorted set, optionally from a {member: score} dict'''
+        self._scores = dict(scores or {})
+        self._order = SortedList((score, member) for member, score in self._scores.items())
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, member):
+        return member in self._scores
+
+    def __iter__(self):
+        '''Iterate over the members in order'''
+        return (member for _, member in self._order)
+
+    def scores(self):
+        '''Return a read-only {member: score} mapping of the set'''
+        return types.MappingProxyType(self._scores)
+
+    def score(self, member):
+        '''Return the score of member, or None if it is not in the set'''
+        return self._scores.get(member)
+
+    def add(self, member, score):
+        '''Add member or update its score, return True if it is new'''
+        old = self._scores.get(member)
+        if old is not None:
+            if old == score:
+                return False
+            self._order.discard((old, member))
+        self._scores[member] = score
+        self._order.add((score, member))
+        return old is None
+
+    def discard(self, member):
+        '''Remove member, return True if it was in the set'''
+        score = self._scores.pop(member, None)
+        if score is None:
+            return False
+        self._order.discard((score, member))
+        return True
+
+    def rank(self, member):
+        '''Return the 0-based position of member, or None if it is not in the set'''
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        return self._order.bisect_left((score, member))
+
+    def slice(self, start, stop):
+        '''Return the (score, member) pairs at positions start to stop'''
+        return list(self._order.islice(start, stop))
+
+    def score_range(self, low, high, exclude_low=False, exclude_high=False):
+        '''Return the (start, stop) positions of the members scored low to high'''
+        if exclude_low:
+            start = self._order.bisect_right((low, _MAX))
+        else:
+            start = self._order.bisect_left((low,))
+        if exclude_high:
+            stop = self._order.bisect_left((high,))
+        else:
+            stop = self._order.bisect_right((high, _MAX))
+        return start, max(start, stop)
@@ -0,0 +1,212 @@
+'Container for Redis streams'
+import bisect
+import itertools
+
+__all__ = ['ConsumerGroup', 'Stream', 'MAX_ID']
+
+_MAX_PART = 2 ** 64 - 1
+
+# IDs are (milliseconds, sequence number) tuples
+MAX_ID = (_MAX_PART, _MAX_PART)
+
+
+class Stream:
+    '''Entries ordered by ID, and the consumer groups reading them
+
+    Entries are kept in chunks of at most CHUNK_SIZE IDs and field lists,
+    with the first ID of every chunk in a separate list. Finding an ID takes
+    two binary searches, appending is O(1), and trimming the head drops
+    whole chunks. Approximate trimming, like MAXLEN ~, only ever drops
+    whole chunks, just like Redis only drops whole macro nodes.
+    '''
+
+    CHUNK_SIZE = 100
+
+    __slots__ = ('_ids', '_fields', '_firsts', '_len', 'last_id', 'groups')
+
+    def __init__(self):
+        self._ids = []
+        self._fields = []
+        self._firsts = []
+        self._len = 0
+        # the largest ID ever added, even if that entry was deleted since
+        self.last_id = (0, 0)
+        # group name -> ConsumerGroup
+        self.groups = {}
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        '''Iterate over (id, fields) pairs in order'''
+        for ids, fields in zip(self._ids, self._fields):
+            yield from zip(ids, fields)
+
+    def append(self, entry_id, fields):
+        '''Add an entry, entry_id has to be larger than last_id'''
+        if not self._ids or len(self._ids[-1]) >= self.CHUNK_SIZE:
+            self._ids.append([entry_id])
+            self._fields.append([fields])
+            self._firsts.append(entry_id)
+        else:
+            self._ids[-1].append(entry_id)
+            self._fields[-1].append(fields)
+        self._len += 1
+        self.last_id = entry_id
+
+    def get(self, entry_id):
+        '''Return the fields of an entry, or None if there is no such entry'''
+        c = bisect.bisect_right(self._firsts, entry_id) - 1
+        if c < 0:
+            return None
+        ids = self._ids[c]
+        p = bisect.bisect_left(ids, entry_id)
+        if p < len(ids) and ids[p] == entry_id:
+            return self._fields[c][p]
+        return None
+
+    def range(self, start, end, count=None):
+        '''Return the (id, fields) pairs with start <= id <= end, in order
+
+        At most count pairs are returned, if count is given.
+        '''
+        ret = []
+        if count is not None and count <= 0:
+            return ret
+        c = max(bisect.bisect_right(self._firsts, start) - 1, 0)
+        p = bisect.bisect_left(self._ids[c], start) if self._ids else 0
+        chunks = zip(itertools.islice(self._ids, c, None),
+                     itertools.islice(self._fields, c, None))
+        for ids, fields in chunks:
+            for entry_id, entry_fields in zip(ids[p:], fields[p:]):
+                if entry_id > end:
+                    return ret
+                ret.append((entry_id, entry_fields))
+                if len(ret) == count:
+                    return ret
+            p = 0
+        return ret
+
+    def revrange(self, end, start, count=None):
+        '''Return the (id, fields) pairs with end >= id >= start, backwards
+
+        At most count pairs are returned, if count is given.
+        '''
+        ret = []
+        if count is not None and count <= 0:
+            return ret
+        c = bisect.bisect_right(self._firsts, end) - 1
+        if c < 0:
+            return ret
+        p = bisect.bisect_right(self._ids[c], end)
+        while c >= 0:
+            ids = self._ids[c]
+            fields = self._fields[c]
+            for i in range(p - 1, -1, -1):
+                if ids[i] < start:
+                    return ret
+                ret.append((ids[i], fields[i]))
+                if len(ret) == count:
+                    return ret
+            c -= 1
+            p = len(self._ids[c]) if c >= 0 else 0
+        return ret
+
+    def delete(self, entry_id):
+        '''Remove an entry, return True if it existed'''
+        c = bisect.bisect_right(self._firsts, entry_id) - 1
+        if c < 0:
+            return False
+        ids = self._ids[c]
+        p = bisect.bisect_left(ids, entry_id)
+        if p == len(ids) or ids[p] != entry_id:
+            return False
+        del ids[p]
+        del self._fields[c][p]
+        if not ids:
+            del self._ids[c]
+            del self._fields[c]
+            del self._firsts[c]
+        elif p == 0:
+            self._firsts[c] = ids[0]
+        self._len -= 1
+        return True
+
+    def trim(self, maxlen, approximate=False):
+        '''Remove the oldest entries until at most maxlen are left
+
+        With approximate, only whole chunks are removed, so a few more
+        entries than maxlen may be left. Returns the number of removed
+        entries.
+        '''
+        before = self._len
+        while self._ids and self._len - len(self._ids[0]) >= maxlen:
+            self._len -= len(self._ids[0])
+            del self._ids[0]
+            del self._fields[0]
+            del self._firsts[0]
+        if not approximate and self._len > maxlen:
+            # the first chunk holds more entries than need to go
+            excess = self._len - maxlen
+            del self._ids[0][:excess]
+            del self._fields[0][:excess]
+            self._firsts[0] = self._ids[0][0]
+            self._len = maxlen
+        return before - self._len
+
+
+class _Pending:
+    '''Delivered but not yet acknowledged entry of a consumer group'''
+
+    __slots__ = ('consumer', 'delivered', 'count')
+
+    def __init__(self, consumer, delivered, count=1):
+        self.consumer = consumer
+        # time of the last delivery in milliseconds
+        self.delivered = delivered
+        self.count = count
+
+
+class ConsumerGroup:
+    '''Read position and pending entries of a consumer group
+
+    pending maps the IDs of entries delivered but not yet acknowledged to
+    their consumer, last delivery time and delivery count. consumers maps
+    consumer names to the {id: None} dicts of their pending entries.
+    '''
+
+    __slots__ = ('last_id', 'pending', 'consumers')
+
+    def __init__(self, last_id):
+        self.last_id = last_id
+        self.pending = {}
+        self.consumers = {}
+
+    def consumer(self, name):
+        '''Return the pending IDs of a consumer, creating it if needed'''
+        pending = self.consumers.get(name)
+        if pending is None:
+            pending = self.consumers[name] = {}
+        return pending
+
+    def deliver(self, entry_id, consumer, now):
+        '''Record that an entry was delivered to consumer at now'''
+        self.pending[entry_id] = _Pending(consumer, now)
+        self.consumer(consumer)[entry_id] = None
+
+    def claim(self, entry_id, consumer, delivered):
+        '''Hand a pending entry over to consumer, return its _Pending'''
+        pending = self.pending[entry_id]
+        del self.consumers[pending.consumer][entry_id]
+        pending.consumer = consumer
+        pending.delivered = delivered
+        self.consumer(consumer)[entry_id] = None
+        return pending
+
+    def ack(self, entry_id):
+        '''Remove an entry from the pending entries, return True if it was there'''
+        pending = self.pending.pop(entry_id, None)
+        if pending is None:
+            return False
+        del self.consumers[pending.consumer][entry_id]
+        return True
@@ -1,39 +1,379 @@
+import bisect
+import functools
+import itertools
+import math
+import re
+
+from aioredis.errors import ReplyError
+
 _NOTSET = object()
 
+# range of Redis integers, like the values INCR works on
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+# integers the way Redis writes them: no sign but -, no leading zeros,
+# whitespace or underscores
+_INT_RE = re.compile(rb'0|-?[1-9][0-9]*')
+# floats like strtold() reads them, without whitespace or underscores
+_FLOAT_RE = re.compile(rb'[+-]?(?:(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?|inf|infinity)',
+                       re.IGNORECASE)
+
+# Same argument conversion rules as aioredis.util.encode_command
+_converters = {
+    bytes: lambda val: val,
+    bytearray: lambda val: bytes(val),
+    str: lambda val: val.encode(),
+    int: lambda val: b'%d' % val,
+    float: lambda val: b'%r' % val,
+}
+
 
 class _ScanIter:
 
-    __slots__ = ("_scan", "_cur", "_ret")
+    __slots__ = ("_scan", "_cur", "_ret", "_pos")
 
     def __init__(self, scan):
         self._scan = scan
         self._cur = b"0"
         self._ret = []
+        # index of the next item of _ret to return
+        self._pos = 0
 
     def __aiter__(self):
         return self
 
     async def __anext__(self):
-        while not self._ret and self._cur:
+        while self._pos >= len(self._ret) and self._cur:
             self._cur, self._ret = await self._scan(self._cur)
-        if not self._cur and not self._ret:
+            self._pos = 0
+        if self._pos >= len(self._ret):
             raise StopAsyncIteration  # noqa
         else:
-            ret = self._ret.pop(0)
+            ret = self._ret[self._pos]
+            self._pos += 1
             return ret
 
+    async def batches(self):
+        """Iterate over whole pages of results instead of single items
+
+        Usage example:
+
+        >>> async for page in redis.isscan(key).batches():
+        ...     print('Got', len(page), 'members')
+
+        """
+        if self._pos < len(self._ret):
+            yield self._ret[self._pos:]
+        self._ret = []
+        self._pos = 0
+        while self._cur:
+            self._cur, ret = await self._scan(self._cur)
+            if ret:
+                yield ret
+
+
+def _run_sync(coro):
+    """Run a coroutine that never suspends to completion and return its result
+
+    All commands that only touch the keyspace complete without ever yielding
+    to the event loop, so they can be driven without scheduling a task.
+    """
+    try:
+        coro.send(None)
+    except StopIteration as exc:
+        return exc.value
+    coro.close()
+    raise RuntimeError("{!r} can't be run synchronously".format(coro))
+
+
+def _encode(value):
+    """Encode a command argument to bytes, the way aioredis would send it
+
+    Raises TypeError if value is not of bytearray, bytes, float, int or str type
+    """
+    try:
+        return _converters[type(value)](value)
+    except KeyError:
+        raise TypeError("Argument {!r} expected to be of bytearray, bytes,"
+                        " float, int, or str type".format(value)) from None
+
+
+def _int_arg(value, error="ERR value is not an integer or out of range"):
+    """Parse an integer command argument or stored value
+
+    Only accepts what Redis accepts: 64 bit integers written without
+    whitespace, underscores, + signs or leading zeros. Empty strings are
+    not integers either.
+    """
+    if type(value) is int:
+        return value
+    value = _encode(value)
+    if len(value) <= 20 and _INT_RE.fullmatch(value):
+        number = int(value)
+        if _INT64_MIN <= number <= _INT64_MAX:
+            return number
+    raise ReplyError(error)
+
+
+def _float_arg(value, error="ERR value is not a valid float"):
+    """Parse a float command argument or stored value
+
+    Accepts inf, +inf and -inf, but no whitespace or underscores.
+    """
+    if type(value) is int:
+        value = float(value)
+    elif type(value) is not float:
+        value = _encode(value)
+        if not _FLOAT_RE.fullmatch(value):
+            raise ReplyError(error)
+        value = float(value)
+    if math.isnan(value):
+        raise ReplyError(error)
+    return value
+
+
+def _format_float(value):
+    """Format a float reply the way Redis does, e.g. for scores"""
+    if math.isinf(value):
+        return b'inf' if value > 0 else b'-inf'
+    if value.is_integer() and abs(value) < 1e17:
+        return b'%d' % value
+    return repr(value).encode()
+
+
+def _option(value):
+    """Return a command option like b'WITHSCORES' in upper case"""
+    return _encode(value).upper()
+
+
+def _scan_args(cursor, args):
+    """Parse the arguments of the *SCAN commands
+
+    Returns a (cursor, match, count) tuple.
+    """
+    # cursors hold whole keys, so they are not limited to 64 bits
+    if type(cursor) is not int:
+        cursor = _encode(cursor)
+        if not _INT_RE.fullmatch(cursor):
+            raise ReplyError("ERR invalid cursor")
+        cursor = int(cursor)
+    match = count = None
+    if len(args) % 2:
+        raise ReplyError("ERR syntax error")
+    for option, value in zip(args[::2], args[1::2]):
+        option = _option(option)
+        if option == b'MATCH':
+            match = _encode(value)
+        elif option == b'COUNT':
+            count = _int_arg(value)
+            if count < 1:
+                raise ReplyError("ERR syntax error")
+        else:
+            raise ReplyError("ERR syntax error")
+    return cursor, match, count
+
+
+def _compile_pattern(pattern):
+    """Compile a Redis glob-style pattern into a bytes regular expression
+
+    Supports the same syntax as Redis: *, ?, [abc], [^abc], [a-z] and
+    backslash escapes. Use fullmatch() on the result. Compiled patterns
+    are cached.
+    """
+    return _compile_encoded_pattern(_encode(pattern))
+
 
-def _decode_item(item, encoding):
-    if encoding and hasattr(item, "decode"):
-        return item.decode(encoding)
+def _pattern_prefix(pattern):
+    """Return the literal prefix of a Redis glob-style pattern
+
+    Returns a (prefix, prefix_only) tuple. prefix_only is True if the
+    pattern matches exactly the values starting with prefix, like
+    b'session:*' does.
+    """
+    return _encoded_pattern_prefix(_encode(pattern))
+
+
+@functools.lru_cache(maxsize=256)
+def _encoded_pattern_prefix(pattern):
+    prefix = bytearray()
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i:i+1]
+        if c in (b'*', b'?', b'['):
+            break
+        if c == b'\\' and i + 1 < n:
+            i += 1
+            c = pattern[i:i+1]
+        prefix += c
+        i += 1
+    rest = pattern[i:]
+    return bytes(prefix), bool(rest) and not rest.strip(b'*')
+
+
+def _class_end(pattern, i):
+    """Return the index of the ] closing the class starting at i, or -1
+
+    Escaped brackets don't close classes. A class that isn't closed is
+    matched as literal characters, like Redis does.
+    """
+    n = len(pattern)
+    while i < n:
+        c = pattern[i:i+1]
+        if c == b'\\':
+            i += 2
+        elif c == b']':
+            return i
+        else:
+            i += 1
+    return -1
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_encoded_pattern(pattern):
+    i, n = 0, len(pattern)
+    res = []
+    while i < n:
+        c = pattern[i:i+1]
+        i += 1
+        if c == b'*':
+            res.append(b'.*')
+        elif c == b'?':
+            res.append(b'.')
+        elif c == b'\\' and i < n:
+            res.append(re.escape(pattern[i:i+1]))
+            i += 1
+        elif c == b'[':
+            end = _class_end(pattern, i)
+            if end == -1:
+                res.append(re.escape(c))
+                continue
+            negate = pattern[i:i+1] == b'^'
+            if negate:
+                i += 1
+            chars = []
+            while i < end:
+                c = pattern[i:i+1]
+                if c == b'\\' and i + 1 < n:
+                    chars.append(re.escape(pattern[i+1:i+2]))
+                    i += 2
+                elif pattern[i+1:i+2] == b'-' and i + 2 < end:
+                    low, high = sorted((c, pattern[i+2:i+3]))
+                    chars.append(re.escape(low) + b'-' + re.escape(high))
+                    i += 3
+                else:
+                    chars.append(re.escape(c))
+                    i += 1
+            i = end + 1
+            if chars:
+                res.append(b'[' + (b'^' if negate else b'') + b''.join(chars) + b']')
+            else:
+                res.append(b'.' if negate else b'(?!)')
+        else:
+            res.append(re.escape(c))
+    return re.compile(b''.join(res), re.DOTALL)
+
+
+def _translate_range(length, start, stop):
+    """Turn inclusive Redis start/stop indices into a Python range"""
+    if start < 0:
+        start = max(length + start, 0)
+    if stop < 0:
+        stop += length
+    stop = min(stop, length - 1)
+    if start > stop:
+        return range(0)
+    return range(start, stop + 1)
+
+
+def _encode_cursor(value):
+    """Turn the last value returned by a *SCAN call into the next cursor
+
+    The cursor is the value as a big-endian integer, with a leading 0x01
+    byte so that leading null bytes survive the round trip.
+    """
+    return int.from_bytes(b'\x01' + value, 'big')
+
+
+def _decode_cursor(cursor):
+    """Return the value a *SCAN cursor points after, None to start over"""
+    cursor = int(cursor)
+    if cursor <= 0:
+        return None
+    return cursor.to_bytes((cursor.bit_length() + 7) // 8, 'big')[1:]
+
+
+def _scan_page(irange, cursor, match, count):
+    """Return a (cursor, values) page for the *SCAN commands
+
+    irange(last) has to iterate over the scanned values in sorted order,
+    starting after last (or at the beginning if last is None). Cursors
+    point after the last value returned, so scanning is stable under
+    concurrent modification: values present for the whole scan are
+    returned exactly once. Reading a page costs O(count) on top of
+    whatever irange() takes to get going: a binary search for the
+    SortedList of the key index, but for containers sorted with
+    Keyspace.sorted_members() a full O(n log n) sort whenever the
+    container changed since the last page.
+    """
+    if count is None:
+        count = 10
+    count = int(count)
+    if count <= 0:
+        raise ValueError('if specified, count must be > 0: %s' % count)
+
+    page = list(itertools.islice(irange(_decode_cursor(cursor)), count + 1))
+    if len(page) > count:
+        del page[count:]
+        next_cursor = _encode_cursor(page[-1])
     else:
-        return item
+        next_cursor = 0
+
+    if match is not None:
+        regex = _compile_pattern(match)
+        page = [val for val in page if regex.fullmatch(val)]
+    return next_cursor, page
+
+
+def _irange_sorted(values):
+    """Return an irange function for _scan_page over a sorted list"""
+    def irange(last):
+        start = 0 if last is None else bisect.bisect_right(values, last)
+        return itertools.islice(values, start, None)
+    return irange
+
+
+# Response decoding
+#
+# Raw replies only ever contain bytes, None for missing values, integers
+# and lists of those. The encoding is checked once per reply, and then
+# the whole reply is decoded in one go.
+
+_bytes_decode = bytes.decode
 
 
 def _decode_items(items, encoding):
+    """Decode a reply list, returning a new list
+
+    Lists of only bytes are decoded in a single pass without any per-item
+    checks. If that fails because of a None (like in MGET replies), a
+    number or a nested list, the list is decoded again item by item.
+    """
     if encoding is None:
-        return items
-    else:
-        return (
-            item.decode(encoding) if hasattr(item, "decode") else item for item in items
-        )
+        return list(items)
+    if not isinstance(items, (list, tuple)):
+        items = list(items)
+    try:
+        return [_bytes_decode(item, encoding) for item in items]
+    except TypeError:
+        return [_decode_reply(item, encoding) for item in items]
+
+
+def _decode_reply(reply, encoding):
+    """Decode all bulk strings of a raw reply, like aioredis does"""
+    if encoding is None:
+        return reply
+    if type(reply) is bytes:
+        return _bytes_decode(reply, encoding)
+    if type(reply) is list:
+        return _decode_items(reply, encoding)
+    return reply
@@ -3,7 +3,6 @@ from setuptools.command.test import test as TestCommand
 
 install_requires = [
     'aioredis',
-    'mockredispy-kblin >= 2.9.3.3',
 ]
 
 tests_require = [
@@ -1,8 +1,15 @@
 import pytest
 
+import mockaioredis
 from mockaioredis import MockRedis
 
 
 @pytest.fixture
 def redis():
     return MockRedis(strict=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_keyspaces():
+    yield
+    mockaioredis.reset_keyspaces()
@@ -1,10 +1,15 @@
+import asyncio
+
 import pytest
+from aioredis.errors import ReplyError, WatchVariableError
+
+import mockaioredis
 
 
 @pytest.mark.asyncio
 async def test_exists(redis):
-    redis._redis.set('foo', 'bar')
-    redis._redis.set('baz', 'blub')
+    await redis.set('foo', 'bar')
+    await redis.set('baz', 'blub')
 
     val = await redis.exists('blargh')
     assert 0 == val
@@ -24,9 +29,9 @@ async def test_exists(redis):
 
 @pytest.mark.asyncio
 async def test_expire(redis):
-    redis._redis.set('foo', 'bar')
+    await redis.set('foo', 'bar')
     await redis.expire('foo', 30)
-    assert redis._redis.ttl('foo') <= 30
+    assert await redis.ttl('foo') <= 30
 
     with pytest.raises(TypeError):
         # the sync version supports timedeltas, so people might get this wrong
@@ -36,23 +41,23 @@ async def test_expire(redis):
 
 @pytest.mark.asyncio
 async def test_delete(redis):
-    redis._redis.set('foo', 'bar')
-    redis._redis.set('baz', 'blub')
-    redis._redis.set('blargh', 'blurgh')
+    await redis.set('foo', 'bar')
+    await redis.set('baz', 'blub')
+    await redis.set('blargh', 'blurgh')
 
     val = await redis.delete('foo')
     assert 1 == val
-    assert False == redis._redis.exists('foo')
+    assert 0 == await redis.exists('foo')
 
     val = await redis.delete('foo', 'baz', 'blargh')
     assert 2 == val
-    assert False == redis._redis.exists('baz')
-    assert False == redis._redis.exists('blargh')
+    assert 0 == await redis.exists('baz')
+    assert 0 == await redis.exists('blargh')
 
 
 @pytest.mark.asyncio
 async def test_get(redis):
-    redis._redis.set('foo', 'bar')
+    await redis.set('foo', 'bar')
     val = await redis.get('foo')
     assert val == b'bar'
 
@@ -62,7 +67,7 @@ async def test_get(redis):
 
 @pytest.mark.asyncio
 async def test_incr(redis):
-    redis._redis.set('foo', '1')
+    await redis.set('foo', '1')
     val = await redis.incr('foo')
     assert val == 2
 
@@ -75,9 +80,9 @@ async def test_incr(redis):
 
 @pytest.mark.asyncio
 async def test_keys(redis):
-    redis._redis.set('foo', 'bar')
-    redis._redis.set('baz', 'blub')
-    redis._redis.set('blargh', 'blurgh')
+    await redis.set('foo', 'bar')
+    await redis.set('baz', 'blub')
+    await redis.set('blargh', 'blurgh')
 
     ret = await redis.keys('b*')
     assert len(ret) == 2
@@ -96,9 +101,9 @@ async def test_keys(redis):
 
 @pytest.mark.asyncio
 async def test_mget(redis):
-    redis._redis.set('foo', 'bar')
-    redis._redis.set('baz', 'blub')
-    redis._redis.set('blargh', 'wjdfk')
+    await redis.set('foo', 'bar')
+    await redis.set('baz', 'blub')
+    await redis.set('blargh', 'wjdfk')
 
     ret = await redis.mget(['foo', 'blargh'], encoding='utf-8')
     assert ret == ['bar', 'wjdfk']
@@ -114,11 +119,15 @@ async def test_mget(redis):
     ret = await redis.mget([], 'baz', 'foo', encoding='utf-8')
     assert ret == ['blub', 'bar']
 
+    await redis.sadd('set', 'member')
+    ret = await redis.mget('foo', 'missing', 'set', 'baz', encoding='utf-8')
+    assert ret == ['bar', None, None, 'blub']
+
 
 @pytest.mark.asyncio
 async def test_set(redis):
     await redis.set('foo', 'bar')
-    assert redis._redis.get('foo') == b'bar'
+    assert await redis.get('foo') == b'bar'
 
 
 @pytest.mark.asyncio
@@ -133,7 +142,7 @@ async def test_dbsize(redis):
 
 @pytest.mark.asyncio
 async def test_ttl(redis):
-    redis._redis.setex('foo', 30, 'bar')
+    await redis.set('foo', 'bar', expire=30)
     ret = await redis.ttl('foo')
     assert ret <= 30
 
@@ -152,15 +161,378 @@ async def test_pipeline(redis):
     ('b*', 0, None, 0, [b'baz', b'blargh']),
     ('gnarf*', b'0', None, 0, []),
     ('f*', 0, None, 0, [b'foo']),
-    ('*', 0, 2, 2, [b'baz', b'blargh']),
-    ('*', 2, 2, 0, [b'foo'])
+    ('*', 0, 3, 0, [b'baz', b'blargh', b'foo']),
 ])
 async def test_scan(redis, match, cursor, count, expected_cursor, expected_keys):
-    redis._redis.set('foo', 'bar')
-    redis._redis.set('baz', 'blurb')
-    redis._redis.set('blargh', 'blurgh')
+    await redis.set('foo', 'bar')
+    await redis.set('baz', 'blurb')
+    await redis.set('blargh', 'blurgh')
 
     cursor, keys = await redis.scan(match=match, cursor=cursor, count=count)
     assert cursor == expected_cursor
     assert len(keys) == len(expected_keys)
     assert keys == expected_keys
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('pattern, expected', [
+    ('b?z', [b'b*z', b'baz', b'bez']),
+    ('b[ae]z', [b'baz', b'bez']),
+    ('b[^a]z', [b'b*z', b'bez']),
+    ('b[a-c]*', [b'baz']),
+    ('b\\*z', [b'b*z']),
+    ('b\\**', [b'b*z']),
+    ('bl*', [b'blargh']),
+    ('bl*h', [b'blargh']),
+    ('baz', [b'baz']),
+    ('*', [b'b*z', b'baz', b'bez', b'blargh']),
+])
+async def test_keys_patterns(redis, pattern, expected):
+    for key in ('baz', 'bez', 'b*z', 'blargh'):
+        await redis.set(key, 'value')
+
+    ret = await redis.keys(pattern)
+    assert sorted(ret) == expected
+
+
+@pytest.mark.asyncio
+async def test_keys_unclosed_class(redis):
+    for key in ('a', 'a[', 'a[]', 'a[]z', 'a]'):
+        await redis.set(key, 'value')
+
+    assert await redis.keys('a[\\]') == [b'a[]']
+    assert await redis.keys('a[') == [b'a[']
+    assert sorted(await redis.keys('a[\\]*')) == [b'a[]', b'a[]z']
+    assert await redis.scan(match='[\\') == (0, [])
+
+
+@pytest.mark.asyncio
+async def test_pipeline_watch(redis):
+    await redis.set('foo', 'bar')
+    pipe = redis.pipeline()
+    pipe.watch('foo')
+    pipe.multi()
+    pipe.set('foo', 'baz')
+    await redis.set('foo', 'blub')
+    with pytest.raises(WatchVariableError):
+        await pipe.execute()
+    assert await redis.get('foo') == b'blub'
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batch(redis):
+    pipe = redis.pipeline()
+    for _ in range(1000):
+        pipe.incr('foo')
+    pipe.get('foo')
+    ret = await pipe.execute()
+    assert ret == list(range(1, 1001)) + [b'1000']
+    assert pipe.commands == []
+
+
+@pytest.mark.asyncio
+async def test_pipeline_error(redis):
+    await redis.hset('foo', 'bar', 'baz')
+    pipe = redis.pipeline()
+    pipe.set('baz', 'blub')
+    pipe.incr('foo')
+    with pytest.raises(ReplyError):
+        await pipe.execute()
+    assert await redis.get('baz') == b'blub'
+
+
+@pytest.mark.asyncio
+async def test_pipeline_errors_per_command(redis):
+    await redis.hset('foo', 'bar', 'baz')
+    pipe = redis.pipeline()
+    pipe.incr('foo')
+    pipe.incr('counter')
+    error, counter = await pipe.execute(raise_on_error=False)
+    assert isinstance(error, ReplyError)
+    assert 1 == counter
+
+
+@pytest.mark.asyncio
+async def test_pipeline_watch_unchanged(redis):
+    await redis.hset('foo', 'bar', 'baz')
+    pipe = redis.pipeline()
+    pipe.watch('foo', 'blub')
+    await redis.hget('foo', 'bar')
+    await redis.set('other', 'value')
+    pipe.multi()
+    pipe.hset('foo', 'bar', 'blargh')
+    assert await pipe.execute() == [0]
+    assert await redis.hget('foo', 'bar') == b'blargh'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('modify', [
+    lambda redis: redis.hset('foo', 'bar', 'blargh'),
+    lambda redis: redis.hdel('foo', 'bar'),
+    lambda redis: redis.delete('foo'),
+    lambda redis: redis.expire('foo', 30),
+    lambda redis: redis.set('foo', 'bar'),
+])
+async def test_pipeline_watch_in_place(redis, modify):
+    await redis.hmset('foo', 'bar', 'baz', 'blub', 'blargh')
+    pipe = redis.pipeline()
+    pipe.watch('foo')
+    await modify(redis)
+    pipe.multi()
+    pipe.get('other')
+    with pytest.raises(WatchVariableError):
+        await pipe.execute()
+
+
+@pytest.mark.asyncio
+async def test_scan_count(redis):
+    await redis.set('foo', 'bar')
+    await redis.set('baz', 'blurb')
+    await redis.set('blargh', 'blurgh')
+
+    cursor, keys = await redis.scan(count=2)
+    assert cursor != 0
+    assert keys == [b'baz', b'blargh']
+
+    cursor, keys = await redis.scan(cursor, count=2)
+    assert cursor == 0
+    assert keys == [b'foo']
+
+
+@pytest.mark.asyncio
+async def test_scan_stable(redis):
+    for i in range(100):
+        await redis.set('key:{:03}'.format(i), i)
+
+    seen = []
+    cursor = 0
+    while True:
+        cursor, keys = await redis.scan(cursor, count=7)
+        seen.extend(keys)
+        # modifications between calls must not cause duplicates or
+        # skip keys that exist throughout the scan
+        await redis.delete('key:{:03}'.format(99 - len(seen) // 7))
+        await redis.set('new:{}'.format(len(seen)), 'value')
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen))
+    for i in range(80):
+        assert 'key:{:03}'.format(i).encode() in seen
+
+
+@pytest.mark.asyncio
+async def test_iscan(redis):
+    for i in range(25):
+        await redis.set('key:{}'.format(i), i)
+    await redis.set('other', 'value')
+
+    keys = [key async for key in redis.iscan(match='key:*', count=4)]
+    assert len(keys) == 25
+    assert set(keys) == {'key:{}'.format(i).encode() for i in range(25)}
+
+
+@pytest.mark.asyncio
+async def test_keys_prefix(redis):
+    for i in range(50):
+        await redis.set('session:{}'.format(i), i)
+        await redis.set('user:{}'.format(i), i)
+    await redis.set('session', 'no colon')
+    await redis.set('session:expired', 'value', pexpire=1)
+    await asyncio.sleep(0.01)
+
+    ret = await redis.keys('session:*')
+    assert sorted(ret) == sorted('session:{}'.format(i).encode() for i in range(50))
+
+    ret = await redis.keys('session:1*', encoding='utf-8')
+    assert sorted(ret) == ['session:1'] + ['session:1{}'.format(i) for i in range(10)]
+
+
+@pytest.fixture
+def clock():
+    return mockaioredis.ManualClock(1000.0)
+
+
+@pytest.fixture
+def timed_redis(clock):
+    return mockaioredis.MockRedis(keyspace=mockaioredis.Keyspace(clock=clock))
+
+
+@pytest.mark.asyncio
+async def test_expire_clock(timed_redis, clock):
+    redis = timed_redis
+    await redis.set('foo', 'bar')
+    await redis.set('baz', 'blub', pexpire=1500)
+    assert await redis.expire('foo', 10) is True
+    assert await redis.expire('missing', 10) is False
+    assert await redis.dbsize() == 2
+
+    clock.advance(1.5)
+    assert await redis.dbsize() == 1
+    assert await redis.ttl('foo') == 9
+    assert await redis.pttl('foo') == 8500
+
+    clock.advance(8.5)
+    assert await redis.get('foo') is None
+    assert await redis.ttl('foo') == -2
+    assert await redis.keys('*') == []
+
+
+@pytest.mark.asyncio
+async def test_expire_float(timed_redis, clock):
+    await timed_redis.set('foo', 'bar')
+    assert await timed_redis.expire('foo', 2.5) is True
+    assert await timed_redis.pttl('foo') == 2500
+
+
+@pytest.mark.asyncio
+async def test_pexpire(timed_redis, clock):
+    redis = timed_redis
+    await redis.set('foo', 'bar')
+    assert await redis.pexpire('foo', 250) is True
+    assert await redis.pttl('foo') == 250
+    clock.advance(0.25)
+    assert await redis.exists('foo') == 0
+
+    with pytest.raises(TypeError):
+        await redis.pexpire('foo', 2.5)
+
+
+@pytest.mark.asyncio
+async def test_expireat(timed_redis, clock):
+    redis = timed_redis
+    await redis.set('foo', 'bar')
+    await redis.set('baz', 'blub')
+    assert await redis.expireat('foo', 1010) is True
+    assert await redis.pexpireat('baz', 1000500) is True
+    assert await redis.ttl('foo') == 10
+    assert await redis.pttl('baz') == 500
+
+    # deadlines in the past delete the key right away
+    assert await redis.expireat('foo', 999) is True
+    assert await redis.exists('foo') == 0
+    assert await redis.expireat('foo', 1010) is False
+
+
+@pytest.mark.asyncio
+async def test_persist(timed_redis, clock):
+    redis = timed_redis
+    await redis.set('foo', 'bar', expire=10)
+    await redis.set('baz', 'blub')
+    assert await redis.persist('foo') is True
+    assert await redis.persist('baz') is False
+    assert await redis.persist('missing') is False
+    assert await redis.ttl('foo') == -1
+    assert await redis.pttl('foo') == -1
+
+    clock.advance(20)
+    assert await redis.get('foo') == b'bar'
+
+
+@pytest.mark.asyncio
+async def test_expire_reset(timed_redis, clock):
+    redis = timed_redis
+    await redis.set('foo', 'bar', expire=10)
+    await redis.expire('foo', 20)
+    clock.advance(15)
+    assert await redis.get('foo') == b'bar'
+
+    # SET drops the timeout
+    await redis.set('foo', 'baz')
+    clock.advance(10)
+    assert await redis.get('foo') == b'baz'
+
+
+@pytest.mark.asyncio
+async def test_execute(redis):
+    assert await redis.execute(b'SET', 'foo', 'bar', b'EX', 30) == b'OK'
+    assert await redis.execute('get', 'foo') == b'bar'
+    assert await redis.execute(b'GET', 'foo', encoding='utf-8') == 'bar'
+    assert await redis.execute(b'SET', 'foo', 'baz', 'nx') is None
+    assert 0 < await redis.execute(b'TTL', 'foo') <= 30
+
+    assert await redis.execute(b'HSET', 'hash', 'a', 1, 'b', 2) == 2
+    assert await redis.execute(b'HGETALL', 'hash') == [b'a', b'1', b'b', b'2']
+    assert await redis.execute(b'MGET', 'foo', 'missing', encoding='utf-8') == ['bar', None]
+
+    cursor, keys = await redis.execute(b'SCAN', 0, b'MATCH', 'f*')
+    assert cursor == b'0'
+    assert keys == [b'foo']
+
+    # cursors hold whole keys and are passed back as returned
+    await redis.set('a rather long key name', 'value')
+    cursor, keys = await redis.execute(b'SCAN', 0, b'COUNT', 1)
+    assert keys == [b'a rather long key name']
+    assert int(cursor) > 2 ** 64
+    cursor, keys = await redis.execute(b'SCAN', cursor)
+    assert keys
+    with pytest.raises(ReplyError):
+        await redis.execute(b'SCAN', b' 1')
+
+
+@pytest.mark.asyncio
+async def test_execute_errors(redis):
+    with pytest.raises(ReplyError, match='unknown command'):
+        await redis.execute(b'NOSUCHCOMMAND')
+    with pytest.raises(ReplyError, match='wrong number of arguments'):
+        await redis.execute(b'GET')
+    with pytest.raises(ReplyError, match='wrong number of arguments'):
+        await redis.execute(b'GET', 'foo', 'bar')
+    with pytest.raises(ReplyError, match='syntax error'):
+        await redis.execute(b'SET', 'foo', 'bar', b'XY')
+    with pytest.raises(ReplyError, match='not an integer'):
+        await redis.execute(b'EXPIRE', 'foo', 'soon')
+    with pytest.raises(ReplyError, match='wrong number of arguments'):
+        await redis.execute(b'HSET', 'hash', 'a', 1, 'b')
+    assert await redis.exists('hash') == 0
+
+
+@pytest.mark.asyncio
+async def test_mset(redis):
+    assert await redis.mset('foo', 'bar', 'baz', 1) is True
+    assert await redis.mget('foo', 'baz') == [b'bar', b'1']
+    assert await redis.mset({'foo': 'blub', 'new': 'value'}) is True
+    assert await redis.mget('foo', 'baz', 'new') == [b'blub', b'1', b'value']
+
+    # MSET overwrites values of any type and drops timeouts
+    await redis.sadd('set', 'member')
+    await redis.expire('foo', 30)
+    await redis.mset('set', 'string', 'foo', 'bar')
+    assert await redis.get('set') == b'string'
+    assert await redis.ttl('foo') == -1
+
+    with pytest.raises(TypeError):
+        await redis.mset('foo', 'bar', 'baz')
+    with pytest.raises(TypeError):
+        await redis.mset('foo')
+
+
+@pytest.mark.asyncio
+async def test_mset_many(redis):
+    await redis.set('key:500', 'old')
+    pairs = []
+    for i in range(5000):
+        pairs.extend(('key:{}'.format(i), i))
+    await redis.mset(*pairs)
+    assert await redis.dbsize() == 5000
+    assert await redis.get('key:500') == b'500'
+    keys = [key async for key in redis.iscan(match='key:1*', count=100)]
+    assert len(keys) == 1111
+
+
+@pytest.mark.asyncio
+async def test_msetnx(redis):
+    assert await redis.msetnx('foo', 'bar', 'baz', 'blub') == 1
+    assert await redis.msetnx('new', 'value', 'foo', 'other') == 0
+    assert await redis.mget('foo', 'baz', 'new') == [b'bar', b'blub', None]
+
+    with pytest.raises(TypeError):
+        await redis.msetnx('foo', 'bar', 'baz')
+
+
+@pytest.mark.asyncio
+async def test_unlink_touch(redis):
+    await redis.mset('foo', 'bar', 'baz', 'blub')
+    assert await redis.touch('foo', 'foo', 'missing') == 2
+    assert await redis.unlink('foo', 'missing', 'foo') == 1
+    assert await redis.exists('foo', 'baz') == 1
@@ -1,15 +1,16 @@
 import pytest
+from aioredis.errors import ReplyError
 
 
 @pytest.mark.asyncio
 async def test_hset(redis):
     await redis.hset('foo', 'bar', 'baz')
-    assert redis._redis.hget('foo', 'bar') == b'baz'
+    assert await redis.hget('foo', 'bar') == b'baz'
 
 
 @pytest.mark.asyncio
 async def test_hget(redis):
-    redis._redis.hset('foo', 'bar', 'baz')
+    await redis.hset('foo', 'bar', 'baz')
     val = await redis.hget('foo', 'bar')
     assert val == b'baz'
 
@@ -33,19 +34,19 @@ async def test_hexists(redis):
 @pytest.mark.asyncio
 async def test_hmset_dict_args_only(redis):
     await redis.hmset_dict('foo', {'foo': 'bar', 'baz': 'blargh'})
-    assert redis._redis.hmget('foo', ['foo', 'baz']) == [b'bar', b'blargh']
+    assert await redis.hmget('foo', 'foo', 'baz') == [b'bar', b'blargh']
 
 
 @pytest.mark.asyncio
 async def test_hmset_dict_kwargs_only(redis):
     await redis.hmset_dict('foo', foo='bar', baz='blargh')
-    assert redis._redis.hmget('foo', ['foo', 'baz']) == [b'bar', b'blargh']
+    assert await redis.hmget('foo', 'foo', 'baz') == [b'bar', b'blargh']
 
 
 @pytest.mark.asyncio
 async def test_hmset_dict_both(redis):
     await redis.hmset_dict('foo', {'foo': 'bar'},  baz='blargh')
-    assert redis._redis.hmget('foo', ['foo', 'baz']) == [b'bar', b'blargh']
+    assert await redis.hmget('foo', 'foo', 'baz') == [b'bar', b'blargh']
 
 
 @pytest.mark.asyncio
@@ -59,11 +60,17 @@ async def test_hmset_dict_exceptions(redis):
     with pytest.raises(TypeError):
         await redis.hmset_dict('foo', ['foo', 'bar'])
 
+    # like Redis, HMSET needs at least one pair, so no empty hash is created
+    with pytest.raises(ReplyError):
+        await redis.hmset_dict('foo', {})
+    assert await redis.exists('foo') == 0
+    assert await redis.keys('*') == []
+
 
 @pytest.mark.asyncio
 async def test_hmset(redis):
     await redis.hmset('foo', 'foo', 'bar', 'baz', 'blargh')
-    assert redis._redis.hmget('foo', ['foo', 'baz']) == [b'bar', b'blargh']
+    assert await redis.hmget('foo', 'foo', 'baz') == [b'bar', b'blargh']
 
     with pytest.raises(TypeError):
         await redis.hmset('foo', 'foo', 'bar', 'baz')
@@ -71,7 +78,7 @@ async def test_hmset(redis):
 
 @pytest.mark.asyncio
 async def test_hmget(redis):
-    redis._redis.hmset('foo', {'foo': 'bar', 'baz': 'blargh'})
+    await redis.hmset_dict('foo', {'foo': 'bar', 'baz': 'blargh'})
     val = await redis.hmget('foo', 'foo', 'baz', 'blubb')
     assert val == [b'bar', b'blargh', None]
 
@@ -82,7 +89,7 @@ async def test_hmget(redis):
 @pytest.mark.asyncio
 async def test_hgetall(redis):
     expected  = {'foo': 'bar', 'baz': 'blargh'}
-    redis._redis.hmset('foo', expected)
+    await redis.hmset_dict('foo', expected)
 
     val = await redis.hgetall('foo', encoding='utf-8')
     assert val == expected
@@ -95,19 +102,145 @@ async def test_hgetall(redis):
     val = await redis.hgetall('foo')
     assert val == expected_raw
 
+    val = await redis.hgetall('missing', encoding='utf-8')
+    assert val == {}
+
 @pytest.mark.asyncio
 async def test_hdel(redis):
-    redis._redis.hmset('foobar', {'foo': 'bar', 'baz': 'blargh'})
+    await redis.hmset_dict('foobar', {'foo': 'bar', 'baz': 'blargh'})
 
     await redis.hdel('foobar', 'foo')
 
-    assert not redis._redis.hexists('foobar', 'foo')
-    assert redis._redis.hgetall('foobar') == {b'baz': b'blargh'}
+    assert not await redis.hexists('foobar', 'foo')
+    assert await redis.hgetall('foobar') == {b'baz': b'blargh'}
 
 @pytest.mark.asyncio
 async def test_hkeys(redis):
-    redis._redis.hmset('foobar', {'foo': 'bar', 'baz': 'blargh'})
+    await redis.hmset_dict('foobar', {'foo': 'bar', 'baz': 'blargh'})
 
     keys = sorted(await redis.hkeys('foobar'))
 
     assert keys == [b'baz', b'foo']
+
+
+@pytest.mark.asyncio
+async def test_hscan(redis):
+    await redis.hmset_dict('foo', {'bar': 1, 'baz': 2, 'blub': 3})
+
+    cursor, pairs = await redis.hscan('foo')
+    assert cursor == 0
+    assert pairs == [(b'bar', b'1'), (b'baz', b'2'), (b'blub', b'3')]
+
+    cursor, pairs = await redis.hscan('foo', count=2)
+    assert cursor != 0
+    assert pairs == [(b'bar', b'1'), (b'baz', b'2')]
+    cursor, pairs = await redis.hscan('foo', cursor, count=2)
+    assert cursor == 0
+    assert pairs == [(b'blub', b'3')]
+
+    cursor, pairs = await redis.hscan('foo', match='ba*')
+    assert pairs == [(b'bar', b'1'), (b'baz', b'2')]
+
+    assert await redis.hscan('missing') == (0, [])
+
+
+@pytest.mark.asyncio
+async def test_ihscan(redis):
+    expected = {'field:{}'.format(i).encode(): str(i).encode() for i in range(30)}
+    await redis.hmset_dict('foo', expected)
+
+    pairs = {name: val async for name, val in redis.ihscan('foo', count=7)}
+    assert pairs == expected
+
+
+@pytest.mark.asyncio
+async def test_hset_many(redis):
+    assert await redis.hset('foo', 'a', 1, 'b', 2) == 2
+    assert await redis.hset('foo', 'b', 3, 'c', 4) == 1
+    assert await redis.hgetall('foo') == {b'a': b'1', b'b': b'3', b'c': b'4'}
+
+    with pytest.raises(TypeError):
+        await redis.hset('foo', 'a', 1, 'b')
+
+
+@pytest.mark.asyncio
+async def test_hsetnx(redis):
+    assert await redis.hsetnx('foo', 'bar', 'baz') == 1
+    assert await redis.hsetnx('foo', 'bar', 'spam') == 0
+    assert await redis.hget('foo', 'bar') == b'baz'
+
+
+@pytest.mark.asyncio
+async def test_hincrby(redis):
+    assert await redis.hincrby('foo', 'bar') == 1
+    assert await redis.hincrby('foo', 'bar', 10) == 11
+    assert await redis.hincrby('foo', 'bar', -20) == -9
+    assert await redis.hget('foo', 'bar') == b'-9'
+
+    await redis.hset('foo', 'baz', 'spam')
+    with pytest.raises(ReplyError):
+        await redis.hincrby('foo', 'baz')
+    await redis.hset('foo', 'max', 2 ** 63 - 1)
+    with pytest.raises(ReplyError):
+        await redis.hincrby('foo', 'max')
+
+    for value in (' 5 ', '1_0', ''):
+        await redis.hset('foo', 'loose', value)
+        with pytest.raises(ReplyError):
+            await redis.hincrby('foo', 'loose')
+
+    # failed increments don't create the hash
+    with pytest.raises(ReplyError):
+        await redis.hincrby('new', 'bar', 2 ** 63)
+    assert await redis.exists('new') == 0
+
+
+@pytest.mark.asyncio
+async def test_hincrbyfloat(redis):
+    assert await redis.hincrbyfloat('foo', 'bar') == 1.0
+    assert await redis.hincrbyfloat('foo', 'bar', 0.5) == 1.5
+    assert await redis.hget('foo', 'bar') == b'1.5'
+
+    await redis.hset('foo', 'baz', 'spam')
+    with pytest.raises(ReplyError):
+        await redis.hincrbyfloat('foo', 'baz')
+
+    with pytest.raises(ReplyError):
+        await redis.hincrbyfloat('new', 'bar', float('inf'))
+    assert await redis.exists('new') == 0
+
+
+@pytest.mark.asyncio
+async def test_hlen_hvals_hstrlen(redis):
+    assert await redis.hlen('foo') == 0
+    assert await redis.hvals('foo') == []
+    await redis.hmset_dict('foo', a='1', b='22')
+    assert await redis.hlen('foo') == 2
+    assert sorted(await redis.hvals('foo')) == [b'1', b'22']
+    assert await redis.hvals('foo', encoding='utf-8') == ['1', '22']
+    assert await redis.hstrlen('foo', 'b') == 2
+    assert await redis.hstrlen('foo', 'missing') == 0
+
+
+@pytest.mark.asyncio
+async def test_hrandfield(redis):
+    assert await redis.hrandfield('foo') is None
+    assert await redis.hrandfield('foo', 2) == []
+
+    await redis.hmset_dict('foo', a='1', b='2', c='3')
+    assert await redis.hrandfield('foo') in (b'a', b'b', b'c')
+    fields = await redis.hrandfield('foo', 2)
+    assert len(set(fields)) == 2
+    assert sorted(await redis.hrandfield('foo', 5)) == [b'a', b'b', b'c']
+    assert len(await redis.hrandfield('foo', -5)) == 5
+
+    pairs = await redis.hrandfield('foo', 3, withvalues=True, encoding='utf-8')
+    assert sorted(pairs) == [('a', '1'), ('b', '2'), ('c', '3')]
+
+    # fields added or removed later are picked up
+    await redis.hdel('foo', 'a', 'b')
+    await redis.hset('foo', 'd', '4')
+    assert set(await redis.hrandfield('foo', -20)) <= {b'c', b'd'}
+
+    with pytest.raises(ReplyError):
+        await redis.execute('HRANDFIELD', 'foo', 1, 'WITHSCORES')
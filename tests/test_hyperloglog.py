@@ -0,0 +1,92 @@
+import random
+
+import pytest
+from aioredis.errors import ReplyError
+
+from mockaioredis import hyperloglog
+
+
+def test_dense_roundtrip():
+    raw = bytes(random.randrange(64) for _ in range(hyperloglog.REGISTERS))
+    packed = hyperloglog._pack_dense(raw)
+    value = bytearray(hyperloglog._header(hyperloglog._DENSE)) + packed
+    assert raw == hyperloglog._unpack_dense(value)
+    assert all(raw[i] == hyperloglog._dense_get(value, i) for i in range(0, len(raw), 97))
+
+
+def test_merge_takes_maximum():
+    a = bytes(random.randrange(64) for _ in range(hyperloglog.REGISTERS))
+    b = bytes(random.randrange(64) for _ in range(hyperloglog.REGISTERS))
+    merged = hyperloglog._max(int.from_bytes(a, 'little'), int.from_bytes(b, 'little'))
+    assert bytes(map(max, a, b)) == merged.to_bytes(hyperloglog.REGISTERS, 'little')
+
+
+@pytest.mark.asyncio
+async def test_pfadd_pfcount(redis):
+    assert 0 == await redis.pfcount('hll')
+    assert 1 == await redis.pfadd('hll', 'foo', 'bar', 'zap')
+    assert 0 == await redis.pfadd('hll', 'zap', 'zap', 'zap')
+    assert 1 == await redis.pfadd('hll', 'baz')
+    assert 4 == await redis.pfcount('hll')
+    assert 1 == await redis.execute('PFADD', 'empty')
+    assert 0 == await redis.pfcount('empty')
+
+    # HyperLogLogs are strings in the Redis format
+    value = await redis.get('hll')
+    assert value.startswith(b'HYLL\x01')
+    await redis.set('copy', value)
+    assert 4 == await redis.pfcount('copy')
+
+    await redis.set('str', 'not a hll')
+    with pytest.raises(ReplyError, match='WRONGTYPE'):
+        await redis.pfadd('str', 'foo')
+    await redis.lpush('list', 'foo')
+    with pytest.raises(ReplyError, match='WRONGTYPE'):
+        await redis.pfcount('list')
+
+
+@pytest.mark.asyncio
+async def test_pfadd_dense(redis):
+    await redis.pfadd('hll', *range(10000))
+    value = await redis.get('hll')
+    assert hyperloglog.DENSE_SIZE == len(value)
+    assert 0 == value[4]
+    assert abs(await redis.pfcount('hll') - 10000) < 200
+    assert 0 == await redis.pfadd('hll', *range(100))
+
+
+@pytest.mark.asyncio
+async def test_pfmerge(redis):
+    await redis.pfadd('a', *range(0, 1000))
+    await redis.pfadd('b', *range(500, 5000))
+    union = await redis.pfcount('a', 'b', 'missing')
+    assert abs(union - 5000) < 100
+
+    assert await redis.pfmerge('c', 'a', 'b')
+    assert union == await redis.pfcount('c')
+    assert await redis.pfmerge('a', 'b')
+    assert union == await redis.pfcount('a')
+
+    assert await redis.pfmerge('small', 'missing')
+    assert (await redis.get('small')).startswith(b'HYLL\x01')
+    assert 0 == await redis.pfcount('small')
+
+
+@pytest.mark.asyncio
+async def test_pfmerge_keeps_dense(redis):
+    await redis.pfadd('dense', *range(10000))
+    await redis.pfadd('sparse', 'a', 'b')
+
+    # a dense input makes the result dense, even if it would fit sparse
+    await redis.execute('PFMERGE', 'small', 'sparse')
+    assert (await redis.get('small'))[4] == 1
+    await redis.execute('PFMERGE', 'small', 'dense')
+    assert len(await redis.get('small')) == hyperloglog.DENSE_SIZE
+
+    # dense values never go back to sparse
+    value = bytearray(await redis.get('dense'))
+    hyperloglog.store(value, bytes(hyperloglog.REGISTERS))
+    assert hyperloglog.is_dense(value)
+    await redis.delete('sparse')
+    await redis.execute('PFMERGE', 'dense', 'sparse')
+    assert len(await redis.get('dense')) == hyperloglog.DENSE_SIZE
@@ -0,0 +1,48 @@
+import random
+
+from mockaioredis.indexedset import IndexedSet
+
+
+def test_add_discard():
+    iset = IndexedSet()
+    expected = set()
+    for _ in range(500):
+        value = random.randrange(100)
+        if random.random() < 0.6:
+            assert iset.add(value) == (value not in expected)
+            expected.add(value)
+        else:
+            assert iset.discard(value) == (value in expected)
+            expected.discard(value)
+        assert set(iset) == expected
+        assert len(iset) == len(expected)
+
+    for value in range(100):
+        assert (value in iset) == (value in expected)
+
+
+def test_random_access():
+    iset = IndexedSet(range(100))
+    assert iset.choice() in iset
+
+    sample = iset.sample(10)
+    assert len(set(sample)) == 10
+    assert all(value in iset for value in sample)
+    assert sorted(iset.sample(200)) == list(range(100))
+
+    assert len(iset.choices(200)) == 200
+
+
+def test_pop():
+    iset = IndexedSet(range(100))
+    popped = {iset.pop()}
+    popped.update(iset.pop_sample(9))
+    assert len(popped) == 10
+    assert len(iset) == 90
+    assert not popped & set(iset)
+
+    popped.update(iset.pop_sample(100))
+    assert popped == set(range(100))
+    assert len(iset) == 0
+    iset.add(1)
+    assert list(iset) == [1]
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+import mockaioredis
+from aioredis.errors import ReplyError
+
+
+@pytest.mark.asyncio
+async def test_shared_keyspace():
+    first = await mockaioredis.create_redis(('localhost', 6379))
+    second = await mockaioredis.create_redis(['localhost', 6379])
+    await first.set('foo', 'bar')
+    assert await second.get('foo') == b'bar'
+
+
+@pytest.mark.asyncio
+async def test_separate_dbs():
+    first = await mockaioredis.create_redis(('localhost', 6379))
+    other_db = await mockaioredis.create_redis(('localhost', 6379), db=1)
+    other_host = await mockaioredis.create_redis(('otherhost', 6379))
+    await first.set('foo', 'bar')
+    assert await other_db.get('foo') is None
+    assert await other_host.get('foo') is None
+
+
+@pytest.mark.asyncio
+async def test_private_keyspace(redis):
+    client = await mockaioredis.create_redis(('localhost', 6379))
+    await client.set('foo', 'bar')
+    assert await redis.get('foo') is None
+
+
+@pytest.mark.asyncio
+async def test_pool_shares_keyspace():
+    client = await mockaioredis.create_redis(('localhost', 6379), encoding='utf-8')
+    pool = await mockaioredis.create_pool(('localhost', 6379), encoding='utf-8')
+    await client.set('foo', 'bar')
+    async with pool.get() as conn:
+        assert await conn.get('foo') == 'bar'
+    redis = await mockaioredis.create_redis_pool(('localhost', 6379))
+    assert await redis.get('foo') == b'bar'
+    pool.close()
+    await pool.wait_closed()
+    redis.close()
+    await redis.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_flush_keyspaces():
+    first = await mockaioredis.create_redis(('localhost', 6379))
+    second = await mockaioredis.create_redis(('otherhost', 6379))
+    await first.set('foo', 'bar')
+    await second.set('foo', 'bar')
+
+    mockaioredis.flush_keyspaces(('localhost', 6379))
+    assert await first.get('foo') is None
+    assert await second.get('foo') == b'bar'
+
+    mockaioredis.flush_keyspaces()
+    assert await second.get('foo') is None
+
+
+@pytest.mark.asyncio
+async def test_reset_keyspaces():
+    first = await mockaioredis.create_redis(('localhost', 6379))
+    await first.set('foo', 'bar')
+    mockaioredis.reset_keyspaces()
+    assert await first.get('foo') is None
+
+    second = await mockaioredis.create_redis(('localhost', 6379))
+    await second.set('foo', 'bar')
+    assert await first.get('foo') is None
+
+
+@pytest.mark.asyncio
+async def test_flushdb():
+    first = await mockaioredis.create_redis(('localhost', 6379))
+    second = await mockaioredis.create_redis(('localhost', 6379))
+    await first.set('foo', 'bar')
+    assert await second.flushdb() is True
+    assert await first.dbsize() == 0
+
+
+@pytest.mark.asyncio
+async def test_wrong_type(redis):
+    await redis.hset('foo', 'bar', 'baz')
+    with pytest.raises(ReplyError):
+        await redis.get('foo')
+    with pytest.raises(ReplyError):
+        await redis.lpush('foo', 'bar')
+    with pytest.raises(ReplyError):
+        await redis.sadd('foo', 'bar')
+
+    # SET overwrites values of any type
+    await redis.set('foo', 'bar')
+    assert await redis.get('foo') == b'bar'
+
+
+@pytest.mark.asyncio
+async def test_empty_containers_are_removed(redis):
+    await redis.rpush('foo', 'bar')
+    await redis.lpop('foo')
+    await redis.sadd('baz', 'bar')
+    await redis.srem('baz', 'bar')
+    await redis.hset('blub', 'bar', 'baz')
+    await redis.hdel('blub', 'bar')
+    assert await redis.dbsize() == 0
+
+
+@pytest.mark.asyncio
+async def test_active_expiry():
+    keyspace = mockaioredis.Keyspace()
+    redis = mockaioredis.MockRedis(keyspace=keyspace)
+    await redis.set('foo', 'bar', pexpire=10)
+    await redis.set('baz', 'blub', pexpire=20)
+    await redis.set('blub', 'blah', expire=30)
+    assert keyspace.expires_count() == 3
+
+    await asyncio.sleep(0.05)
+    # the keys are gone without being accessed
+    assert sorted(keyspace._data) == [b'blub']
+
+
+@pytest.mark.asyncio
+async def test_python36_event_loop(redis, monkeypatch):
+    # asyncio.get_running_loop() is new in Python 3.7
+    monkeypatch.setattr(mockaioredis.keyspace.sys, 'version_info', (3, 6, 0))
+    monkeypatch.delattr(asyncio, 'get_running_loop')
+    await redis.set('foo', 'bar', pexpire=10)
+    assert await redis.pttl('foo') > 0
+    asyncio.get_event_loop().call_later(0.01, asyncio.ensure_future, redis.rpush('list', 'a'))
+    assert await redis.blpop('list', timeout=1) == [b'list', b'a']
+    await asyncio.sleep(0.02)
+    assert await redis.get('foo') is None
+
+
+@pytest.mark.asyncio
+async def test_mockredis_arguments():
+    with pytest.warns(DeprecationWarning, match='strict'):
+        redis = mockaioredis.MockRedis(strict=True)
+    await redis.set('foo', 'bar')
+    assert await redis.get('foo') == b'bar'
@@ -1,4 +1,7 @@
+import asyncio
+
 import pytest
+from aioredis.errors import ReplyError
 
 
 @pytest.mark.asyncio
@@ -6,7 +9,7 @@ async def test_lindex(redis):
     ret = await redis.lindex('foo', 0)
     assert ret is None
 
-    redis._redis.lpush('foo', 'bar', 'baz', 'blub')
+    await redis.lpush('foo', 'bar', 'baz', 'blub')
 
     first = await redis.lindex('foo', 0)
     assert b'blub' == first
@@ -19,7 +22,7 @@ async def test_llen(redis):
     length = await redis.llen('foo')
     assert 0 == length
 
-    redis._redis.lpush('foo', 'bar')
+    await redis.lpush('foo', 'bar')
     length = await redis.llen('foo')
     assert 1 == length
 
@@ -33,19 +36,22 @@ async def test_lpush(redis):
     ret = await redis.lpush('foo', 'blub', 'blargh')
     assert 4 == ret
 
-    assert 4 == redis._redis.llen('foo')
-    assert [b'blargh', b'blub', b'baz', b'bar'] == redis._redis.lrange('foo', 0, -1)
+    assert 4 == await redis.llen('foo')
+    assert [b'blargh', b'blub', b'baz', b'bar'] == await redis.lrange('foo', 0, -1)
 
 
 @pytest.mark.asyncio
 async def test_lpop(redis):
-    redis._redis.lpush('foo', 'bar', 'baz', 'blub', 'blargh')
+    await redis.lpush('foo', 'bar', 'baz', 'blub', 'blargh')
     ret = await redis.lpop('foo')
     assert b'blargh' == ret
 
     ret = await redis.lpop('foo', encoding='utf-8')
     assert 'blub' == ret
 
+    ret = await redis.lpop('missing', encoding='utf-8')
+    assert ret is None
+
 
 @pytest.mark.asyncio
 async def test_rpush(redis):
@@ -56,13 +62,13 @@ async def test_rpush(redis):
     ret = await redis.rpush('foo', 'blub', 'blargh')
     assert 4 == ret
 
-    assert 4 == redis._redis.llen('foo')
-    assert [b'bar', b'baz', b'blub', b'blargh'] == redis._redis.lrange('foo', 0, -1)
+    assert 4 == await redis.llen('foo')
+    assert [b'bar', b'baz', b'blub', b'blargh'] == await redis.lrange('foo', 0, -1)
 
 
 @pytest.mark.asyncio
 async def test_rpop(redis):
-    redis._redis.lpush('foo', 'bar', 'baz', 'blub', 'blargh')
+    await redis.lpush('foo', 'bar', 'baz', 'blub', 'blargh')
     ret = await redis.rpop('foo')
     assert b'bar' == ret
 
@@ -72,7 +78,7 @@ async def test_rpop(redis):
 
 @pytest.mark.asyncio
 async def test_lrange(redis):
-    redis._redis.lpush('foo', 'bar', 'baz', 'blub', 'blargh')
+    await redis.lpush('foo', 'bar', 'baz', 'blub', 'blargh')
     ret = await redis.lrange('foo', 0, -1)
     assert len(ret) == 4
     assert ret[0] == b'blargh'
@@ -91,7 +97,7 @@ async def test_lrange(redis):
 
 @pytest.mark.asyncio
 async def test_rpoplpush(redis):
-    redis._redis.lpush('foo', 'baz', 'blub', 'blargh')
+    await redis.lpush('foo', 'baz', 'blub', 'blargh')
     ret = await redis.rpoplpush('foo', 'bar')
     assert ret == b'baz'
     assert await redis.llen('foo') == 2
@@ -109,5 +115,163 @@ async def test_lpush(redis):
 
     await redis.lset('foo', 1, 'baz')
 
-    assert 3 == redis._redis.llen('foo')
-    assert [b'bar', b'baz', b'blargh'] == redis._redis.lrange('foo', 0, -1)
+    assert 3 == await redis.llen('foo')
+    assert [b'bar', b'baz', b'blargh'] == await redis.lrange('foo', 0, -1)
+
+
+@pytest.mark.asyncio
+async def test_blpop(redis):
+    await redis.rpush('foo', 'a', 'b')
+    assert await redis.blpop('missing', 'foo') == [b'foo', b'a']
+    assert await redis.brpop('foo', encoding='utf-8') == ['foo', 'b']
+    assert await redis.exists('foo') == 0
+
+    with pytest.raises(TypeError):
+        await redis.blpop('foo', timeout=1.5)
+    with pytest.raises(ValueError):
+        await redis.brpop('foo', timeout=-1)
+    with pytest.raises(ReplyError):
+        await redis.execute('BLPOP', 'foo', -1)
+
+
+@pytest.mark.asyncio
+async def test_blpop_wakeup(redis):
+    first = asyncio.ensure_future(redis.blpop('foo', 'bar'))
+    second = asyncio.ensure_future(redis.brpop('bar'))
+    third = asyncio.ensure_future(redis.blpop('bar'))
+    await asyncio.sleep(0)
+    assert not first.done()
+
+    # waiters are served in the order they started waiting
+    await redis.rpush('bar', 'a', 'b')
+    assert await first == [b'bar', b'a']
+    assert await second == [b'bar', b'b']
+    assert not third.done()
+    assert await redis.exists('bar') == 0
+
+    await redis.lpush('bar', 'c')
+    assert await third == [b'bar', b'c']
+
+
+@pytest.mark.asyncio
+async def test_blpop_timeout(redis):
+    assert await redis.execute('BLPOP', 'foo', 0.01) is None
+
+    waiter = asyncio.ensure_future(redis.execute('BRPOP', 'foo', 0.01))
+    await asyncio.sleep(0.05)
+    assert await waiter is None
+
+    # a timed out client doesn't get served any more
+    await redis.rpush('foo', 'bar')
+    assert await redis.lrange('foo', 0, -1) == [b'bar']
+
+
+@pytest.mark.asyncio
+async def test_brpoplpush(redis):
+    await redis.rpush('foo', 'a', 'b')
+    assert await redis.brpoplpush('foo', 'bar') == b'b'
+    assert await redis.lrange('bar', 0, -1) == [b'b']
+
+    await redis.delete('foo', 'bar')
+    mover = asyncio.ensure_future(redis.brpoplpush('foo', 'bar'))
+    waiter = asyncio.ensure_future(redis.blpop('bar'))
+    await asyncio.sleep(0)
+
+    # the value moved to bar wakes up the client waiting there
+    await redis.lpush('foo', 'c')
+    assert await mover == b'c'
+    assert await waiter == [b'bar', b'c']
+    assert await redis.exists('foo', 'bar') == 0
+
+
+@pytest.mark.asyncio
+async def test_pushx(redis):
+    assert await redis.lpushx('foo', 'a') == 0
+    assert await redis.rpushx('foo', 'a') == 0
+    assert await redis.exists('foo') == 0
+
+    await redis.rpush('foo', 'b')
+    assert await redis.lpushx('foo', 'a') == 2
+    assert await redis.rpushx('foo', 'c', 'd') == 4
+    assert await redis.lrange('foo', 0, -1) == [b'a', b'b', b'c', b'd']
+
+
+@pytest.mark.asyncio
+async def test_linsert(redis):
+    assert await redis.linsert('foo', 'a', 'b') == 0
+    await redis.rpush('foo', 'a', 'c')
+    assert await redis.linsert('foo', 'a', 'b') == 3
+    assert await redis.linsert('foo', 'a', 'start', before=True) == 4
+    assert await redis.linsert('foo', 'missing', 'x') == -1
+    assert await redis.lrange('foo', 0, -1) == [b'start', b'a', b'b', b'c']
+
+    with pytest.raises(ReplyError):
+        await redis.execute('LINSERT', 'foo', 'BETWEEN', 'a', 'b')
+
+
+@pytest.mark.asyncio
+async def test_ltrim(redis):
+    assert await redis.ltrim('foo', 0, 1) is True
+
+    await redis.rpush('foo', *range(10))
+    assert await redis.ltrim('foo', 0, 7) is True
+    assert await redis.lrange('foo', 0, -1) == [b'%d' % i for i in range(8)]
+    assert await redis.ltrim('foo', 2, 3) is True
+    assert await redis.lrange('foo', 0, -1) == [b'2', b'3']
+    assert await redis.ltrim('foo', -1, -1) is True
+    assert await redis.lrange('foo', 0, -1) == [b'3']
+
+    assert await redis.ltrim('foo', 5, 10) is True
+    assert await redis.exists('foo') == 0
+
+    with pytest.raises(TypeError):
+        await redis.ltrim('foo', '0', 1)
+
+
+@pytest.mark.asyncio
+async def test_capped_list(redis):
+    for i in range(20):
+        await redis.lpush('log', i)
+        await redis.ltrim('log', 0, 4)
+    assert await redis.lrange('log', 0, -1) == [b'19', b'18', b'17', b'16', b'15']
+
+
+@pytest.mark.asyncio
+async def test_lrem(redis):
+    assert await redis.lrem('foo', 0, 'a') == 0
+
+    await redis.rpush('foo', 'a', 'b', 'a', 'c', 'a')
+    assert await redis.lrem('foo', 0, 'x') == 0
+    assert await redis.lrem('foo', 1, 'a') == 1
+    assert await redis.lrange('foo', 0, -1) == [b'b', b'a', b'c', b'a']
+    assert await redis.lrem('foo', -1, 'a') == 1
+    assert await redis.lrange('foo', 0, -1) == [b'b', b'a', b'c']
+
+    await redis.rpush('foo', 'a')
+    assert await redis.lrem('foo', 0, 'a') == 2
+    assert await redis.lrange('foo', 0, -1) == [b'b', b'c']
+
+    with pytest.raises(TypeError):
+        await redis.lrem('foo', '1', 'a')
+
+
+@pytest.mark.asyncio
+async def test_lpos(redis):
+    assert await redis.lpos('foo', 'a') is None
+
+    await redis.rpush('foo', 'a', 'b', 'c', 'a', 'b', 'a')
+    assert await redis.lpos('foo', 'b') == 1
+    assert await redis.lpos('foo', 'x') is None
+    assert await redis.lpos('foo', 'a', rank=2) == 3
+    assert await redis.lpos('foo', 'a', rank=-1) == 5
+    assert await redis.lpos('foo', 'a', rank=-2) == 3
+    assert await redis.lpos('foo', 'a', count=0) == [0, 3, 5]
+    assert await redis.lpos('foo', 'a', count=2) == [0, 3]
+    assert await redis.lpos('foo', 'a', count=0, rank=-1) == [5, 3, 0]
+    assert await redis.lpos('foo', 'a', count=0, maxlen=4) == [0, 3]
+    assert await redis.lpos('foo', 'x', count=0) == []
+
+    with pytest.raises(ReplyError):
+        await redis.lpos('foo', 'a', rank=0)
+    with pytest.raises(ReplyError):
+        await redis.lpos('foo', 'a', count=-1)
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 import mockaioredis
 
@@ -23,8 +25,10 @@ async def test_properties():
         encoding='utf-8',
         minsize=5, maxsize=10)
 
-    # We fake the maxsize
-    assert pool.maxsize == 1
+    assert pool.minsize == 5
+    assert pool.maxsize == 10
+    assert pool.size == 5
+    assert pool.freesize == 5
 
     assert pool.closed  == False
 
@@ -32,3 +36,45 @@ async def test_properties():
     await pool.wait_closed()
 
     assert pool.closed
+
+
+@pytest.mark.asyncio
+async def test_invalid_sizes():
+    with pytest.raises(AssertionError):
+        await mockaioredis.create_pool(('localhost', 6379), minsize=-1)
+    with pytest.raises(AssertionError):
+        await mockaioredis.create_pool(('localhost', 6379), maxsize=0)
+    with pytest.raises(AssertionError):
+        await mockaioredis.create_pool(('localhost', 6379), minsize=5, maxsize=2)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_connections():
+    pool = await mockaioredis.create_pool(
+        ('localhost', 6379),
+        minsize=2, maxsize=4)
+
+    conns = await asyncio.gather(*(pool.acquire() for _ in range(4)))
+    assert len(set(conns)) == 4
+    assert pool.size == 4
+    assert pool.freesize == 0
+
+    await conns[0].set('foo', 'bar')
+    assert await conns[3].get('foo') == b'bar'
+
+    # pool is exhausted, so the next acquire has to wait for a release
+    waiter = asyncio.ensure_future(pool.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    pool.release(conns[1])
+    conn = await asyncio.wait_for(waiter, timeout=1)
+    assert conn is conns[1]
+    assert pool.size == 4
+
+    for conn in conns:
+        pool.release(conn)
+    assert pool.freesize == 4
+
+    pool.close()
+    await pool.wait_closed()
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+from aioredis.errors import ReplyError
+from aioredis.pubsub import Receiver
+
+import mockaioredis
+from mockaioredis import MockRedis
+
+
+@pytest.mark.asyncio
+async def test_subscribe_publish(redis):
+    ch1, ch2 = await redis.subscribe('foo', 'bar')
+    assert ch1.name == b'foo'
+    assert not ch1.is_pattern
+    assert redis.channels['foo'] is ch1
+    assert redis.in_pubsub == 2
+
+    assert await redis.publish('foo', 'hello') == 1
+    assert await redis.publish('missing', 'hello') == 0
+    await redis.publish_json('bar', {'spam': 1})
+    assert await ch1.get() == b'hello'
+    assert await ch2.get_json() == {'spam': 1}
+
+    # subscribing again keeps the existing channel
+    assert await redis.subscribe('foo') == [ch1]
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe(redis):
+    ch, = await redis.subscribe('foo')
+    await redis.publish('foo', 'last')
+    assert await redis.unsubscribe('foo') == [[b'unsubscribe', b'foo', 0]]
+    assert await redis.publish('foo', 'lost') == 0
+
+    assert [msg async for msg in ch.iter(encoding='utf-8')] == ['last']
+    assert not ch.is_active
+    assert redis.in_pubsub == 0
+
+
+@pytest.mark.asyncio
+async def test_psubscribe(redis):
+    news, any_ch, exact = await redis.psubscribe('news.*', '*', 'h?llo')
+    assert news.is_pattern
+    assert await redis.publish('news.tech', 'a') == 2
+    assert await redis.publish('hello', 'b') == 2
+    assert await redis.publish('new', 'c') == 1
+
+    assert await news.get() == (b'news.tech', b'a')
+    assert await exact.get(encoding='utf-8') == (b'hello', 'b')
+    assert [await any_ch.get() for _ in range(3)] == [
+        (b'news.tech', b'a'), (b'hello', b'b'), (b'new', b'c')]
+
+    await redis.punsubscribe('news.*')
+    assert await redis.publish('news.tech', 'd') == 1
+    assert await redis.pubsub_numpat() == 2
+
+
+@pytest.mark.asyncio
+async def test_psubscribe_unclosed_class(redis):
+    channel, = await redis.psubscribe('news[\\]')
+    assert await redis.publish('news[]', 'a') == 1
+    assert await redis.publish('news]', 'b') == 0
+    assert await channel.get() == (b'news[]', b'a')
+
+
+@pytest.mark.asyncio
+async def test_many_subscribers(redis):
+    clients = [MockRedis(keyspace=redis._keyspace) for _ in range(20)]
+    channels = [(await client.subscribe('foo'))[0] for client in clients]
+    patterns = [(await client.psubscribe('f*'))[0] for client in clients]
+    assert await redis.publish('foo', 'bar') == 40
+    assert [await ch.get() for ch in channels] == [b'bar'] * 20
+    assert [await ch.get() for ch in patterns] == [(b'foo', b'bar')] * 20
+
+    for client in clients:
+        client.close()
+    assert await redis.publish('foo', 'bar') == 0
+
+
+@pytest.mark.asyncio
+async def test_bounded_channel(redis):
+    ch = mockaioredis.Channel('foo', is_pattern=False, maxsize=2)
+    await redis.subscribe(ch)
+    assert await redis.publish('foo', 1) == 1
+    assert await redis.publish('foo', 2) == 1
+    # the subscriber is too slow and gets dropped
+    assert await redis.publish('foo', 3) == 0
+    assert 'foo' not in redis.channels
+    assert await ch.get() == b'1'
+    assert await ch.get() == b'2'
+    assert not ch.is_active
+
+
+@pytest.mark.asyncio
+async def test_receiver(redis):
+    mpsc = Receiver()
+    await redis.subscribe(mpsc.channel('foo'))
+    await redis.psubscribe(mpsc.pattern('b*'))
+    await redis.publish('foo', 'a')
+    await redis.publish('bar', 'b')
+
+    ch, msg = await mpsc.get()
+    assert (ch.name, msg) == (b'foo', b'a')
+    ch, msg = await mpsc.get()
+    assert (ch.name, msg) == (b'b*', (b'bar', b'b'))
+
+
+@pytest.mark.asyncio
+async def test_wait_message(redis):
+    ch, = await redis.subscribe('foo')
+    waiter = asyncio.ensure_future(ch.wait_message())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    await redis.publish('foo', 'bar')
+    assert await waiter is True
+
+
+@pytest.mark.asyncio
+async def test_pubsub_introspection(redis):
+    await redis.subscribe('foo', 'bar')
+    other = MockRedis(keyspace=redis._keyspace)
+    await other.subscribe('foo')
+    await other.psubscribe('f*')
+
+    assert sorted(await redis.pubsub_channels()) == [b'bar', b'foo']
+    assert await redis.pubsub_channels('f*') == [b'foo']
+    assert await redis.pubsub_numsub('foo', 'bar', 'baz') == {b'foo': 2, b'bar': 1, b'baz': 0}
+    assert await redis.pubsub_numpat() == 1
+
+    with pytest.raises(ReplyError):
+        await redis.execute('PUBSUB', 'NOPE')
+
+
+@pytest.mark.asyncio
+async def test_pubsub_across_databases():
+    pub = await mockaioredis.create_redis('redis://localhost', db=1)
+    sub = await mockaioredis.create_redis('redis://localhost', db=2)
+    ch, = await sub.subscribe('foo')
+    assert await pub.publish('foo', 'bar') == 1
+    assert await ch.get() == b'bar'
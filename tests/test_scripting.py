@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from aioredis.errors import ReplyError
+
+import mockaioredis
+from mockaioredis import MockRedis
+
+RELEASE_LOCK = '''
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+else
+    return 0
+end
+'''
+
+RATE_LIMIT = '''
+local current = redis.call("incr", KEYS[1])
+if current == 1 then
+    redis.call("expire", KEYS[1], ARGV[2])
+end
+return current <= tonumber(ARGV[1])
+'''
+
+CONVERSIONS = 'return {1, 2.7, true, "s", false, 3}'
+
+FAILING = 'return redis.call("incr", KEYS[1])'
+
+PCALL = 'return redis.pcall("incr", KEYS[1])'
+
+
+@mockaioredis.register_script(RELEASE_LOCK)
+def release_lock(redis, keys, args):
+    if redis.call('GET', keys[0]) == args[0]:
+        return redis.call('DEL', keys[0])
+    return 0
+
+
+@mockaioredis.register_script(RATE_LIMIT)
+def rate_limit(redis, keys, args):
+    current = redis.call('INCR', keys[0])
+    if current == 1:
+        redis.call('EXPIRE', keys[0], args[1])
+    return current <= int(args[0])
+
+
+@mockaioredis.register_script(CONVERSIONS)
+def conversions(redis, keys, args):
+    return [1, 2.7, True, 's', None, 3]
+
+
+@mockaioredis.register_script(FAILING)
+def failing(redis, keys, args):
+    return redis.call('INCR', keys[0])
+
+
+@mockaioredis.register_script(PCALL)
+def pcall(redis, keys, args):
+    error = redis.pcall('INCR', keys[0])
+    assert isinstance(error, ReplyError)
+    return redis.status_reply('handled')
+
+
+@pytest.mark.asyncio
+async def test_eval(redis):
+    await redis.set('lock', 'me')
+    assert 0 == await redis.eval(RELEASE_LOCK, ['lock'], ['you'])
+    assert 1 == await redis.eval(RELEASE_LOCK, ['lock'], ['me'])
+    assert await redis.get('lock') is None
+
+    assert [1, 2, 1, b's'] == await redis.eval(CONVERSIONS)
+    assert ['s'] == (await redis.eval(CONVERSIONS, encoding='utf-8'))[3:]
+
+    await redis.set('str', 'not a number')
+    with pytest.raises(ReplyError, match='not an integer'):
+        await redis.eval(FAILING, ['str'])
+    assert b'handled' == await redis.eval(PCALL, ['str'])
+
+    with pytest.raises(ReplyError, match='no Python handler'):
+        await redis.eval('return 1')
+    with pytest.raises(ReplyError, match="can't be negative"):
+        await redis.execute('EVAL', RELEASE_LOCK, -1)
+    with pytest.raises(ReplyError, match="greater than"):
+        await redis.execute('EVAL', RELEASE_LOCK, 2, 'lock')
+
+
+@pytest.mark.asyncio
+async def test_evalsha(redis):
+    sha = mockaioredis.script_sha(RATE_LIMIT)
+    assert [0] == await redis.script_exists(sha)
+    with pytest.raises(ReplyError, match='NOSCRIPT'):
+        await redis.evalsha(sha, ['limit'], [2, 60])
+
+    assert sha == await redis.script_load(RATE_LIMIT)
+    # scripts are cached per server, not per database
+    other = await mockaioredis.create_redis(('localhost', 6379), db=1)
+    redis = await mockaioredis.create_redis(('localhost', 6379))
+    await redis.script_load(RATE_LIMIT)
+    assert [1, 0] == await other.script_exists(sha.upper(), 'f' * 40)
+    assert [1, 1, None] == [await other.evalsha(sha, ['limit'], [2, 60]) for _ in range(3)]
+    assert 60 == await other.ttl('limit')
+
+    assert await redis.script_flush()
+    assert [0] == await other.script_exists(sha)
+    with pytest.raises(ReplyError, match='NOTBUSY'):
+        await redis.script_kill()
+
+
+@pytest.mark.asyncio
+async def test_eval_is_atomic(redis):
+    script = 'return redis.call("rpush", KEYS[1], ARGV[1], ARGV[1])'
+
+    @mockaioredis.register_script(script)
+    def push_twice(redis, keys, args):
+        redis.call('RPUSH', keys[0], args[0])
+        return redis.call('RPUSH', keys[0], args[0])
+
+    await asyncio.gather(*(redis.eval(script, ['list'], [i]) for i in range(10)))
+    values = await redis.lrange('list', 0, -1)
+    assert values[::2] == values[1::2]
+
+
+def test_coroutine_handlers_are_rejected():
+    with pytest.raises(TypeError):
+        @mockaioredis.register_script('return 1')
+        async def handler(redis, keys, args):
+            pass
@@ -0,0 +1,133 @@
+import pytest
+from aioredis.errors import ReplyError
+
+import mockaioredis
+from mockaioredis import memory
+
+
+@pytest.mark.asyncio
+async def test_memory_usage(redis):
+    assert await redis.memory_usage('foo') is None
+    await redis.set('foo', 'bar')
+    small = await redis.memory_usage('foo')
+    assert small > 0
+    await redis.set('foo', 'x' * 1000)
+    assert await redis.memory_usage('foo') > small + 1000
+
+
+@pytest.mark.asyncio
+async def test_memory_usage_encodings(redis):
+    await redis.sadd('ints', *range(100))
+    await redis.sadd('strings', *('member{}'.format(i) for i in range(100)))
+    assert await redis.memory_usage('ints') < await redis.memory_usage('strings')
+
+    await redis.hset('hash', 'field', 'value')
+    listpack = await redis.memory_usage('hash')
+    # a value larger than 64 bytes turns the hash into a hash table
+    await redis.hset('hash', 'other', 'x' * 65)
+    assert await redis.memory_usage('hash') > listpack + 65
+
+
+@pytest.mark.asyncio
+async def test_memory_usage_samples(redis):
+    await redis.rpush('list', *('x' * i for i in range(200)))
+    exact = await redis.memory_usage('list', samples=0)
+    # the first elements are the short ones
+    assert await redis.memory_usage('list') < exact
+    assert await redis.memory_usage('list', samples=200) == exact
+
+    with pytest.raises(ReplyError):
+        await redis.execute(b'MEMORY', b'USAGE', b'list', b'SAMPLES', -1)
+    with pytest.raises(ReplyError):
+        await redis.execute(b'MEMORY', b'USAGE', b'list', b'COUNT', 1)
+    with pytest.raises(ReplyError):
+        await redis.execute(b'MEMORY', b'DOCTOR')
+
+
+@pytest.mark.asyncio
+async def test_memory_usage_all_types(redis):
+    await redis.set('string', 'value')
+    await redis.hset('hash', 'field', 'value')
+    await redis.rpush('list', 'value')
+    await redis.sadd('set', 'value')
+    await redis.zadd('zset', 1.5, 'value')
+    await redis.xadd('stream', {'field': 'value'})
+    await redis.pfadd('hll', 'value')
+    for key in ('string', 'hash', 'list', 'set', 'zset', 'stream', 'hll'):
+        assert await redis.memory_usage(key) > 0
+
+    size = await redis.memory_usage('stream')
+    await redis.xgroup_create('stream', 'group', latest_id='0')
+    await redis.xread_group('group', 'consumer', ['stream'], latest_ids=['>'])
+    assert await redis.memory_usage('stream') > size
+
+
+@pytest.mark.asyncio
+async def test_memory_stats(redis):
+    empty = redis.memory_stats()
+    assert empty.keys == 0
+    assert empty.used_memory_dataset == 0
+
+    await redis.set('foo', 'bar')
+    await redis.rpush('list', *range(1000))
+    stats = redis.memory_stats()
+    assert stats.keys == 2
+    assert stats.used_memory_dataset == (await redis.memory_usage('foo') +
+                                         await redis.memory_usage('list', samples=0))
+    assert stats.used_memory == stats.used_memory_dataset + stats.used_memory_overhead
+    assert stats.used_memory_peak == stats.used_memory
+
+    # in-place modifications are picked up
+    await redis.rpush('list', 'x' * 10000)
+    grown = redis.memory_stats()
+    assert grown.used_memory_dataset > stats.used_memory_dataset + 10000
+
+    await redis.delete('list')
+    stats = redis.memory_stats()
+    assert stats.keys == 1
+    assert stats.used_memory_dataset == await redis.memory_usage('foo')
+    assert stats.used_memory_peak == grown.used_memory
+
+    await redis.flushdb()
+    stats = redis.memory_stats()
+    assert stats.used_memory_dataset == 0
+    assert stats.used_memory_peak == grown.used_memory
+
+
+@pytest.mark.asyncio
+async def test_memory_stats_expiry(redis):
+    clock = mockaioredis.ManualClock()
+    redis = mockaioredis.MockRedis(keyspace=mockaioredis.Keyspace(clock=clock))
+    await redis.mset('foo', 'bar', 'baz', 'qux')
+    await redis.expire('foo', 10)
+    stats = redis.memory_stats()
+    assert stats.keys == 2
+    clock.advance(10)
+    stats = redis.memory_stats()
+    assert stats.keys == 1
+    assert stats.used_memory_dataset == await redis.memory_usage('baz')
+
+
+@pytest.mark.asyncio
+async def test_info_memory(redis):
+    await redis.set('foo', 'x' * 2000)
+    info = await redis.info('memory')
+    stats = redis.memory_stats()
+    assert info == {'memory': {
+        'used_memory': str(stats.used_memory),
+        'used_memory_human': memory.human(stats.used_memory),
+        'used_memory_peak': str(stats.used_memory_peak),
+        'used_memory_peak_human': memory.human(stats.used_memory_peak),
+        'used_memory_overhead': str(stats.used_memory_overhead),
+        'used_memory_dataset': str(stats.used_memory_dataset),
+    }}
+    assert (await redis.info())['memory'] == info['memory']
+    assert await redis.info('replication') == {}
+    with pytest.raises(ValueError):
+        await redis.info('')
+
+
+def test_human():
+    assert memory.human(1023) == '1023B'
+    assert memory.human(2048) == '2.00K'
+    assert memory.human(3 * 1024 ** 2 // 2) == '1.50M'
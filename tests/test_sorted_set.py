@@ -0,0 +1,212 @@
+import pytest
+from aioredis.errors import ReplyError
+
+
+@pytest.mark.asyncio
+async def test_zadd(redis):
+    assert await redis.zadd('foo', 1, 'bar') == 1
+    assert await redis.zadd('foo', 2, 'baz', 3, 'blub') == 2
+    assert await redis.zadd('foo', 5, 'bar') == 0
+    assert await redis.zscore('foo', 'bar') == 5
+
+    assert await redis.zadd('foo', 6, 'bar', 1, 'new', changed=True) == 2
+    assert await redis.zadd('foo', 7, 'bar', 1, 'other', exist=redis.ZSET_IF_EXIST) == 0
+    assert await redis.zscore('foo', 'bar') == 7
+    assert await redis.zscore('foo', 'other') is None
+    assert await redis.zadd('foo', 8, 'bar', 1, 'other', exist=redis.ZSET_IF_NOT_EXIST) == 1
+    assert await redis.zscore('foo', 'bar') == 7
+
+    assert await redis.zadd('foo', 1.5, 'bar', incr=True) == b'8.5'
+    assert await redis.zadd('foo', 1, 'missing', incr=True,
+                            exist=redis.ZSET_IF_EXIST) is None
+
+    with pytest.raises(TypeError):
+        await redis.zadd('foo', 'bar', 1)
+    with pytest.raises(TypeError):
+        await redis.zadd('foo', 1, 'bar', 2)
+    with pytest.raises(ValueError):
+        await redis.zadd('foo', 1, 'bar', 2, 'baz', incr=True)
+
+
+@pytest.mark.asyncio
+async def test_zadd_wrong_type(redis):
+    await redis.set('foo', 'bar')
+    with pytest.raises(ReplyError):
+        await redis.zadd('foo', 1, 'bar')
+
+
+@pytest.mark.asyncio
+async def test_zcard(redis):
+    assert await redis.zcard('foo') == 0
+    await redis.zadd('foo', 1, 'bar', 2, 'baz')
+    assert await redis.zcard('foo') == 2
+
+
+@pytest.mark.asyncio
+async def test_zcount(redis):
+    await redis.zadd('foo', 1, 'a', 2, 'b', 3, 'c', 3, 'd')
+    assert await redis.zcount('foo') == 4
+    assert await redis.zcount('foo', 2, 3) == 3
+    assert await redis.zcount('foo', 2, 3, exclude=redis.ZSET_EXCLUDE_MIN) == 2
+    assert await redis.zcount('foo', 2, 3, exclude=redis.ZSET_EXCLUDE_MAX) == 1
+    assert await redis.zcount('foo', 1, 3, exclude=redis.ZSET_EXCLUDE_BOTH) == 1
+    with pytest.raises(ValueError):
+        await redis.zcount('foo', 3, 1)
+
+
+@pytest.mark.asyncio
+async def test_zincrby(redis):
+    assert await redis.zincrby('foo', 1, 'bar') == 1
+    assert await redis.zincrby('foo', 1.5, 'bar') == 2.5
+    assert await redis.zincrby('foo', -0.5, 'bar') == 2
+
+    await redis.zadd('foo', float('inf'), 'baz')
+    with pytest.raises(ReplyError):
+        await redis.zincrby('foo', float('-inf'), 'baz')
+
+
+@pytest.mark.asyncio
+async def test_zrange(redis):
+    await redis.zadd('foo', 3, 'c', 1, 'a', 2, 'b', 2, 'bb')
+    assert await redis.zrange('foo') == [b'a', b'b', b'bb', b'c']
+    assert await redis.zrange('foo', 1, 2) == [b'b', b'bb']
+    assert await redis.zrange('foo', -2, -1, encoding='utf-8') == ['bb', 'c']
+    assert await redis.zrange('foo', 0, 1, withscores=True) == [(b'a', 1), (b'b', 2)]
+    assert await redis.zrange('foo', 5, 10) == []
+    assert await redis.zrange('missing') == []
+
+    assert await redis.zrevrange('foo', 0, -1) == [b'c', b'bb', b'b', b'a']
+    assert await redis.zrevrange('foo', 0, 1, withscores=True) == [(b'c', 3), (b'bb', 2)]
+    assert await redis.zrevrange('foo', -1, -1) == [b'a']
+
+
+@pytest.mark.asyncio
+async def test_zrangebyscore(redis):
+    await redis.zadd('foo', 1, 'a', 2, 'b', 3, 'c', 4, 'd', 5.5, 'e')
+    assert await redis.zrangebyscore('foo') == [b'a', b'b', b'c', b'd', b'e']
+    assert await redis.zrangebyscore('foo', 2, 4) == [b'b', b'c', b'd']
+    assert await redis.zrangebyscore('foo', 2, 4, exclude=redis.ZSET_EXCLUDE_BOTH) == [b'c']
+    assert await redis.zrangebyscore('foo', 5, withscores=True) == [(b'e', 5.5)]
+    assert await redis.zrangebyscore('foo', offset=1, count=2) == [b'b', b'c']
+    assert await redis.zrangebyscore('foo', 3, offset=1, count=-1) == [b'd', b'e']
+    assert await redis.zrangebyscore('foo', 10) == []
+
+    assert await redis.zrevrangebyscore('foo') == [b'e', b'd', b'c', b'b', b'a']
+    assert await redis.zrevrangebyscore('foo', 4, 2) == [b'd', b'c', b'b']
+    assert await redis.zrevrangebyscore('foo', offset=1, count=2) == [b'd', b'c']
+    assert await redis.zrevrangebyscore('foo', 4, 2, withscores=True,
+                                        exclude=redis.ZSET_EXCLUDE_MAX) == [(b'c', 3), (b'b', 2)]
+
+    with pytest.raises(TypeError):
+        await redis.zrangebyscore('foo', offset=1)
+
+
+@pytest.mark.asyncio
+async def test_zrank(redis):
+    await redis.zadd('foo', 1, 'a', 2, 'b', 3, 'c')
+    assert await redis.zrank('foo', 'a') == 0
+    assert await redis.zrank('foo', 'c') == 2
+    assert await redis.zrank('foo', 'd') is None
+    assert await redis.zrevrank('foo', 'a') == 2
+    assert await redis.zrevrank('foo', 'c') == 0
+    assert await redis.zrevrank('foo', 'd') is None
+
+
+@pytest.mark.asyncio
+async def test_zrank_large(redis):
+    scores = list(range(5000))
+    args = []
+    for score in scores:
+        args.extend((score, 'member:{}'.format(score)))
+    await redis.zadd('foo', *args)
+    await redis.zrem('foo', 'member:10', 'member:20')
+
+    assert await redis.zrank('foo', 'member:4999') == 4997
+    assert await redis.zrank('foo', 'member:15') == 14
+    assert await redis.zrange('foo', 2500, 2501) == [b'member:2502', b'member:2503']
+
+
+@pytest.mark.asyncio
+async def test_zrem(redis):
+    await redis.zadd('foo', 1, 'a', 2, 'b', 3, 'c')
+    assert await redis.zrem('foo', 'a', 'd') == 1
+    assert await redis.zrange('foo') == [b'b', b'c']
+    assert await redis.zrem('foo', 'b', 'c') == 2
+    assert await redis.exists('foo') == 0
+    assert await redis.zrem('foo', 'b') == 0
+
+
+@pytest.mark.asyncio
+async def test_zpopmin_zpopmax(redis):
+    await redis.zadd('foo', 1, 'a', 2, 'b', 3.5, 'c', 4, 'd')
+    assert await redis.zpopmin('foo') == [b'a', b'1']
+    assert await redis.zpopmax('foo', encoding='utf-8') == ['d', '4']
+    assert await redis.zpopmax('foo', 5) == [b'c', b'3.5', b'b', b'2']
+    assert await redis.exists('foo') == 0
+    assert await redis.zpopmin('foo') == []
+
+
+@pytest.mark.asyncio
+async def test_zunionstore(redis):
+    await redis.zadd('foo', 1, 'a', 2, 'b')
+    await redis.zadd('bar', 3, 'b', 4, 'c')
+    await redis.sadd('baz', 'a', 'd')
+
+    assert await redis.zunionstore('dest', 'foo', 'bar') == 3
+    assert await redis.zrange('dest', withscores=True) == [(b'a', 1), (b'c', 4), (b'b', 5)]
+
+    assert await redis.zunionstore('dest', 'foo', 'baz', aggregate=redis.ZSET_AGGREGATE_MAX) == 3
+    assert await redis.zrange('dest', withscores=True) == [(b'a', 1), (b'd', 1), (b'b', 2)]
+
+    assert await redis.zunionstore('dest', ('foo', 2), ('bar', 0.5), with_weights=True) == 3
+    assert await redis.zrange('dest', withscores=True) == [(b'a', 2), (b'c', 2), (b'b', 5.5)]
+
+    assert await redis.zunionstore('dest', 'missing') == 0
+    assert await redis.exists('dest') == 0
+
+
+@pytest.mark.asyncio
+async def test_zinterstore(redis):
+    await redis.zadd('foo', 1, 'a', 2, 'b', 3, 'c')
+    await redis.zadd('bar', 3, 'b', 4, 'c', 5, 'd')
+
+    assert await redis.zinterstore('dest', 'foo', 'bar') == 2
+    assert await redis.zrange('dest', withscores=True) == [(b'b', 5), (b'c', 7)]
+
+    assert await redis.zinterstore('dest', 'foo', 'bar', aggregate=redis.ZSET_AGGREGATE_MIN) == 2
+    assert await redis.zrange('dest', withscores=True) == [(b'b', 2), (b'c', 3)]
+
+    assert await redis.zinterstore('dest', 'foo', 'missing') == 0
+    assert await redis.exists('dest') == 0
+
+
+@pytest.mark.asyncio
+async def test_zstore_nan_is_zero(redis):
+    await redis.zadd('pos', float('inf'), 'a')
+    await redis.zadd('neg', float('-inf'), 'a')
+
+    # inf + -inf
+    assert await redis.zunionstore('dest', 'pos', 'neg') == 1
+    assert await redis.zscore('dest', 'a') == 0
+    assert await redis.zinterstore('dest', 'pos', 'neg') == 1
+    assert await redis.zscore('dest', 'a') == 0
+
+    # 0 * inf
+    assert await redis.zunionstore('dest', ('pos', 0), with_weights=True) == 1
+    assert await redis.zscore('dest', 'a') == 0
+
+
+@pytest.mark.asyncio
+async def test_zscan(redis):
+    await redis.zadd('foo', 1, 'bar', 2.5, 'baz', 3, 'blub')
+
+    cursor, pairs = await redis.zscan('foo')
+    assert cursor == 0
+    assert pairs == [(b'bar', 1), (b'baz', 2.5), (b'blub', 3)]
+
+    cursor, pairs = await redis.zscan('foo', match='ba*', count=2)
+    assert cursor != 0
+    assert pairs == [(b'bar', 1), (b'baz', 2.5)]
+
+    pairs = [pair async for pair in redis.izscan('foo', count=1)]
+    assert pairs == [(b'bar', 1), (b'baz', 2.5), (b'blub', 3)]
@@ -0,0 +1,67 @@
+import bisect
+import random
+
+from mockaioredis.sortedlist import SortedList
+
+
+class SmallSortedList(SortedList):
+    LOAD = 4
+
+
+def test_add_discard():
+    slist = SmallSortedList()
+    expected = set()
+    for _ in range(500):
+        value = random.randrange(100)
+        if random.random() < 0.6:
+            if value not in expected:
+                slist.add(value)
+                expected.add(value)
+        else:
+            slist.discard(value)
+            expected.discard(value)
+        assert list(slist) == sorted(expected)
+        assert len(slist) == len(expected)
+
+    for value in range(100):
+        assert (value in slist) == (value in expected)
+
+
+def test_irange():
+    slist = SmallSortedList(range(0, 100, 2))
+    assert list(slist.irange(10))[:3] == [10, 12, 14]
+    assert list(slist.irange(10, inclusive=False))[:3] == [12, 14, 16]
+    assert list(slist.irange(11))[:3] == [12, 14, 16]
+    assert list(slist.irange(98, inclusive=False)) == []
+    assert list(slist.irange(None)) == list(range(0, 100, 2))
+
+
+def test_positions():
+    slist = SmallSortedList()
+    expected = []
+    for _ in range(300):
+        value = random.randrange(1000)
+        if value in expected and random.random() < 0.5:
+            slist.discard(value)
+            expected.remove(value)
+        elif value not in expected:
+            slist.add(value)
+            expected.append(value)
+        expected.sort()
+
+        probe = random.randrange(1000)
+        assert slist.bisect_left(probe) == bisect.bisect_left(expected, probe)
+        assert slist.bisect_right(probe) == bisect.bisect_right(expected, probe)
+        if expected:
+            index = random.randrange(-len(expected), len(expected))
+            assert slist[index] == expected[index]
+            start = random.randrange(len(expected))
+            assert list(slist.islice(start, start + 5)) == expected[start:start+5]
+
+
+def test_update_few():
+    values = SortedList(range(0, 2000, 2))
+    values.update([5, 1001, 3])
+    assert len(values) == 1003
+    assert list(values)[:5] == [0, 2, 3, 4, 5]
+    assert values.bisect_left(1001) == 503
@@ -0,0 +1,226 @@
+import asyncio
+
+import pytest
+from aioredis.errors import ReplyError
+
+from mockaioredis import Keyspace, ManualClock, MockRedis
+from mockaioredis.stream import Stream
+
+
+class SmallStream(Stream):
+    CHUNK_SIZE = 3
+
+
+def test_stream_chunks():
+    stream = SmallStream()
+    for i in range(1, 11):
+        stream.append((i, 0), (b'n', b'%d' % i))
+    assert 10 == len(stream)
+    assert [(i, 0) for i in range(4, 8)] == [i for i, _ in stream.range((4, 0), (7, 5))]
+    assert [(6, 0), (5, 0)] == [i for i, _ in stream.revrange((6, 0), (0, 0), 2)]
+    assert (b'n', b'7') == stream.get((7, 0))
+    assert stream.get((7, 1)) is None
+
+    assert stream.delete((4, 0))
+    assert not stream.delete((4, 0))
+    assert [(3, 0), (5, 0)] == [i for i, _ in stream.range((3, 0), (5, 0))]
+
+    # approximate trimming only drops whole chunks
+    assert 3 == stream.trim(5, approximate=True)
+    assert 6 == len(stream)
+    assert 1 == stream.trim(5)
+    assert [(i, 0) for i in range(6, 11)] == [i for i, _ in stream]
+    assert (10, 0) == stream.last_id
+
+
+@pytest.mark.asyncio
+async def test_xadd_xrange():
+    redis = MockRedis(keyspace=Keyspace(clock=ManualClock(1.5)))
+    first = await redis.xadd('s', {'a': 1})
+    assert b'1500-0' == first
+    assert b'1500-1' == await redis.xadd('s', {'b': 2})
+    assert b'1600-0' == await redis.xadd('s', {'c': 3}, message_id='1600-*')
+    assert b'1700-5' == await redis.xadd('s', {'d': 4}, message_id='1700-5')
+    assert 4 == await redis.xlen('s')
+
+    with pytest.raises(ReplyError, match='equal or smaller'):
+        await redis.xadd('s', {'e': 5}, message_id='1700-5')
+    with pytest.raises(ReplyError, match='greater than 0-0'):
+        await redis.xadd('other', {'e': 5}, message_id='0-0')
+    with pytest.raises(ReplyError, match='Invalid stream ID'):
+        await redis.xadd('s', {'e': 5}, message_id='banana')
+
+    messages = await redis.xrange('s')
+    assert [b'1500-0', b'1500-1', b'1600-0', b'1700-5'] == [m for m, _ in messages]
+    assert {b'a': b'1'} == messages[0][1]
+    assert [b'1500-1'] == [m for m, _ in await redis.xrange('s', '(1500-0', '(1600-0')]
+    assert [b'1600-0'] == [m for m, _ in await redis.xrange('s', '1501', '1600')]
+    assert [b'1700-5', b'1600-0'] == [m for m, _ in await redis.xrevrange('s', count=2)]
+    assert [] == await redis.xrange('missing')
+
+    assert 1 == await redis.xdel('s', '1500-1')
+    assert 0 == await redis.xdel('s', '1500-1')
+    assert 3 == await redis.xlen('s')
+
+
+@pytest.mark.asyncio
+async def test_xadd_maxlen(redis):
+    for i in range(250):
+        await redis.xadd('s', {'n': i}, message_id=i + 1, max_len=10, exact_len=True)
+    assert 10 == await redis.xlen('s')
+    first, _ = (await redis.xrange('s', count=1))[0]
+    assert b'241-0' == first
+
+    for i in range(250, 500):
+        await redis.xadd('s', {'n': i}, message_id=i + 1, max_len=10)
+    # MAXLEN ~ leaves the last partial chunk around
+    assert 10 <= await redis.xlen('s') < 10 + Stream.CHUNK_SIZE
+
+    assert await redis.xtrim('s', 5, exact_len=True) > 0
+    assert 5 == await redis.xlen('s')
+    assert await redis.execute('XADD', 's', 'NOMKSTREAM', 'MAXLEN', 5, '*', 'a', 1)
+    assert 5 == await redis.xlen('s')
+    assert await redis.execute('XADD', 'missing', 'NOMKSTREAM', '*', 'a', 1) is None
+    assert 0 == await redis.exists('missing')
+
+
+@pytest.mark.asyncio
+async def test_xread(redis):
+    await redis.xadd('s', {'a': 1}, message_id='1-0')
+    await redis.xadd('s', {'b': 2}, message_id='2-0')
+
+    messages = await redis.xread(['s'], timeout=None, latest_ids=['0'])
+    assert [(b's', b'1-0', {b'a': b'1'}), (b's', b'2-0', {b'b': b'2'})] == messages
+    messages = await redis.xread(['s'], timeout=None, count=1, latest_ids=['1-0'])
+    assert [(b's', b'2-0', {b'b': b'2'})] == messages
+    assert [] == await redis.xread(['s'], timeout=None)
+    assert [] == await redis.xread(['s'], timeout=10)
+
+    with pytest.raises(ReplyError, match='Unbalanced'):
+        await redis.execute('XREAD', 'STREAMS', 's', 't', '0')
+
+
+@pytest.mark.asyncio
+async def test_xread_block(redis):
+    other = MockRedis(keyspace=redis._keyspace)
+    await redis.xadd('s', {'a': 1}, message_id='1-0')
+    first = asyncio.ensure_future(redis.xread(['s', 't']))
+    second = asyncio.ensure_future(other.xread(['t'], latest_ids=['0']))
+    await asyncio.sleep(0)
+    assert not first.done()
+
+    await redis.xadd('t', {'b': 2}, message_id='5-0')
+    assert [(b't', b'5-0', {b'b': b'2'})] == await first
+    assert [(b't', b'5-0', {b'b': b'2'})] == await second
+
+    # entries the reader already saw don't wake it up
+    third = asyncio.ensure_future(redis.xread(['s'], latest_ids=['2-0']))
+    await asyncio.sleep(0)
+    await redis.xadd('s', {'c': 3}, message_id='2-0')
+    await asyncio.sleep(0)
+    assert not third.done()
+    await redis.xadd('s', {'d': 4}, message_id='3-0')
+    assert [(b's', b'3-0', {b'd': b'4'})] == await third
+
+
+@pytest.mark.asyncio
+async def test_xgroup(redis):
+    with pytest.raises(ReplyError, match='requires the key to exist'):
+        await redis.xgroup_create('s', 'g')
+    assert await redis.xgroup_create('s', 'g', mkstream=True)
+    assert 0 == await redis.xlen('s')
+    assert 1 == await redis.exists('s')
+    with pytest.raises(ReplyError, match='BUSYGROUP'):
+        await redis.xgroup_create('s', 'g')
+    assert await redis.xgroup_setid('s', 'g', '0')
+    with pytest.raises(ReplyError, match='NOGROUP'):
+        await redis.xgroup_setid('s', 'nope', '0')
+    assert 1 == await redis.execute('XGROUP', 'CREATECONSUMER', 's', 'g', 'alice')
+    assert 0 == await redis.execute('XGROUP', 'CREATECONSUMER', 's', 'g', 'alice')
+    assert 0 == await redis.xgroup_delconsumer('s', 'g', 'alice')
+    assert await redis.xgroup_destroy('s', 'g')
+    assert not await redis.xgroup_destroy('s', 'g')
+    with pytest.raises(ReplyError, match='Unknown subcommand'):
+        await redis.execute('XGROUP', 'FROB')
+
+
+@pytest.mark.asyncio
+async def test_xreadgroup_xack_xpending():
+    clock = ManualClock(10)
+    redis = MockRedis(keyspace=Keyspace(clock=clock))
+    for i in range(1, 4):
+        await redis.xadd('s', {'n': i}, message_id=i)
+    await redis.xgroup_create('s', 'g', latest_id='0')
+
+    with pytest.raises(ReplyError, match='NOGROUP'):
+        await redis.xread_group('nope', 'alice', ['s'], latest_ids=['>'])
+
+    messages = await redis.xread_group('g', 'alice', ['s'], count=2, latest_ids=['>'])
+    assert [b'1-0', b'2-0'] == [m for _, m, _ in messages]
+    clock.advance(1)
+    messages = await redis.xread_group('g', 'bob', ['s'], latest_ids=['>'])
+    assert [b'3-0'] == [m for _, m, _ in messages]
+    assert [] == await redis.xread_group('g', 'bob', ['s'], timeout=None, latest_ids=['>'])
+
+    assert [3, b'1-0', b'3-0', [[b'alice', b'2'], [b'bob', b'1']]] == \
+        await redis.xpending('s', 'g')
+    assert [[b'1-0', b'alice', 1000, 1], [b'2-0', b'alice', 1000, 1]] == \
+        await redis.xpending('s', 'g', '-', '+', 10, 'alice')
+    assert [[b'3-0', b'bob', 0, 1]] == \
+        await redis.execute('XPENDING', 's', 'g', '(2', '+', 10)
+
+    # history of the consumer, with deleted entries left empty
+    await redis.xdel('s', '2-0')
+    assert [[b's', [[b'1-0', [b'n', b'1']], [b'2-0', None]]]] == \
+        await redis.execute('XREADGROUP', 'GROUP', 'g', 'alice', 'STREAMS', 's', '0')
+
+    assert 1 == await redis.xack('s', 'g', '1-0', '1-0')
+    assert 0 == await redis.xack('s', 'nope', '1-0')
+    assert 2 == (await redis.xpending('s', 'g'))[0]
+    assert 1 == await redis.xgroup_delconsumer('s', 'g', 'bob')
+    assert 1 == (await redis.xpending('s', 'g'))[0]
+
+
+@pytest.mark.asyncio
+async def test_xreadgroup_block(redis):
+    await redis.xgroup_create('s', 'g', mkstream=True)
+    first = asyncio.ensure_future(redis.xread_group('g', 'alice', ['s'], latest_ids=['>']))
+    second = asyncio.ensure_future(redis.xread_group('g', 'bob', ['s'], latest_ids=['>']))
+    await asyncio.sleep(0)
+    await redis.xadd('s', {'a': 1}, message_id='1-0')
+    # only one consumer gets the new entry
+    assert [(b's', b'1-0', {b'a': b'1'})] == await first
+    await asyncio.sleep(0)
+    assert not second.done()
+
+    await redis.xgroup_destroy('s', 'g')
+    with pytest.raises(ReplyError, match='NOGROUP'):
+        await second
+
+
+@pytest.mark.asyncio
+async def test_xclaim():
+    clock = ManualClock(10)
+    redis = MockRedis(keyspace=Keyspace(clock=clock))
+    await redis.xadd('s', {'a': 1}, message_id='1-0')
+    await redis.xadd('s', {'b': 2}, message_id='2-0')
+    await redis.xgroup_create('s', 'g', latest_id='0')
+    await redis.xread_group('g', 'alice', ['s'], latest_ids=['>'])
+
+    # claiming nothing doesn't touch the stream
+    version = redis._keyspace.version(b's')
+    assert [] == await redis.xclaim('s', 'g', 'bob', 5000, '1-0')
+    assert redis._keyspace.version(b's') == version
+    clock.advance(10)
+    messages = await redis.xclaim('s', 'g', 'bob', 5000, '1-0', '7-0')
+    assert [(b'1-0', {b'a': b'1'})] == messages
+    assert [[b'1-0', b'bob', 0, 2]] == await redis.xpending('s', 'g', '-', '+', 10, 'bob')
+
+    assert [b'2-0'] == await redis.execute('XCLAIM', 's', 'g', 'bob', 0, '2-0', 'JUSTID',
+                                           'RETRYCOUNT', 7)
+    assert [[b'2-0', b'bob', 0, 7]] == await redis.xpending('s', 'g', '2', '+', 10)
+
+    # entries deleted in the meantime are dropped from the pending entries
+    await redis.xdel('s', '2-0')
+    assert [] == await redis.xclaim('s', 'g', 'alice', 0, '2-0')
+    assert 1 == (await redis.xpending('s', 'g'))[0]
@@ -0,0 +1,205 @@
+import pytest
+from aioredis.errors import ReplyError
+
+
+@pytest.mark.asyncio
+async def test_append(redis):
+    assert await redis.append('foo', 'bar') == 3
+    assert await redis.append('foo', 'baz') == 6
+    assert await redis.get('foo') == b'barbaz'
+    assert await redis.strlen('foo') == 6
+    assert await redis.strlen('missing') == 0
+
+    await redis.hset('hash', 'field', 'value')
+    with pytest.raises(ReplyError):
+        await redis.append('hash', 'bar')
+
+
+@pytest.mark.asyncio
+async def test_empty_string(redis):
+    assert await redis.append('foo', '') == 0
+    assert await redis.exists('foo') == 1
+    assert await redis.get('foo') == b''
+
+
+@pytest.mark.asyncio
+async def test_getrange(redis):
+    await redis.set('foo', 'This is a string')
+    assert await redis.getrange('foo', 0, 3) == b'This'
+    assert await redis.getrange('foo', -3, -1) == b'ing'
+    assert await redis.getrange('foo', 0, -1) == b'This is a string'
+    assert await redis.getrange('foo', 10, 100) == b'string'
+    assert await redis.getrange('foo', -100, 3) == b'This'
+    assert await redis.getrange('foo', 5, 3) == b''
+    assert await redis.getrange('missing', 0, -1) == b''
+    assert await redis.getrange('foo', 0, 3, encoding='utf-8') == 'This'
+
+
+@pytest.mark.asyncio
+async def test_setrange(redis):
+    await redis.set('foo', 'Hello World')
+    assert await redis.setrange('foo', 6, 'Redis') == 11
+    assert await redis.get('foo') == b'Hello Redis'
+
+    assert await redis.setrange('bar', 5, 'Redis') == 10
+    assert await redis.get('bar') == b'\x00' * 5 + b'Redis'
+
+    assert await redis.setrange('missing', 3, '') == 0
+    assert await redis.exists('missing') == 0
+
+    with pytest.raises(ValueError):
+        await redis.setrange('foo', -1, 'x')
+    with pytest.raises(ReplyError):
+        await redis.execute('SETRANGE', 'foo', -1, 'x')
+
+
+@pytest.mark.asyncio
+async def test_getset(redis):
+    assert await redis.getset('foo', 'bar') is None
+    assert await redis.getset('foo', 'baz') == b'bar'
+    assert await redis.getset('foo', 'spam', encoding='utf-8') == 'baz'
+    assert await redis.get('foo') == b'spam'
+
+
+@pytest.mark.asyncio
+async def test_setnx(redis):
+    assert await redis.setnx('foo', 'bar') is True
+    assert await redis.setnx('foo', 'baz') is False
+    assert await redis.get('foo') == b'bar'
+
+
+@pytest.mark.asyncio
+async def test_setex(redis):
+    assert await redis.setex('foo', 10, 'bar') is True
+    assert await redis.get('foo') == b'bar'
+    assert await redis.ttl('foo') == 10
+
+    assert await redis.setex('foo', 1.5, 'baz') is True
+    assert await redis.pttl('foo') == 1500
+
+    assert await redis.psetex('foo', 2500, 'spam') is True
+    assert await redis.pttl('foo') == 2500
+
+    with pytest.raises(ReplyError):
+        await redis.setex('foo', 0, 'bar')
+    with pytest.raises(TypeError):
+        await redis.psetex('foo', 1.5, 'bar')
+
+
+@pytest.mark.asyncio
+async def test_decr(redis):
+    assert await redis.decr('foo') == -1
+    assert await redis.decrby('foo', 10) == -11
+    assert await redis.incr('foo') == -10
+    assert await redis.get('foo') == b'-10'
+
+    with pytest.raises(TypeError):
+        await redis.decrby('foo', 1.5)
+
+    await redis.set('foo', 'bar')
+    with pytest.raises(ReplyError):
+        await redis.decr('foo')
+
+
+@pytest.mark.asyncio
+async def test_incr_overflow(redis):
+    await redis.set('foo', 2 ** 63 - 1)
+    with pytest.raises(ReplyError):
+        await redis.incr('foo')
+    assert await redis.get('foo') == b'%d' % (2 ** 63 - 1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('value', ['', ' 12', '1_000'])
+async def test_incr_not_an_integer(redis, value):
+    await redis.set('foo', value)
+    with pytest.raises(ReplyError):
+        await redis.incr('foo')
+    with pytest.raises(ReplyError):
+        await redis.incrby('foo', 2)
+    assert await redis.get('foo', encoding='utf-8') == value
+
+
+@pytest.mark.asyncio
+async def test_incrbyfloat(redis):
+    assert await redis.incrbyfloat('foo', 1.5) == 1.5
+    assert await redis.incrbyfloat('foo', 0.5) == 2.0
+    assert await redis.get('foo') == b'2'
+    assert await redis.incrbyfloat('foo', -3) == -1.0
+
+    await redis.set('foo', 'bar')
+    with pytest.raises(ReplyError):
+        await redis.incrbyfloat('foo', 1.0)
+    with pytest.raises(TypeError):
+        await redis.incrbyfloat('foo', '1.0')
+
+    await redis.set('bar', 1)
+    with pytest.raises(ReplyError):
+        await redis.incrbyfloat('bar', float('inf'))
+
+    for value in (' 1.5 ', '1_0.5', ''):
+        await redis.set('loose', value)
+        with pytest.raises(ReplyError):
+            await redis.incrbyfloat('loose', 1.0)
+
+
+@pytest.mark.asyncio
+async def test_incr_keeps_ttl(redis):
+    await redis.setex('foo', 10, 1)
+    await redis.incr('foo')
+    await redis.incrbyfloat('foo', 0.5)
+    assert await redis.ttl('foo') == 10
+
+
+@pytest.mark.asyncio
+async def test_bits(redis):
+    assert await redis.setbit('foo', 7, 1) == 0
+    assert await redis.setbit('foo', 7, 1) == 1
+    assert await redis.get('foo') == b'\x01'
+    assert await redis.getbit('foo', 7) == 1
+    assert await redis.getbit('foo', 6) == 0
+    assert await redis.getbit('foo', 100) == 0
+
+    assert await redis.setbit('foo', 10, 1) == 0
+    assert await redis.get('foo') == b'\x01\x20'
+    assert await redis.setbit('foo', 7, 0) == 1
+    assert await redis.get('foo') == b'\x00\x20'
+
+    with pytest.raises(ValueError):
+        await redis.setbit('foo', 0, 2)
+    with pytest.raises(ValueError):
+        await redis.getbit('foo', -1)
+
+
+@pytest.mark.asyncio
+async def test_bitcount(redis):
+    await redis.set('foo', 'foobar')
+    assert await redis.bitcount('foo') == 26
+    assert await redis.bitcount('foo', 0, 0) == 4
+    assert await redis.bitcount('foo', 1, 1) == 6
+    assert await redis.bitcount('foo', -2, -1) == 7
+    assert await redis.bitcount('missing') == 0
+
+    with pytest.raises(TypeError):
+        await redis.bitcount('foo', 0)
+
+
+@pytest.mark.asyncio
+async def test_bitop(redis):
+    await redis.set('a', b'\xff\x0f')
+    await redis.set('b', b'\x0f')
+
+    assert await redis.bitop_and('dest', 'a', 'b') == 2
+    assert await redis.get('dest') == b'\x0f\x00'
+    assert await redis.bitop_or('dest', 'a', 'b') == 2
+    assert await redis.get('dest') == b'\xff\x0f'
+    assert await redis.bitop_xor('dest', 'a', 'b') == 2
+    assert await redis.get('dest') == b'\xf0\x0f'
+    assert await redis.bitop_not('dest', 'a') == 2
+    assert await redis.get('dest') == b'\x00\xf0'
+
+    assert await redis.bitop_and('dest', 'missing', 'other') == 0
+    assert await redis.exists('dest') == 0
+
+    with pytest.raises(ReplyError):
+        await redis.execute('BITOP', 'NOT', 'dest', 'a', 'b')
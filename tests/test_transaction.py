@@ -0,0 +1,219 @@
+import asyncio
+
+import pytest
+from aioredis.errors import MultiExecError, ReplyError, WatchVariableError
+
+from mockaioredis import MockRedis
+
+
+@pytest.mark.asyncio
+async def test_multi_exec(redis):
+    tr = redis.multi_exec()
+    fut1 = tr.incr('foo')
+    fut2 = tr.incr('bar')
+    assert [1, 1] == await tr.execute()
+    assert [1, 1] == await asyncio.gather(fut1, fut2)
+
+
+@pytest.mark.asyncio
+async def test_multi_exec_errors(redis):
+    await redis.hset('hash', 'field', 'value')
+    tr = redis.multi_exec()
+    fut1 = tr.set('foo', 'bar')
+    fut2 = tr.incr('hash')
+    fut3 = tr.get('foo')
+    with pytest.raises(MultiExecError) as excinfo:
+        await tr.execute()
+    assert isinstance(excinfo.value.args[1][0], ReplyError)
+    # the commands after the failed one still ran
+    assert await fut1
+    with pytest.raises(ReplyError):
+        await fut2
+    assert b'bar' == await fut3
+
+    tr = redis.multi_exec()
+    futures = [tr.incr('hash'), tr.incr('counter')]
+    results = await tr.execute(return_exceptions=True)
+    assert isinstance(results[0], ReplyError)
+    assert 1 == results[1]
+    assert results == await asyncio.gather(*futures, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_multi_exec_is_atomic(redis):
+    other = MockRedis(keyspace=redis._keyspace)
+    popped = asyncio.ensure_future(other.blpop('list'))
+    await asyncio.sleep(0)
+
+    tr = redis.multi_exec()
+    tr.rpush('list', 'a', 'b')
+    length = tr.llen('list')
+    # blocking commands don't block in transactions
+    nothing = tr.blpop('empty')
+    await tr.execute()
+    assert 2 == await length
+    assert await nothing is None
+    assert [b'list', b'a'] == await popped
+
+
+@pytest.mark.asyncio
+async def test_multi_exec_concurrent(redis):
+    async def transfer():
+        tr = redis.multi_exec()
+        tr.decr('a')
+        tr.incr('b')
+        await tr.execute()
+
+    async def check():
+        tr = redis.multi_exec()
+        a = tr.get('a')
+        b = tr.get('b')
+        await tr.execute()
+        return int(await a or 0) + int(await b or 0)
+
+    results = await asyncio.gather(*(transfer() if i % 2 else check() for i in range(50)))
+    assert {0} == set(results[::2])
+
+
+@pytest.mark.asyncio
+async def test_multi_exec_watch(redis):
+    await redis.set('foo', 'bar')
+    assert await redis.watch('foo')
+    await redis.set('foo', 'baz')
+    tr = redis.multi_exec()
+    fut = tr.set('foo', 'blub')
+    with pytest.raises(MultiExecError):
+        await tr.execute()
+    with pytest.raises(WatchVariableError):
+        await fut
+    assert b'baz' == await redis.get('foo')
+
+    # EXEC forgets watched keys
+    await redis.set('foo', 'blargh')
+    tr = redis.multi_exec()
+    tr.get('foo')
+    assert [b'blargh'] == await tr.execute()
+
+    await redis.watch('foo')
+    assert await redis.unwatch()
+    await redis.set('foo', 'bar')
+    tr = redis.multi_exec()
+    tr.get('foo')
+    assert [b'bar'] == await tr.execute()
+
+
+@pytest.mark.asyncio
+async def test_multi_exec_watch_flushdb(redis):
+    # the key didn't exist when it was watched and doesn't exist now, but
+    # it was written in between
+    assert await redis.watch('w')
+    await redis.set('w', '1')
+    await redis.flushdb()
+    tr = redis.multi_exec()
+    fut = tr.set('x', '1')
+    with pytest.raises(MultiExecError):
+        await tr.execute()
+    with pytest.raises(WatchVariableError):
+        await fut
+    assert await redis.get('x') is None
+
+    # flushing keys that don't exist doesn't touch them
+    assert await redis.watch('w')
+    await redis.flushdb()
+    tr = redis.multi_exec()
+    tr.set('x', '1')
+    assert [True] == await tr.execute()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('method, args, kwargs', [
+    ('sadd', ('set', 'a'), {}),
+    ('srem', ('set', 'missing'), {}),
+    ('zadd', ('zset', 1, 'a'), {}),
+    ('zadd', ('zset', 2, 'a'), {'exist': 'ZSET_IF_NOT_EXIST'}),
+    ('zincrby', ('zset', 0, 'a'), {}),
+    ('zrem', ('zset', 'missing'), {}),
+    ('hdel', ('hash', 'missing'), {}),
+    ('spop', ('set', 0), {}),
+])
+async def test_multi_exec_watch_noop(redis, method, args, kwargs):
+    # commands that don't change anything don't touch watched keys
+    await redis.sadd('set', 'a')
+    await redis.zadd('zset', 1, 'a')
+    await redis.hset('hash', 'a', '1')
+    assert await redis.watch(args[0])
+    await getattr(redis, method)(*args, **kwargs)
+    tr = redis.multi_exec()
+    tr.set('x', '1')
+    assert [True] == await tr.execute()
+
+
+@pytest.mark.asyncio
+async def test_raw_multi_exec(redis):
+    assert b'OK' == await redis.execute('MULTI')
+    assert b'QUEUED' == await redis.execute('SET', 'foo', 'bar')
+    assert b'QUEUED' == await redis.execute('LPUSH', 'foo', 'baz')
+    assert b'QUEUED' == await redis.execute('GET', 'foo')
+    with pytest.raises(ReplyError, match='nested'):
+        await redis.execute('MULTI')
+    ok, error, value = await redis.execute('EXEC')
+    assert b'OK' == ok
+    assert isinstance(error, ReplyError)
+    assert b'bar' == value
+
+    with pytest.raises(ReplyError, match='without MULTI'):
+        await redis.execute('EXEC')
+    with pytest.raises(ReplyError, match='without MULTI'):
+        await redis.execute('DISCARD')
+
+
+@pytest.mark.asyncio
+async def test_raw_discard_and_abort(redis):
+    await redis.execute('MULTI')
+    await redis.execute('SET', 'foo', 'bar')
+    assert b'OK' == await redis.execute('DISCARD')
+    assert await redis.get('foo') is None
+
+    await redis.execute('MULTI')
+    await redis.execute('SET', 'foo', 'bar')
+    with pytest.raises(ReplyError, match='wrong number of arguments'):
+        await redis.execute('GET')
+    with pytest.raises(ReplyError, match='EXECABORT'):
+        await redis.execute('EXEC')
+    assert await redis.get('foo') is None
+
+
+@pytest.mark.asyncio
+async def test_raw_multi_rejects_methods(redis):
+    await redis.execute('MULTI')
+    await redis.execute('SET', 'foo', 'bar')
+    with pytest.raises(ReplyError, match='multi_exec'):
+        await redis.set('x', '1')
+    with pytest.raises(ReplyError, match='EXECABORT'):
+        await redis.execute('EXEC')
+    assert await redis.get('foo') is None
+    assert await redis.get('x') is None
+
+
+@pytest.mark.asyncio
+async def test_raw_multi_invalid_arguments(redis):
+    await redis.execute('MULTI')
+    await redis.execute('SET', 'foo', 'bar')
+    with pytest.raises(TypeError):
+        await redis.execute('SET', 'k', None)
+    assert [b'OK'] == await redis.execute('EXEC')
+    assert await redis.get('foo') == b'bar'
+    assert await redis.get('k') is None
+
+
+@pytest.mark.asyncio
+async def test_raw_watch(redis):
+    other = MockRedis(keyspace=redis._keyspace)
+    await redis.execute('WATCH', 'foo')
+    await redis.execute('MULTI')
+    with pytest.raises(ReplyError, match='inside MULTI'):
+        await redis.execute('WATCH', 'bar')
+    await redis.execute('INCR', 'foo')
+    await other.set('foo', 10)
+    assert await redis.execute('EXEC') is None
+    assert b'10' == await redis.get('foo')
@@ -0,0 +1,62 @@
+import pytest
+from aioredis.errors import ReplyError
+
+from mockaioredis.util import _compile_pattern, _float_arg, _int_arg
+
+
+@pytest.mark.parametrize('pattern, matching, other', [
+    (b'a[\\]', b'a[]', b'a]'),
+    (b'a[', b'a[', b'a'),
+    (b'[\\', b'[\\', b'['),
+    (b'[\\\\', b'[\\', b'\\'),
+    (b'a[\\]]', b'a]', b'a[]'),
+])
+def test_compile_pattern_brackets(pattern, matching, other):
+    regex = _compile_pattern(pattern)
+    assert regex.fullmatch(matching)
+    assert not regex.fullmatch(other)
+
+
+@pytest.mark.parametrize('pattern, matching, other', [
+    (b'[a-c]', b'b', b'd'),
+    (b'[^a-c]', b'd', b'b'),
+    (b'[a\\-c]', b'-', b'b'),
+])
+def test_compile_pattern_classes(pattern, matching, other):
+    regex = _compile_pattern(pattern)
+    assert regex.fullmatch(matching)
+    assert not regex.fullmatch(other)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (b'0', 0),
+    (b'-12', -12),
+    ('9223372036854775807', 2 ** 63 - 1),
+    (b'-9223372036854775808', -2 ** 63),
+    (2 ** 70, 2 ** 70),
+])
+def test_int_arg(value, expected):
+    assert _int_arg(value) == expected
+
+
+@pytest.mark.parametrize('value', [
+    b'', b' 12', b'12 ', b'1_000', b'+1', b'01', b'-0', b'1.0',
+    b'9223372036854775808',
+])
+def test_int_arg_invalid(value):
+    with pytest.raises(ReplyError):
+        _int_arg(value)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (b'1.5', 1.5), (b'-.5', -0.5), (b'1e3', 1000.0), (b'3.', 3.0),
+    (b'+inf', float('inf')), (b'-Inf', float('-inf')), (2, 2.0),
+])
+def test_float_arg(value, expected):
+    assert _float_arg(value) == expected
+
+
+@pytest.mark.parametrize('value', [b'', b' 1.5 ', b'1_0.5', b'nan', b'1e', b'.'])
+def test_float_arg_invalid(value):
+    with pytest.raises(ReplyError):
+        _float_arg(value)